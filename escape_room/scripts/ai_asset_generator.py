@@ -7,15 +7,24 @@ AIによるアプリ素材自動生成・配置システム
 import os
 import sys
 import json
-import requests
+import shutil
 import subprocess
 from pathlib import Path
 from PIL import Image
-import openai
+
+from asset_pipeline import (
+    build_icon_set, BuildManifest, ENCODE_STATS, format_encode, load_app_size_budget,
+    resolve_profile, save_png, select_best_candidate
+)
+from generation_engine import AsyncGenerationEngine
+from generation_cache import GenerationCache
+from asset_downloader import AssetDownloader
+from local_provider import local_provider_from_env
+from asset_tracing import TRACER, finish_trace, trace_path_from_args
 
 # 設定
 CONFIG = {
-    "project_root": "/Users/sekiguchi/git/proto/casual_game_template",
+    "project_root": os.getenv("ASSET_PROJECT_ROOT", "/Users/sekiguchi/git/proto/casual_game_template"),
     "output_dir": "generated_assets",
     "prompts": {
         "app_icon": """
@@ -58,32 +67,73 @@ CONFIG = {
         {"name": "Icon-App-76x76@2x.png", "size": (152, 152)},
         {"name": "Icon-App-83.5x83.5@2x.png", "size": (167, 167)},
         {"name": "Icon-App-1024x1024@1x.png", "size": (1024, 1024)}
-    ]
+    ],
+    # アイコン候補数 (同時リクエストで生成しローカル採点で最良を選択)
+    "icon_candidates": int(os.getenv("ASSET_ICON_CANDIDATES", "4")),
+
+    # PNGエンコーダプロファイル (ASSET_BUILD_TARGET=dev|ci|release, ASSET_ENCODER_PROFILE=fast|balanced|store で上書き)
+    # main() で決定する。None のままなら使用時に resolve_profile() で決定
+    "encoder_profile": None,
+    
+    # アプリサイズ予算 (performance_targets.app_size) の参照先
+    "performance_config": str(Path(__file__).resolve().parents[1] / "performance_config.yaml"),
 }
 
 class AIImageGenerator:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, use_cache=True):
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         if self.api_key:
+            import openai
             openai.api_key = self.api_key
         
         self.project_root = Path(CONFIG["project_root"])
         self.output_dir = self.project_root / CONFIG["output_dir"]
         self.output_dir.mkdir(exist_ok=True)
         
+        # プロンプト・パラメータが同じなら生成済みマスターを再利用
+        self.cache = GenerationCache(self.output_dir / ".generation_cache", enabled=use_cache)
+        
+        # keep-alive付き共有セッション (ストリーミング・再開・リトライ)
+        self.downloader = AssetDownloader()
+        
+        # 出力毎のソースハッシュ・サイズ・エンコーダ設定 (差分ビルド用)
+        self.manifest = BuildManifest(self.output_dir / ".build_manifest.json")
+        
+        # オフライン計測用の合成画像プロバイダ (ASSET_LOCAL_PROVIDER=1 / --local)
+        self.local_provider = local_provider_from_env(self.output_dir)
+        self.provider_name = "local" if self.local_provider else "openai"
+        
+    def provider_params(self):
+        """ローカルプロバイダ使用時は、そのシード等もキャッシュキーに含める"""
+        return self.local_provider.cache_params() if self.local_provider else {}
+    
     def generate_image_dalle(self, prompt, filename, size="1024x1024"):
         """DALL-E 3で画像生成"""
+        params = {"size": size, "quality": "hd", "n": 1}
+        key = GenerationCache.make_key(self.provider_name, "dall-e-3", prompt, {**params, **self.provider_params()})
+        return self.cache.get_or_generate(
+            key, self.output_dir / filename,
+            lambda: self._request_dalle(prompt, filename, params)
+        )
+    
+    def _request_dalle(self, prompt, filename, params):
+        """DALL-E 3 APIを呼び出し"""
+        if self.local_provider:
+            with TRACER.span("generate", provider="local", file=filename):
+                return self.local_provider.generate(prompt, filename)
+        
         try:
+            import openai
+            
             print(f"🎨 Generating image: {filename}")
             print(f"📝 Prompt: {prompt[:100]}...")
             
-            response = openai.Image.create(
-                model="dall-e-3",
-                prompt=prompt,
-                size=size,
-                quality="hd",
-                n=1
-            )
+            with TRACER.span("generate", provider="openai", file=filename):
+                response = openai.Image.create(
+                    model="dall-e-3",
+                    prompt=prompt,
+                    **params
+                )
             
             image_url = response.data[0].url
             return self.download_image(image_url, filename)
@@ -92,18 +142,48 @@ class AIImageGenerator:
             print(f"❌ DALL-E generation failed: {e}")
             return None
     
+    def generate_best_dalle(self, prompt, filename, count):
+        """複数候補を生成し、ローカル採点で最良の1枚だけを filename に保存"""
+        if count <= 1:
+            return self.generate_image_dalle(prompt, filename)
+        
+        # 単発生成と同じ model・params に候補数を加えたキー
+        params = {"size": "1024x1024", "quality": "hd", "n": 1}
+        key = GenerationCache.make_key(
+            self.provider_name, "dall-e-3", prompt, {**params, **self.provider_params(), "candidates": count}
+        )
+        return self.cache.get_or_generate(
+            key, self.output_dir / filename,
+            lambda: self._generate_and_select(prompt, filename, count, params)
+        )
+    
+    def _generate_and_select(self, prompt, filename, count, params):
+        """候補生成 -> 採点 -> 最良候補をマスターとしてコピー"""
+        # DALL-E 3 は n=1 のみ対応のため、同時リクエストで候補を揃える
+        engine = AsyncGenerationEngine({"openai": lambda p, f: self._request_dalle(p, f, params)}, count)
+        
+        stem = Path(filename).stem
+        jobs = [(i, "openai", prompt, f"{stem}_candidate_{i}.png") for i in range(count)]
+        candidates = []
+        engine.run(jobs, lambda i, path: candidates.append(path) if path else None)
+        
+        best_path, _ = select_best_candidate(candidates, prompt)
+        if not best_path:
+            return None
+        
+        master_path = self.output_dir / filename
+        shutil.copyfile(best_path, master_path)
+        print(f"🏆 Selected: {Path(best_path).name}")
+        return str(master_path)
+    
     def download_image(self, url, filename):
         """画像URLからダウンロード"""
         try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            
-            img_path = self.output_dir / filename
-            with open(img_path, 'wb') as f:
-                f.write(response.content)
+            with TRACER.span("download", file=filename):
+                img_path = self.downloader.download(url, self.output_dir / filename)
             
             print(f"✅ Downloaded: {img_path}")
-            return str(img_path)
+            return img_path
             
         except Exception as e:
             print(f"❌ Download failed: {e}")
@@ -113,17 +193,25 @@ class AIImageGenerator:
         """画像リサイズ"""
         try:
             with Image.open(source_path) as img:
-                img = img.convert('RGBA')
-                img = img.resize(size, Image.Resampling.LANCZOS)
+                with TRACER.span("open", path=source_path):
+                    img.load()
+                with TRACER.span("convert", mode='RGBA'):
+                    img = img.convert('RGBA')
+                with TRACER.span("resize", size=size):
+                    img = img.resize(size, Image.Resampling.LANCZOS)
                 
                 # 透明度を削除（App Store要件）
                 if size == (1024, 1024):
-                    background = Image.new('RGB', size, (255, 255, 255))
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
+                    with TRACER.span("flatten", size=size):
+                        background = Image.new('RGB', size, (255, 255, 255))
+                        background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+                        img = background
                 
-                img.save(target_path, 'PNG', quality=95)
-                print(f"✅ Resized: {target_path} ({size[0]}x{size[1]})")
+                profile = CONFIG["encoder_profile"] or resolve_profile()
+                with TRACER.span("save", path=target_path, profile=profile["name"]):
+                    encoded = save_png(img, target_path, profile)
+                ENCODE_STATS.record(profile, encoded)
+                print(f"✅ Resized: {target_path} ({size[0]}x{size[1]}, {format_encode(encoded)})")
                 return True
                 
         except Exception as e:
@@ -137,20 +225,18 @@ class AIImageGenerator:
         prompt = CONFIG["prompts"]["app_icon"]
         master_filename = "app_icon_master.png"
         
-        # マスター画像生成
-        master_path = self.generate_image_dalle(prompt, master_filename)
+        # マスター画像生成 (複数候補から最良の1枚だけをリサイズへ)
+        master_path = self.generate_best_dalle(prompt, master_filename, CONFIG["icon_candidates"])
         
         if not master_path:
             return False
         
-        # 全サイズ生成
+        # 全サイズ生成 (マスターは一度だけデコード)
         icon_dir = self.project_root / "ios/Runner/Assets.xcassets/AppIcon.appiconset"
-        success_count = 0
-        
-        for icon_config in CONFIG["icon_sizes"]:
-            target_path = icon_dir / icon_config["name"]
-            if self.resize_image(master_path, target_path, icon_config["size"]):
-                success_count += 1
+        results = build_icon_set(
+            master_path, icon_dir, CONFIG["icon_sizes"], CONFIG["encoder_profile"], manifest=self.manifest
+        )
+        success_count = sum(results.values())
         
         print(f"✅ App Icon: {success_count}/{len(CONFIG['icon_sizes'])} sizes generated")
         return success_count == len(CONFIG["icon_sizes"])
@@ -160,17 +246,34 @@ def main():
     print("🚀 AI Image Generation System")
     print("=" * 50)
     
+    # --trace <path>: ステージ毎のスパンを JSON Lines (.jsonl) / Chrome trace (.json) で出力
+    trace_path = trace_path_from_args(sys.argv[1:])
+    
+    # エンコーダプロファイルは不正な環境変数でもimportが失敗しないよう実行時に決定
+    try:
+        CONFIG["encoder_profile"] = resolve_profile()
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    
+    # --local: APIを使わず合成画像で実行
+    if "--local" in sys.argv[1:]:
+        os.environ["ASSET_LOCAL_PROVIDER"] = "1"
+    
     # 環境確認
-    if not os.getenv('OPENAI_API_KEY'):
+    if not os.getenv('OPENAI_API_KEY') and os.getenv("ASSET_LOCAL_PROVIDER") != "1":
         print("❌ Missing OPENAI_API_KEY")
         print("   export OPENAI_API_KEY=your_api_key_here")
         return False
     
-    # ジェネレータ初期化
-    generator = AIImageGenerator()
+    # ジェネレータ初期化 (--no-cache で必ず再生成)
+    generator = AIImageGenerator(use_cache="--no-cache" not in sys.argv[1:])
     
     # アイコン生成実行
     success = generator.generate_app_icon()
+    generator.cache.print_stats()
+    ENCODE_STATS.print_report(load_app_size_budget(CONFIG["performance_config"]))
+    finish_trace(trace_path)
     
     if success:
         print("\n🎉 Generation completed successfully!")
@@ -4,17 +4,34 @@ Enhanced AI Asset Generator with Web Information Integration
 WebFetch制限を考慮した実用的な画像生成自動化システム
 """
 
+import functools
 import os
 import sys
 import json
-import requests
+import shutil
 import subprocess
 from pathlib import Path
 from PIL import Image
 
+from asset_pipeline import (
+    build_icon_set, BuildManifest, ENCODE_STATS, format_encode, load_app_size_budget, OPAQUE_SIZES,
+    plan_screenshot_crops, resolve_profile, save_png, target_aspect, VariantRenderer, select_best_candidate
+)
+from generation_engine import AsyncGenerationEngine
+from generation_cache import GenerationCache
+from asset_downloader import AssetDownloader
+from stability_stream import write_artifacts
+from asset_tracing import TRACER, finish_trace, strip_trace_args, trace_path_from_args
+from asset_validator import load_report, validate_assets, validation_inputs, write_report
+from local_provider import local_provider_from_env
+from provider_registry import (
+    CachedProvider, CallableProvider, ComfyUIProvider, ProviderRegistry, SDXL_SIZES, WebUIProvider,
+    load_local_services
+)
+
 # 設定 - WebFetch情報を基に更新
 CONFIG = {
-    "project_root": "/Users/sekiguchi/git/proto/casual_game_template",
+    "project_root": os.getenv("ASSET_PROJECT_ROOT", "/Users/sekiguchi/git/proto/casual_game_template"),
     "output_dir": "generated_assets",
     
     # サービス優先順位 (利用可能性に基づく)
@@ -24,14 +41,16 @@ CONFIG = {
             "api_key_env": "OPENAI_API_KEY",
             "cost_per_image": 0.04,  # $0.04 for DALL-E 3 standard
             "quality": "high",
-            "setup_complexity": "low"
+            "setup_complexity": "low",
+            "native_sizes": [(1024, 1024), (1024, 1792), (1792, 1024)]
         },
         "stability": {
             "available": True,
             "api_key_env": "STABILITY_API_KEY", 
             "cost_per_image": 0.02,  # Stability AI cheaper
             "quality": "high",
-            "setup_complexity": "medium"
+            "setup_complexity": "medium",
+            "native_sizes": SDXL_SIZES
         },
         "firefly": {
             "available": False,  # API制限により自動化困難
@@ -39,9 +58,37 @@ CONFIG = {
             "cost_per_image": 0.0,  # 無料クレジット有り
             "quality": "high",
             "setup_complexity": "high"
+        },
+        # ローカルサービス (ai-services/configs/ai_services_config.json のURLを使用)
+        "webui": {
+            "available": True,
+            "api_key_env": None,
+            "cost_per_image": 0.0,
+            "quality": "medium",
+            "setup_complexity": "medium"
+        },
+        "comfyui": {
+            "available": True,
+            "api_key_env": None,
+            "cost_per_image": 0.0,
+            "quality": "medium",
+            "setup_complexity": "medium",
+            "checkpoint": "Counterfeit-V3.0_fp16.safetensors"
         }
     },
     
+    "local_services_config": str(
+        Path(__file__).resolve().parents[2] / "ai-services" / "configs" / "ai_services_config.json"
+    ),
+    
+    # プロバイダ選択: (p50秒 × latency_weight + 単価$ × cost_weight) / 成功率 が最小のものを使用
+    "routing": {
+        "latency_weight": 1.0,
+        "cost_weight": 100.0,
+        "default_latency_seconds": 20.0,
+        "window": 50
+    },
+    
     # プロンプト改良版 (Fireflyガイドから取得した情報を反映)
     "prompts": {
         "app_icon": """
@@ -115,50 +162,184 @@ CONFIG = {
         "iphone_6_5": {"width": 1284, "height": 2778, "name": "iPhone 6.5\""},
         "iphone_5_5": {"width": 1242, "height": 2208, "name": "iPhone 5.5\""},
         "ipad_12_9": {"width": 2048, "height": 2732, "name": "iPad 12.9\""}
-    }
+    },
+    
+    # 並列レンダリングのワーカー数 (None = CPUコア数, 環境変数 ASSET_RENDER_WORKERS で上書き)
+    "render_workers": int(os.getenv("ASSET_RENDER_WORKERS", "0")) or None,
+    
+    # プロバイダ毎の同時生成リクエスト数
+    "generation_concurrency": int(os.getenv("ASSET_GENERATION_CONCURRENCY", "4")),
+    
+    # 生成キャッシュ (output_dir配下, LRUサイズ上限)
+    "cache_dir": ".generation_cache",
+    "cache_max_mb": 512,
+    
+    # 差分ビルド用マニフェスト (output_dir配下)
+    "build_manifest": ".build_manifest.json",
+    
+    # 品質チェックの機械可読レポート (output_dir配下)
+    "quality_report": "quality_report.json",
+    
+    # PNGエンコーダプロファイル (ASSET_BUILD_TARGET=dev|ci|release, ASSET_ENCODER_PROFILE=fast|balanced|store で上書き)
+    # main() で決定する。None のままなら使用時に resolve_profile() で決定
+    "encoder_profile": None,
+    
+    # アプリサイズ予算 (performance_targets.app_size) の参照先
+    "performance_config": str(Path(__file__).resolve().parents[1] / "performance_config.yaml"),
+    
+    # Stabilityレスポンス1件あたりのデコード上限 (samplesを増やしても膨らまないように)
+    "stability_max_bytes": 64 * 1024 * 1024,
+    
+    # アイコン候補数 (1回のリクエストで生成しローカル採点で最良を選択)
+    "icon_candidates": int(os.getenv("ASSET_ICON_CANDIDATES", "4"))
+}
+
+STABILITY_ENGINE = "stable-diffusion-xl-1024-v1-0"
+STABILITY_PARAMS = {
+    "steps": 40,
+    "width": 1024,
+    "height": 1024,
+    "seed": 0,
+    "cfg_scale": 5,
+    "samples": 1,
 }
 
 class EnhancedAIGenerator:
-    def __init__(self):
+    def __init__(self, use_cache=True):
         self.project_root = Path(CONFIG["project_root"])
         self.output_dir = self.project_root / CONFIG["output_dir"]
         self.output_dir.mkdir(exist_ok=True)
         
+        # プロンプト・パラメータが同じなら生成済みマスターを再利用
+        self.cache = GenerationCache(
+            self.output_dir / CONFIG["cache_dir"],
+            max_bytes=CONFIG["cache_max_mb"] * 1024 * 1024,
+            enabled=use_cache
+        )
+        
+        # keep-alive付き共有セッション (ストリーミング・再開・リトライ)
+        self.downloader = AssetDownloader()
+        
+        # 出力毎のソースハッシュ・サイズ・エンコーダ設定 (差分ビルド用)
+        self.manifest = BuildManifest(self.output_dir / CONFIG["build_manifest"])
+        
+        # プロバイダ登録 (リクエスト毎にレイテンシ・エラー率・コストでルーティング)
+        self.registry = self.build_registry()
+        
         # 利用可能なサービスを自動検出
         self.available_service = self.detect_available_service()
         
+    def build_registry(self):
+        """CONFIG["services"] の各サービスをプロバイダとして登録"""
+        routing = CONFIG["routing"]
+        registry = ProviderRegistry(
+            latency_weight=routing["latency_weight"],
+            cost_weight=routing["cost_weight"],
+            default_latency=routing["default_latency_seconds"],
+            window=routing["window"],
+            concurrency=CONFIG["generation_concurrency"]
+        )
+        local_services = load_local_services(CONFIG["local_services_config"])
+        
+        generators = {
+            "openai": self.generate_with_openai,
+            "stability": self.generate_with_stability,
+            "firefly": self.generate_with_firefly,
+        }
+        # GenerationCache を経由する生成メソッド（ヒットはルーティングの観測値に含めない）
+        cached_services = {"openai", "stability"}
+        
+        # オフライン計測用: ASSET_LOCAL_PROVIDER=1 (または --local) で合成画像プロバイダを追加
+        # キャッシュを持たないプロバイダは GenerationCache 越しに登録し、再実行時は生成を省く
+        local_provider = local_provider_from_env(self.output_dir)
+        if local_provider:
+            registry.register(CachedProvider(local_provider, self.cache, self.output_dir))
+        
+        for service_name, config in CONFIG["services"].items():
+            cost = config["cost_per_image"]
+            
+            if service_name in generators:
+                def available(config=config):
+                    return config["available"] and bool(os.getenv(config["api_key_env"]))
+                registry.register(CallableProvider(
+                    service_name, generators[service_name], cost, available, config.get("native_sizes"),
+                    cache=self.cache if service_name in cached_services else None
+                ))
+            
+            elif service_name in local_services and config["available"]:
+                url = local_services[service_name]["url"]
+                if service_name == "webui":
+                    provider = WebUIProvider(url, self.output_dir, cost)
+                elif service_name == "comfyui":
+                    provider = ComfyUIProvider(url, self.output_dir, config["checkpoint"], cost)
+                else:
+                    continue
+                registry.register(CachedProvider(provider, self.cache, self.output_dir))
+        
+        return registry
+    
     def detect_available_service(self):
-        """利用可能なサービスを自動検出"""
+        """利用可能なサービスを自動検出（最も期待コストの低いものを返す）"""
         print("🔍 Detecting available AI services...")
         
+        available = self.registry.available()
+        if "local" in available:
+            print("✅ LOCAL: Available (synthetic images)")
+        
         for service_name, config in CONFIG["services"].items():
-            if config["available"]:
-                api_key = os.getenv(config["api_key_env"])
-                if api_key:
-                    print(f"✅ {service_name.upper()}: Available")
-                    return service_name
-                else:
-                    print(f"❌ {service_name.upper()}: Missing API key ({config['api_key_env']})")
+            if service_name in available:
+                print(f"✅ {service_name.upper()}: Available")
+            elif config["api_key_env"] and not os.getenv(config["api_key_env"]):
+                print(f"❌ {service_name.upper()}: Missing API key ({config['api_key_env']})")
+            else:
+                print(f"❌ {service_name.upper()}: Unavailable")
+        
+        ranked = self.registry.ranked()
+        if ranked:
+            return ranked[0]
         
         print("⚠️ No AI service available. Please set API keys.")
         return None
     
-    def generate_with_openai(self, prompt, filename, size="1024x1024"):
+    def service_generators(self):
+        """サービス名 -> 生成メソッドの対応表 ("auto" はリクエスト毎にルーティング)"""
+        return {
+            "auto": self.registry.generate,
+            "openai": self.generate_with_openai,
+            "stability": self.generate_with_stability,
+        }
+    
+    def generate_with_firefly(self, prompt, filename):
+        """Adobe Firefly (MCP Chrome自動化) で画像生成"""
+        from mcp_firefly_automation import MCPFireflyAutomation
+        
+        path = MCPFireflyAutomation().generate_image_firefly(prompt, filename)
+        # 自動化がシミュレーションの場合はファイルが作られない
+        return path if path and Path(path).exists() else None
+    
+    def generate_with_openai(self, prompt, filename, size=(1024, 1024)):
         """OpenAI DALL-E 3 で画像生成"""
+        params = {"size": f"{size[0]}x{size[1]}", "quality": "hd", "style": "vivid", "n": 1}
+        key = GenerationCache.make_key("openai", "dall-e-3", prompt, params)
+        return self.cache.get_or_generate(
+            key, self.output_dir / filename,
+            lambda: self._request_openai(prompt, filename, params)
+        )
+    
+    def _request_openai(self, prompt, filename, params):
+        """DALL-E 3 APIを呼び出し"""
         try:
             import openai
             openai.api_key = os.getenv('OPENAI_API_KEY')
             
             print(f"🎨 Generating with DALL-E 3: {filename}")
             
-            response = openai.Image.create(
-                model="dall-e-3",
-                prompt=prompt,
-                size=size,
-                quality="hd",
-                style="vivid",
-                n=1
-            )
+            with TRACER.span("generate", provider="openai", file=filename):
+                response = openai.Image.create(
+                    model="dall-e-3",
+                    prompt=prompt,
+                    **params
+                )
             
             image_url = response.data[0].url
             return self.download_image(image_url, filename)
@@ -167,25 +348,29 @@ class EnhancedAIGenerator:
             print(f"❌ DALL-E generation failed: {e}")
             return None
     
-    def generate_with_stability(self, prompt, filename):
+    def generate_with_stability(self, prompt, filename, size=(1024, 1024)):
         """Stability AI で画像生成"""
+        params = {**STABILITY_PARAMS, "width": size[0], "height": size[1]}
+        key = GenerationCache.make_key("stability", STABILITY_ENGINE, prompt, params)
+        return self.cache.get_or_generate(
+            key, self.output_dir / filename,
+            lambda: next(iter(self._request_stability(prompt, filename, params)), None)
+        )
+    
+    def _request_stability(self, prompt, filename, params):
+        """Stability AI APIを呼び出し、書き出した全サンプルのパスを返す"""
         try:
             api_key = os.getenv('STABILITY_API_KEY')
             if not api_key:
                 print("❌ STABILITY_API_KEY not found")
-                return None
+                return []
             
             print(f"🎨 Generating with Stability AI: {filename}")
             
-            url = "https://api.stability.ai/v1/generation/stable-diffusion-xl-1024-v1-0/text-to-image"
+            url = f"https://api.stability.ai/v1/generation/{STABILITY_ENGINE}/text-to-image"
             
             body = {
-                "steps": 40,
-                "width": 1024,
-                "height": 1024,
-                "seed": 0,
-                "cfg_scale": 5,
-                "samples": 1,
+                **params,
                 "text_prompts": [
                     {
                         "text": prompt,
@@ -200,41 +385,93 @@ class EnhancedAIGenerator:
                 "Authorization": f"Bearer {api_key}",
             }
             
-            response = requests.post(url, headers=headers, json=body)
-            
-            if response.status_code == 200:
-                data = response.json()
+            # 本文を保持せず、各サンプルを逐次デコードしてファイルへ書き出す
+            with TRACER.span("generate", provider="stability", file=filename), \
+                    self.downloader.session.post(url, headers=headers, json=body, stream=True) as response:
+                if response.status_code != 200:
+                    print(f"❌ Stability API error: {response.status_code}")
+                    return []
                 
-                for i, image in enumerate(data["artifacts"]):
-                    import base64
-                    img_data = base64.b64decode(image["base64"])
-                    
-                    img_path = self.output_dir / filename
-                    with open(img_path, "wb") as f:
-                        f.write(img_data)
-                    
-                    print(f"✅ Generated: {img_path}")
-                    return str(img_path)
-            else:
-                print(f"❌ Stability API error: {response.status_code}")
-                return None
+                paths = write_artifacts(
+                    response, self.output_dir, filename,
+                    max_bytes=CONFIG["stability_max_bytes"]
+                )
+            
+            if not paths:
+                print("❌ Stability API returned no artifacts")
+            
+            for img_path in paths:
+                print(f"✅ Generated: {img_path}")
+            return paths
                 
         except Exception as e:
             print(f"❌ Stability AI generation failed: {e}")
+            return []
+    
+    def generate_best_candidate(self, prompt, filename, count):
+        """複数候補を生成し、ローカル採点で最良の1枚だけを filename に保存"""
+        if count <= 1:
+            return self.registry.generate(prompt, filename)
+        
+        ranked = self.registry.ranked()
+        if not ranked:
             return None
+        service = ranked[0]
+        
+        # 単発生成と同じ model・params に候補数を加えたキー
+        model, params = self.candidate_params(service, count)
+        key = GenerationCache.make_key(service, model, prompt, {**params, "candidates": count})
+        return self.cache.get_or_generate(
+            key, self.output_dir / filename,
+            lambda: self._generate_and_select(service, prompt, filename, count, params)
+        )
+    
+    def candidate_params(self, service, count):
+        """候補生成に使う (model, params)"""
+        if service == "stability":
+            # 1回のAPI呼び出しで samples 枚を取得
+            return STABILITY_ENGINE, {**STABILITY_PARAMS, "samples": count}
+        if service == "openai":
+            return "dall-e-3", {"size": "1024x1024", "quality": "hd", "style": "vivid", "n": 1}
+        return service, self.registry.providers[service].cache_params()
+    
+    def _generate_and_select(self, service, prompt, filename, count, params):
+        """候補生成 -> 採点 -> 最良候補をマスターとしてコピー"""
+        stem = Path(filename).stem
+        print(f"🎲 Requesting {count} candidates from {service}...")
+        
+        if service == "stability":
+            candidates = self._request_stability(prompt, f"{stem}_candidate.png", params)
+        else:
+            # DALL-E 3 は n=1 のみ対応のため、同時リクエストで候補を揃える
+            if service == "openai":
+                request = lambda p, f: self._request_openai(p, f, params)
+            else:
+                request = self.registry.providers[service].generate
+            engine = AsyncGenerationEngine({service: request}, CONFIG["generation_concurrency"])
+            jobs = [(i, service, prompt, f"{stem}_candidate_{i}.png") for i in range(count)]
+            candidates = []
+            engine.run(jobs, lambda i, path: candidates.append(path) if path else None)
+        
+        best_path, _ = select_best_candidate(candidates, prompt)
+        if not best_path:
+            # 候補が得られなければ他のプロバイダへフェイルオーバー
+            print(f"↪️ No usable candidates from {service}, routing single request")
+            return self.registry.generate(prompt, filename)
+        
+        master_path = self.output_dir / filename
+        shutil.copyfile(best_path, master_path)
+        print(f"🏆 Selected: {Path(best_path).name}")
+        return str(master_path)
     
     def download_image(self, url, filename):
         """画像URLからダウンロード"""
         try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            
-            img_path = self.output_dir / filename
-            with open(img_path, 'wb') as f:
-                f.write(response.content)
+            with TRACER.span("download", file=filename):
+                img_path = self.downloader.download(url, self.output_dir / filename)
             
             print(f"✅ Downloaded: {img_path}")
-            return str(img_path)
+            return img_path
             
         except Exception as e:
             print(f"❌ Download failed: {e}")
@@ -244,25 +481,34 @@ class EnhancedAIGenerator:
         """画像リサイズ（品質最適化）"""
         try:
             with Image.open(source_path) as img:
+                with TRACER.span("open", path=source_path):
+                    img.load()
+                
                 # RGBA変換 (透明度対応)
                 if img.mode != 'RGBA':
-                    img = img.convert('RGBA')
+                    with TRACER.span("convert", mode='RGBA'):
+                        img = img.convert('RGBA')
                 
                 # 高品質リサイズ
-                img = img.resize(size, Image.Resampling.LANCZOS)
+                with TRACER.span("resize", size=size):
+                    img = img.resize(size, Image.Resampling.LANCZOS)
                 
                 # App Store要件：1024x1024は透明度除去
                 if size == (1024, 1024):
-                    background = Image.new('RGB', size, (255, 255, 255))
-                    if img.mode == 'RGBA':
-                        background.paste(img, mask=img.split()[-1])
-                    else:
-                        background.paste(img)
-                    img = background
+                    with TRACER.span("flatten", size=size):
+                        background = Image.new('RGB', size, (255, 255, 255))
+                        if img.mode == 'RGBA':
+                            background.paste(img, mask=img.split()[-1])
+                        else:
+                            background.paste(img)
+                        img = background
                 
-                # 最適化保存
-                img.save(target_path, 'PNG', optimize=True, quality=95)
-                print(f"✅ Resized: {target_path.name} ({size[0]}x{size[1]})")
+                # プロファイルに応じたPNG保存
+                profile = CONFIG["encoder_profile"] or resolve_profile()
+                with TRACER.span("save", path=target_path, profile=profile["name"]):
+                    encoded = save_png(img, target_path, profile)
+                ENCODE_STATS.record(profile, encoded)
+                print(f"✅ Resized: {target_path.name} ({size[0]}x{size[1]}, {format_encode(encoded)})")
                 return True
                 
         except Exception as e:
@@ -280,14 +526,8 @@ class EnhancedAIGenerator:
         prompt = CONFIG["prompts"]["app_icon"]
         master_filename = "app_icon_master.png"
         
-        # マスター画像生成
-        if self.available_service == "openai":
-            master_path = self.generate_with_openai(prompt, master_filename)
-        elif self.available_service == "stability":
-            master_path = self.generate_with_stability(prompt, master_filename)
-        else:
-            print(f"❌ Unknown service: {self.available_service}")
-            return False
+        # マスター画像生成 (複数候補から最良の1枚だけをリサイズへ)
+        master_path = self.generate_best_candidate(prompt, master_filename, CONFIG["icon_candidates"])
         
         if not master_path:
             print("❌ Master icon generation failed")
@@ -295,14 +535,13 @@ class EnhancedAIGenerator:
         
         # 全サイズ自動生成
         icon_dir = self.project_root / "ios/Runner/Assets.xcassets/AppIcon.appiconset"
-        success_count = 0
         
         print(f"📐 Generating {len(CONFIG['icon_sizes'])} icon sizes...")
         
-        for icon_config in CONFIG["icon_sizes"]:
-            target_path = icon_dir / icon_config["name"]
-            if self.resize_image(master_path, target_path, icon_config["size"]):
-                success_count += 1
+        results = build_icon_set(
+            master_path, icon_dir, CONFIG["icon_sizes"], CONFIG["encoder_profile"], manifest=self.manifest
+        )
+        success_count = sum(results.values())
         
         print(f"✅ App Icon Complete: {success_count}/{len(CONFIG['icon_sizes'])} sizes")
         return success_count == len(CONFIG["icon_sizes"])
@@ -324,67 +563,106 @@ class EnhancedAIGenerator:
             "victory": CONFIG["prompts"]["screenshot_victory"]
         }
         
-        generated_count = 0
+        # マスターはデバイス群に最も近いネイティブ比率で生成し、引き伸ばさずに切り出す
+        device_sizes = {
+            device: (size_config["width"], size_config["height"])
+            for device, size_config in CONFIG["screenshot_sizes"].items()
+        }
+        aspect = target_aspect(device_sizes.values())
         
+        # マスター画像生成を並行実行
+        jobs = []
         for name, prompt in screenshots.items():
             print(f"🎨 Generating {name} screenshot...")
-            
-            # マスター画像生成 (1024x1024 -> 各デバイスサイズに変換)
-            master_filename = f"screenshot_{name}_master.png"
-            
-            if self.available_service == "openai":
-                master_path = self.generate_with_openai(prompt, master_filename)
-            elif self.available_service == "stability":
-                master_path = self.generate_with_stability(prompt, master_filename)
-            
-            if master_path:
-                # 各デバイスサイズに変換
-                for device, size_config in CONFIG["screenshot_sizes"].items():
+            jobs.append((name, "auto", prompt, f"screenshot_{name}_master.png"))
+        
+        generators = dict(self.service_generators(), auto=functools.partial(self.registry.generate, aspect=aspect))
+        engine = AsyncGenerationEngine(generators, CONFIG["generation_concurrency"])
+        
+        # 完了したマスターから順にプロセスプールでデバイスサイズへ変換
+        with VariantRenderer(
+            CONFIG["render_workers"], CONFIG["encoder_profile"], manifest=self.manifest
+        ) as renderer:
+            def on_master(name, master_path):
+                if not master_path:
+                    return
+                # 注目領域の中心を一度だけ求め、各デバイスは1回の切り出し+拡縮で書き出す
+                crops = plan_screenshot_crops(master_path, device_sizes.values())
+                for device, target_size in device_sizes.items():
                     device_filename = f"screenshot_{name}_{device}.png"
                     device_path = screenshot_dir / device_filename
                     
-                    target_size = (size_config["width"], size_config["height"])
-                    if self.resize_image(master_path, device_path, target_size):
-                        generated_count += 1
+                    renderer.submit(master_path, device_path, target_size, crops[target_size])
+            
+            engine.run(jobs, on_master)
+            results = renderer.wait()
         
+        generated_count = sum(results.values())
         total_expected = len(screenshots) * len(CONFIG["screenshot_sizes"])
         print(f"✅ Screenshots Complete: {generated_count}/{total_expected} files")
         
         return generated_count > 0
     
-    def run_quality_check(self):
-        """完全品質チェック"""
+    def run_quality_check(self, reuse=True):
+        """完全品質チェック（reuse=False なら保存済みのレポートを使わない）"""
+        with TRACER.span("quality_check"):
+            return self._run_quality_check(reuse)
+    
+    def _run_quality_check(self, reuse=True):
+        """品質チェック本体"""
         print("🔍 Running comprehensive quality check...")
         
-        checks = []
-        
-        # アイコンチェック
+        # アイコン: サイズ・1024の透明度・プロファイル・無地・マスター縮小とのSSIM
         icon_dir = self.project_root / "ios/Runner/Assets.xcassets/AppIcon.appiconset"
-        icon_issues = 0
+        master_path = self.output_dir / "app_icon_master.png"
+        reference = str(master_path) if master_path.exists() else None
         
-        for icon_config in CONFIG["icon_sizes"]:
-            icon_path = icon_dir / icon_config["name"]
-            if icon_path.exists():
-                try:
-                    with Image.open(icon_path) as img:
-                        if img.size == icon_config["size"]:
-                            checks.append(f"✅ {icon_config['name']}: Perfect")
-                        else:
-                            checks.append(f"⚠️ {icon_config['name']}: Size mismatch")
-                            icon_issues += 1
-                except Exception as e:
-                    checks.append(f"❌ {icon_config['name']}: Corrupted")
-                    icon_issues += 1
-            else:
-                checks.append(f"❌ {icon_config['name']}: Missing")
-                icon_issues += 1
+        specs = [
+            {
+                "path": icon_dir / icon_config["name"],
+                "kind": "icon",
+                "size": icon_config["size"],
+                "opaque": icon_config["size"] in OPAQUE_SIZES,
+                "reference": reference,
+            }
+            for icon_config in CONFIG["icon_sizes"]
+        ]
         
-        # スクリーンショットチェック
+        # スクリーンショット: プロファイル・無地・バンディング
         screenshot_dir = self.output_dir / "screenshots"
-        screenshot_count = 0
-        if screenshot_dir.exists():
-            screenshots = list(screenshot_dir.glob("*.png"))
-            screenshot_count = len(screenshots)
+        screenshot_paths = sorted(screenshot_dir.glob("*.png")) if screenshot_dir.exists() else []
+        specs += [{"path": path, "kind": "screenshot"} for path in screenshot_paths]
+        screenshot_count = len(screenshot_paths)
+        
+        # 検査対象・参照・閾値が前回と同じなら保存済みのレポートを使う
+        report_path = self.output_dir / CONFIG["quality_report"]
+        inputs = validation_inputs(specs, self.manifest)
+        report = load_report(report_path)
+        reused = reuse and bool(report) and report.get("inputs") == inputs
+        if reused:
+            print(f"⏭️ Up to date: {report_path.name}")
+        else:
+            report = validate_assets(specs)
+            report["inputs"] = inputs
+            write_report(report, report_path)
+        
+        checks = []
+        icon_issues = 0
+        for result in report["assets"]:
+            name = Path(result["path"]).name
+            errors = [issue for issue in result["issues"] if issue["severity"] == "error"]
+            if result["kind"] == "icon" and errors:
+                icon_issues += 1
+            if errors:
+                checks.append(f"❌ {name}: {'; '.join(issue['message'] for issue in errors)}")
+            elif result["issues"]:
+                checks.append(f"⚠️ {name}: {'; '.join(issue['message'] for issue in result['issues'])}")
+            else:
+                checks.append(f"✅ {name}: Perfect")
+        
+        # 問題のあるものから表示
+        checks.sort(key=lambda check: not check.startswith(("❌", "⚠️")))
+        if screenshot_count:
             checks.append(f"✅ Screenshots: {screenshot_count} files generated")
         
         # サマリー
@@ -401,16 +679,36 @@ class EnhancedAIGenerator:
         print(f"\n🎯 Summary:")
         print(f"   Icons: {len(CONFIG['icon_sizes']) - icon_issues}/{len(CONFIG['icon_sizes'])} perfect")
         print(f"   Screenshots: {screenshot_count} generated")
-        print(f"   Overall: {'PASS' if icon_issues == 0 and screenshot_count > 0 else 'NEEDS ATTENTION'}")
+        timing = "reused" if reused else f"{report['summary']['seconds'] * 1000:.0f}ms"
+        print(f"   Errors: {report['summary']['errors']}, Warnings: {report['summary']['warnings']} ({timing})")
+        print(f"   Report: {report_path}")
+        
+        passed = report["summary"]["passed"] and screenshot_count > 0
+        print(f"   Overall: {'PASS' if passed else 'NEEDS ATTENTION'}")
         
-        return icon_issues == 0 and screenshot_count > 0
+        return passed
 
 def main():
     """メイン実行"""
     print("🚀 Enhanced AI Asset Generation System")
     print("=" * 60)
     
-    generator = EnhancedAIGenerator()
+    # --no-cache: キャッシュを使わず必ず再生成 / --local: APIを使わず合成画像で実行
+    # --trace <path>: ステージ毎のスパンを JSON Lines (.jsonl) / Chrome trace (.json) で出力
+    trace_path = trace_path_from_args(sys.argv[1:])
+    args = [arg for arg in strip_trace_args(sys.argv[1:]) if arg not in ("--no-cache", "--local")]
+    use_cache = "--no-cache" not in sys.argv[1:]
+    if "--local" in sys.argv[1:]:
+        os.environ["ASSET_LOCAL_PROVIDER"] = "1"
+    
+    # エンコーダプロファイルは不正な環境変数でもimportが失敗しないよう実行時に決定
+    try:
+        CONFIG["encoder_profile"] = resolve_profile()
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    
+    generator = EnhancedAIGenerator(use_cache=use_cache)
     
     if not generator.available_service:
         print("\n💡 Setup Instructions:")
@@ -421,8 +719,8 @@ def main():
     
     # 実行モード選択
     mode = "all"  # デフォルト
-    if len(sys.argv) > 1:
-        mode = sys.argv[1]
+    if args:
+        mode = args[0]
     
     print(f"🔧 Using: {generator.available_service.upper()}")
     print(f"🎯 Mode: {mode}")
@@ -442,6 +740,13 @@ def main():
     
     # 品質チェック
     generator.run_quality_check()
+    generator.cache.print_stats()
+    ENCODE_STATS.print_report(load_app_size_budget(CONFIG["performance_config"]))
+    for service_name, stats in generator.registry.summary().items():
+        if stats["calls"]:
+            print(f"📡 {service_name}: p50={stats['p50_seconds']}s, "
+                  f"errors={stats['error_rate']:.0%}, calls={stats['calls']}")
+    finish_trace(trace_path)
     
     if success:
         print("\n🎉 GENERATION COMPLETED SUCCESSFULLY!")
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Asset Pipeline Benchmark
+Pythonアセット生成ツールの性能を固定の合成入力で計測し、ベースラインと比較する
+
+使用方法:
+    python3 scripts/asset_benchmark.py                    # 全ケースを計測して比較
+    python3 scripts/asset_benchmark.py --update-baseline  # 結果をベースラインとして保存
+    python3 scripts/asset_benchmark.py --require-baseline # ベースラインが無ければ失敗 (CI用)
+    python3 scripts/asset_benchmark.py --cases icon_set,string_scan --repeat 5
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+CONFIG_FILE = PROJECT_ROOT / "performance_config.yaml"
+
+# performance_config.yaml が読めない場合の既定値
+DEFAULT_SETTINGS = {
+    "results_dir": "performance_results",
+    "baseline_file": "performance_results/asset_benchmark_baseline.json",
+    "repeat": 3,
+    "thresholds": {
+        "wall_time_regression_percent": 20,
+        "cpu_time_regression_percent": 25,
+        "peak_rss_regression_percent": 20,
+        "files_per_second_regression_percent": 20,
+        "noise_floor_seconds": 0.05,
+    },
+    "synthetic_inputs": {
+        "seed": 0,
+        "master_size": 1024,
+        "dart_files": 200,
+        "strings_per_file": 20,
+    },
+}
+
+CASES = ["resize_image", "icon_set", "screenshot_variants", "quality_check", "string_scan"]
+
+
+def load_settings():
+    """performance_config.yaml の asset_pipeline_benchmark セクションを読み込み"""
+    settings = json.loads(json.dumps(DEFAULT_SETTINGS))
+    try:
+        import yaml
+    except ImportError:
+        print("⚠️ PyYAML not installed, using default benchmark thresholds")
+        return settings
+
+    try:
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            section = (yaml.safe_load(f) or {}).get("asset_pipeline_benchmark", {})
+    except OSError as e:
+        print(f"⚠️ Cannot read {CONFIG_FILE.name}: {e}")
+        return settings
+
+    for key, value in section.items():
+        if isinstance(value, dict):
+            settings.setdefault(key, {}).update(value)
+        else:
+            settings[key] = value
+    return settings
+
+
+# ---------------------------------------------------------------------------
+# 合成入力
+# ---------------------------------------------------------------------------
+
+def make_master(path, inputs):
+    """シード固定のマスター画像"""
+    from local_provider import LocalImageProvider
+    from ai_web_enhanced_generator import CONFIG
+
+    size = (inputs["master_size"], inputs["master_size"])
+    provider = LocalImageProvider(path.parent, size=size, seed=inputs["seed"])
+    img = provider.synthesize(CONFIG["prompts"]["app_icon"], size, random.Random(inputs["seed"]))
+    img.save(path, "PNG")
+    return path
+
+
+def make_dart_tree(root, inputs):
+    """シード固定のDartソースツリー"""
+    rng = random.Random(inputs["seed"])
+    words = ["はじめる", "設定", "閉じる", "Start", "Settings", "Hint", "Inventory",
+             "ゲームクリア", "Try again", "アイテム", "Escape Master", "Loading"]
+    lib_dir = root / "lib"
+
+    for index in range(inputs["dart_files"]):
+        file_path = lib_dir / f"feature_{index % 10}" / f"widget_{index}.dart"
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        lines = ["import 'package:flutter/material.dart';", ""]
+        for line_index in range(inputs["strings_per_file"]):
+            text = rng.choice(words)
+            kind = line_index % 4
+            if kind == 0:
+                lines.append(f"    Text('{text}'),")
+            elif kind == 1:
+                lines.append(f"    title: \"{text} {line_index}\",")
+            elif kind == 2:
+                lines.append(f"    // {text}")
+            else:
+                lines.append(f"    final key{line_index} = 'assets/images/{line_index}.png';")
+        file_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    return lib_dir
+
+
+# ---------------------------------------------------------------------------
+# 計測ケース（子プロセス内で実行）
+# ---------------------------------------------------------------------------
+
+def prepare_case(name, workdir, inputs):
+    """合成入力を準備し、計測対象の処理（処理ファイル数を返す関数）を返す"""
+    workdir = Path(workdir)
+    os.environ["ASSET_PROJECT_ROOT"] = str(workdir)
+    (workdir / "generated_assets").mkdir(exist_ok=True)
+
+    from ai_web_enhanced_generator import CONFIG, EnhancedAIGenerator
+    from asset_pipeline import build_icon_set, plan_screenshot_crops, render_variants
+
+    master = make_master(workdir / "master.png", inputs)
+    icon_dir = workdir / "ios/Runner/Assets.xcassets/AppIcon.appiconset"
+    icon_dir.mkdir(parents=True, exist_ok=True)
+    screenshot_dir = workdir / "generated_assets" / "screenshots"
+    screenshot_dir.mkdir(parents=True, exist_ok=True)
+
+    # API検出を伴う __init__ は通さずにリサイズ・品質チェックだけを使う
+    generator = EnhancedAIGenerator.__new__(EnhancedAIGenerator)
+    generator.project_root = workdir
+    generator.output_dir = workdir / "generated_assets"
+    generator.manifest = None
+
+    if name == "resize_image":
+        def run():
+            for icon_config in CONFIG["icon_sizes"]:
+                generator.resize_image(master, icon_dir / icon_config["name"], icon_config["size"])
+            return len(CONFIG["icon_sizes"])
+        return run
+
+    if name == "icon_set":
+        def run():
+            build_icon_set(master, icon_dir, CONFIG["icon_sizes"])
+            return len(CONFIG["icon_sizes"])
+        return run
+
+    if name == "screenshot_variants":
+        device_sizes = {
+            device: (size_config["width"], size_config["height"])
+            for device, size_config in CONFIG["screenshot_sizes"].items()
+        }
+        crops = plan_screenshot_crops(master, device_sizes.values())
+        jobs = [
+            (master, screenshot_dir / f"screenshot_bench_{device}.png", size, crops[size])
+            for device, size in device_sizes.items()
+        ]
+
+        def run():
+            render_variants(jobs, CONFIG["render_workers"])
+            return len(jobs)
+        return run
+
+    if name == "quality_check":
+        build_icon_set(master, icon_dir, CONFIG["icon_sizes"])
+
+        def run():
+            # 毎回の検査コストを測るため保存済みのレポートは使わない
+            generator.run_quality_check(reuse=False)
+            return len(CONFIG["icon_sizes"])
+        return run
+
+    if name == "string_scan":
+        sys.path.insert(0, str(PROJECT_ROOT / "tools"))
+        from string_migration import StringMigrationTool
+
+        make_dart_tree(workdir, inputs)
+        # 毎回の解析コストを測るためスキャンキャッシュは使わない
+        tool = StringMigrationTool(str(workdir), cache_file=None)
+
+        def run():
+            tool.scan_hardcoded_strings()
+            return inputs["dart_files"]
+        return run
+
+    raise ValueError(f"unknown case: {name}")
+
+
+def peak_rss_mb():
+    """プロセス（と子プロセス）の最大RSS"""
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux は KB, macOS は bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return max(self_rss, child_rss) / divisor
+
+
+def measure_in_child(name, workdir, inputs):
+    """子プロセスのエントリポイント：ケースを計測してJSONを標準出力へ"""
+    # 各ツールの進捗表示は結果JSONと混ざらないよう捨てる
+    sys.stdout = open(os.devnull, "w")
+    run = prepare_case(name, workdir, inputs)
+
+    start_wall = time.perf_counter()
+    start_self = resource.getrusage(resource.RUSAGE_SELF)
+    start_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    files = run()
+
+    wall = time.perf_counter() - start_wall
+    end_self = resource.getrusage(resource.RUSAGE_SELF)
+    end_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = sum(
+        (end.ru_utime - start.ru_utime) + (end.ru_stime - start.ru_stime)
+        for start, end in ((start_self, end_self), (start_children, end_children))
+    )
+
+    sys.stdout = sys.__stdout__
+    print(json.dumps({
+        "wall_time_seconds": wall,
+        "cpu_time_seconds": cpu,
+        "peak_rss_mb": peak_rss_mb(),
+        "files": files,
+        "files_per_second": files / wall if wall > 0 else 0.0,
+    }))
+
+
+def measure(name, inputs, repeat):
+    """ケースを repeat 回、新しいプロセスと作業ディレクトリで計測し中央値を返す"""
+    samples = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix=f"asset_bench_{name}_") as workdir:
+            completed = subprocess.run(
+                [sys.executable, str(Path(__file__).resolve()), "--run-case", name,
+                 "--workdir", workdir, "--inputs", json.dumps(inputs)],
+                capture_output=True, text=True, cwd=SCRIPT_DIR
+            )
+            if completed.returncode != 0:
+                raise RuntimeError(f"{name} failed:\n{completed.stderr}")
+            samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    return {
+        key: statistics.median(sample[key] for sample in samples)
+        for key in samples[0]
+    }
+
+
+# ---------------------------------------------------------------------------
+# ベースライン比較
+# ---------------------------------------------------------------------------
+
+# 指標 -> (閾値キー, 大きいほど良いか)
+METRICS = {
+    "wall_time_seconds": ("wall_time_regression_percent", False),
+    "cpu_time_seconds": ("cpu_time_regression_percent", False),
+    "peak_rss_mb": ("peak_rss_regression_percent", False),
+    "files_per_second": ("files_per_second_regression_percent", True),
+}
+
+
+def compare(results, baseline, thresholds):
+    """閾値を超えて悪化した指標の一覧を返す"""
+    regressions = []
+    for case, metrics in results.items():
+        base = baseline.get(case)
+        if not base:
+            continue
+        for metric, (threshold_key, higher_is_better) in METRICS.items():
+            old, new = base.get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (old - new) / old * 100 if higher_is_better else (new - old) / old * 100
+            if change <= thresholds[threshold_key]:
+                continue
+            # 時間系の指標は数十ms程度の揺らぎを回帰とみなさない
+            wall_delta = metrics["wall_time_seconds"] - base["wall_time_seconds"]
+            if metric != "peak_rss_mb" and wall_delta < thresholds["noise_floor_seconds"]:
+                continue
+            regressions.append(f"{case}.{metric}: {old:.3f} -> {new:.3f} ({change:+.1f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Python asset pipeline")
+    parser.add_argument("--cases", help="Comma separated cases (default: all)")
+    parser.add_argument("--repeat", type=int, help="Runs per case (median is reported)")
+    parser.add_argument("--update-baseline", action="store_true", help="Save results as the new baseline")
+    parser.add_argument("--require-baseline", action="store_true",
+                        help="Fail instead of warning when no baseline exists (for CI)")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--inputs", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        measure_in_child(args.run_case, args.workdir, json.loads(args.inputs))
+        return True
+
+    settings = load_settings()
+    cases = args.cases.split(",") if args.cases else CASES
+    repeat = args.repeat or settings["repeat"]
+
+    print("⏱️ Asset Pipeline Benchmark")
+    print("=" * 50)
+
+    results = {}
+    for case in cases:
+        metrics = measure(case, settings["synthetic_inputs"], repeat)
+        results[case] = metrics
+        print(f"✅ {case}: {metrics['wall_time_seconds']:.3f}s wall, "
+              f"{metrics['cpu_time_seconds']:.3f}s cpu, {metrics['peak_rss_mb']:.1f} MB, "
+              f"{metrics['files_per_second']:.1f} files/s")
+
+    results_dir = PROJECT_ROOT / settings["results_dir"]
+    results_dir.mkdir(parents=True, exist_ok=True)
+    result_file = results_dir / f"asset_benchmark_{datetime.now():%Y%m%d_%H%M%S}.json"
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "platform": sys.platform,
+        "python_version": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "inputs": settings["synthetic_inputs"],
+        "results": results,
+    }
+    with open(result_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📁 Results: {result_file}")
+
+    baseline_file = PROJECT_ROOT / settings["baseline_file"]
+    if args.update_baseline:
+        with open(baseline_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📌 Baseline updated: {baseline_file}")
+        return True
+
+    if not baseline_file.exists():
+        if args.require_baseline:
+            print(f"❌ No baseline found: {baseline_file}")
+            print("   Run with --update-baseline on the CI runner and commit the file.")
+            return False
+        print("⚠️ No baseline found. Run with --update-baseline to create one.")
+        return True
+
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = json.load(f).get("results", {})
+
+    regressions = compare(results, baseline, settings["thresholds"])
+    if regressions:
+        print("\n❌ Performance regressions:")
+        for regression in regressions:
+            print(f"   {regression}")
+        return False
+
+    print("\n✅ No regressions against baseline")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Asset Downloader
+keep-alive付き共有セッションによるストリーミング・再開可能ダウンロード
+"""
+
+import hashlib
+import os
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class DownloadVerificationError(Exception):
+    """サイズ・チェックサム不一致"""
+
+
+class IncompleteDownloadError(Exception):
+    """途中で切断された（Rangeで再開可能）"""
+
+
+class AssetDownloader:
+    """チャンク単位で一時ファイルに書き込み、Rangeで再開・リトライする"""
+
+    def __init__(self, retries=3, backoff=1.0, timeout=30, chunk_size=64 * 1024, pool_size=8):
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+
+        # 同一CDNホストへの接続 (TLS) を使い回す
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def download(self, url, target_path, expected_size=None, sha256=None):
+        """url を target_path に保存（途中ファイルは .part、完了時にアトミックにリネーム）"""
+        target_path = Path(target_path)
+        part_path = target_path.with_name(target_path.name + ".part")
+
+        for attempt in range(self.retries + 1):
+            try:
+                total = self._fetch(url, part_path, expected_size)
+                self._verify(part_path, total, sha256)
+                os.replace(part_path, target_path)
+                return str(target_path)
+
+            except IncompleteDownloadError as e:
+                error = e
+            except DownloadVerificationError as e:
+                # 壊れた途中ファイルは再開せず最初から取り直す
+                part_path.unlink(missing_ok=True)
+                error = e
+            except (requests.RequestException, OSError) as e:
+                error = e
+
+            if attempt < self.retries:
+                delay = self.backoff * (2 ** attempt)
+                print(f"⚠️ Download retry {attempt + 1}/{self.retries} in {delay:.1f}s: {error}")
+                time.sleep(delay)
+
+        raise error
+
+    def _fetch(self, url, part_path, expected_size):
+        """途中ファイルの続きから取得し、期待される総バイト数を返す"""
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        # 圧縮転送だと Content-Length / Range がバイト数と一致しないため無効化
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+
+        with self.session.get(url, stream=True, timeout=self.timeout, headers=headers) as response:
+            if response.status_code == 416:
+                # 既に全体を取得済み（またはサーバ側で変化）
+                return expected_size or offset
+
+            response.raise_for_status()
+
+            if offset and response.status_code != 206:
+                # Range非対応サーバは先頭から
+                offset = 0
+
+            total = expected_size
+            if total is None:
+                content_range = response.headers.get("Content-Range", "")
+                if "/" in content_range and not content_range.endswith("/*"):
+                    total = int(content_range.rsplit("/", 1)[1])
+                elif "Content-Length" in response.headers:
+                    total = offset + int(response.headers["Content-Length"])
+
+            with open(part_path, "ab" if offset else "wb") as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if chunk:
+                        f.write(chunk)
+
+        return total
+
+    def _verify(self, part_path, total, sha256):
+        """サイズ・チェックサムを検証"""
+        size = part_path.stat().st_size
+        if total is not None and size < total:
+            raise IncompleteDownloadError(f"received {size} of {total} bytes")
+        if total is not None and size != total:
+            raise DownloadVerificationError(f"size mismatch: {size} != {total}")
+
+        if sha256:
+            digest = hashlib.sha256()
+            with open(part_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            if digest.hexdigest() != sha256:
+                raise DownloadVerificationError("checksum mismatch")
+
+    def close(self):
+        """セッションを閉じる"""
+        self.session.close()
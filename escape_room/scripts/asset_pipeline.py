@@ -0,0 +1,584 @@
+#!/usr/bin/env python3
+"""
+Asset Pipeline Helpers
+生成済みマスター画像からApp Store用アセットを書き出す共通処理
+"""
+
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from PIL import Image, ImageFilter, ImageStat
+
+from asset_tracing import TRACER
+
+# App Store要件：透明度を除去するサイズ
+OPAQUE_SIZES = {(1024, 1024)}
+
+
+def flatten_alpha(img, background=(255, 255, 255)):
+    """透明度を除去（App Store要件）"""
+    if img.mode != 'RGBA':
+        return img.convert('RGB')
+
+    flat = Image.new('RGB', img.size, background)
+    flat.paste(img, mask=img.split()[-1])
+    return flat
+
+
+# PNGエンコーダプロファイル
+#   fast:     開発中の反復用（zlib最速、探索なし）
+#   balanced: CI・プレビュー用（zlib既定レベル）
+#   store:    リリース用（zlib最大 + optimize探索、必要ならパレット化）
+ENCODER_PROFILES = {
+    "fast": {"compress_level": 1, "optimize": False},
+    "balanced": {"compress_level": 6, "optimize": False},
+    "store": {"compress_level": 9, "optimize": True},
+}
+
+# ビルドターゲット毎の既定プロファイル
+PROFILE_BY_TARGET = {"dev": "fast", "ci": "balanced", "release": "store"}
+
+
+def resolve_profile(profile=None, target=None, quantize=None):
+    """エンコーダ設定を決定（ASSET_ENCODER_PROFILE > ASSET_BUILD_TARGET の順、既定は開発用の dev）"""
+    profile = profile or os.getenv("ASSET_ENCODER_PROFILE")
+    if not profile:
+        target = target or os.getenv("ASSET_BUILD_TARGET", "dev")
+        if target not in PROFILE_BY_TARGET:
+            raise ValueError(f"unknown build target: {target} (expected {', '.join(PROFILE_BY_TARGET)})")
+        profile = PROFILE_BY_TARGET[target]
+    if profile not in ENCODER_PROFILES:
+        raise ValueError(f"unknown encoder profile: {profile} (expected {', '.join(ENCODER_PROFILES)})")
+
+    # フラットなイラスト向けのパレット化 (ASSET_PNG_QUANTIZE=<色数>、storeのみ)
+    if quantize is None:
+        quantize = int(os.getenv("ASSET_PNG_QUANTIZE", "0"))
+    return dict(ENCODER_PROFILES[profile], name=profile,
+                quantize=quantize if profile == "store" else 0)
+
+
+def encode_png(img, profile=None):
+    """PNGをメモリ上でエンコード"""
+    profile = profile or resolve_profile()
+    if profile["quantize"]:
+        # RGBAはFASTOCTREEのみ対応。フラットな絵はディザ無しの方が小さく綺麗
+        method = Image.Quantize.FASTOCTREE if img.mode == 'RGBA' else Image.Quantize.MEDIANCUT
+        img = img.quantize(colors=profile["quantize"], method=method, dither=Image.Dither.NONE)
+
+    buffer = io.BytesIO()
+    img.save(buffer, 'PNG', optimize=profile["optimize"], compress_level=profile["compress_level"])
+    return buffer.getvalue()
+
+
+def save_png(img, target_path, profile=None):
+    """エンコードして書き出し、サイズと所要時間を返す"""
+    start = time.perf_counter()
+    data = encode_png(img, profile)
+    Path(target_path).write_bytes(data)
+    return {"bytes": len(data), "seconds": time.perf_counter() - start}
+
+
+class EncodeStats:
+    """プロファイル毎の書き出しバイト数・エンコード時間を集計"""
+
+    def __init__(self):
+        self.totals = {}
+        self.lock = threading.Lock()
+
+    def record(self, profile, result, files=1):
+        """1回のエンコード結果（同じデータを files 個書き出した）を加算"""
+        with self.lock:
+            entry = self.totals.setdefault(profile["name"], {"files": 0, "bytes": 0, "seconds": 0.0})
+            entry["files"] += files
+            entry["bytes"] += result["bytes"] * files
+            entry["seconds"] += result["seconds"]
+
+    def print_report(self, budget_mb=None):
+        """集計結果を表示（budget_mb を渡すとアプリサイズ予算に対する割合も表示）"""
+        with self.lock:
+            totals = dict(self.totals)
+        if not totals:
+            return
+
+        print("🗜️ PNG encoding:")
+        for name, entry in totals.items():
+            line = (f"   {name}: {entry['files']} files, {entry['bytes'] / 1024:.1f}KB, "
+                    f"{entry['seconds']:.2f}s")
+            if budget_mb:
+                line += f" ({entry['bytes'] / (budget_mb * 1024 * 1024):.1%} of {budget_mb}MB app_size budget)"
+            print(line)
+
+
+ENCODE_STATS = EncodeStats()
+
+
+def format_encode(result):
+    """ログ用の '12.3KB, 45ms'"""
+    return f"{result['bytes'] / 1024:.1f}KB, {result['seconds'] * 1000:.0f}ms"
+
+
+def load_app_size_budget(config_path, key="ios_target_mb"):
+    """performance_config.yaml の performance_targets.app_size から予算(MB)を読み込み"""
+    try:
+        import yaml
+    except ImportError:
+        return None
+
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+    except (OSError, ValueError):
+        return None
+    return config.get("performance_targets", {}).get("app_size", {}).get(key)
+
+
+def file_digest(path):
+    """ファイル内容のSHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encoder_settings(size, profile, method="lanczos", box=None):
+    """出力ファイルのエンコーダ設定（マニフェスト比較用）"""
+    settings = {
+        "format": "PNG",
+        "profile": profile,
+        "flatten": tuple(size) in OPAQUE_SIZES,
+        "method": method,
+    }
+    if box is not None:
+        settings["box"] = [round(value, 2) for value in box]
+    return settings
+
+
+class BuildManifest:
+    """出力毎にソースハッシュ・サイズ・エンコーダ設定を記録し、古い出力だけを再生成する"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.records = self._load()
+        self.digests = {}
+
+    def source_hash(self, source_path):
+        """ソースのハッシュ（同一実行内は mtime/size でメモ化）"""
+        stat = os.stat(source_path)
+        memo_key = (str(source_path), stat.st_mtime_ns, stat.st_size)
+        if memo_key not in self.digests:
+            self.digests[memo_key] = file_digest(source_path)
+        return self.digests[memo_key]
+
+    def signature(self, source_path, size, encoder):
+        """出力を決定する入力の組"""
+        return {
+            "source": self.source_hash(source_path),
+            "size": list(size),
+            "encoder": encoder,
+        }
+
+    def is_fresh(self, target_path, signature):
+        """記録と一致し、出力が書き換えられていなければ最新"""
+        record = self.records.get(str(target_path))
+        if record is None or record["signature"] != signature:
+            return False
+
+        try:
+            stat = os.stat(target_path)
+        except OSError:
+            return False
+        return record["bytes"] == stat.st_size and record["mtime_ns"] == stat.st_mtime_ns
+
+    def record(self, target_path, signature):
+        """生成した出力を記録"""
+        stat = os.stat(target_path)
+        self.records[str(target_path)] = {
+            "signature": signature,
+            "bytes": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    def save(self):
+        """マニフェストを書き出し"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.records, f, indent=2, sort_keys=True)
+        tmp_path.replace(self.path)
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+
+class ResizePyramid:
+    """マスター画像を一度だけ保持し、半分ずつの縮小カスケードを共有する"""
+
+    def __init__(self, master):
+        # 大きい順の中間画像
+        self.levels = [master]
+
+    def source_for(self, size):
+        """目標サイズの2倍以上ある最小の中間画像を返す"""
+        width, height = size
+
+        # 必要になった段だけ遅延生成
+        smallest = self.levels[-1]
+        while smallest.width // 2 >= width * 2 and smallest.height // 2 >= height * 2:
+            half = (smallest.width // 2, smallest.height // 2)
+            smallest = smallest.resize(half, Image.Resampling.LANCZOS)
+            self.levels.append(smallest)
+
+        for level in reversed(self.levels):
+            if level.width >= width * 2 and level.height >= height * 2:
+                return level
+        return self.levels[0]
+
+    def render(self, size):
+        """目標サイズの画像を生成"""
+        with TRACER.span("resize", size=size):
+            source = self.source_for(size)
+            img = source if source.size == size else source.resize(size, Image.Resampling.LANCZOS)
+
+        if size in OPAQUE_SIZES:
+            with TRACER.span("flatten", size=size):
+                img = flatten_alpha(img)
+        return img
+
+
+def build_icon_set(master_path, icon_dir, icon_sizes, profile=None, manifest=None):
+    """マスターを一度だけデコードしてアイコン全サイズを生成"""
+    icon_dir = Path(icon_dir)
+    profile = profile or resolve_profile()
+    results = {}
+
+    # 同一サイズは一度だけ描画する (40x40, 120x120 など)
+    names_by_size = {}
+    for icon_config in icon_sizes:
+        names_by_size.setdefault(tuple(icon_config["size"]), []).append(icon_config["name"])
+
+    # マニフェストと一致する出力はスキップ
+    signatures = {}
+    if manifest is not None:
+        for size, names in list(names_by_size.items()):
+            signature = manifest.signature(master_path, size, encoder_settings(size, profile, "pyramid"))
+            fresh = [name for name in names if manifest.is_fresh(icon_dir / name, signature)]
+            for name in fresh:
+                results[name] = True
+            stale = [name for name in names if name not in fresh]
+            if stale:
+                names_by_size[size] = stale
+                signatures[size] = signature
+            else:
+                del names_by_size[size]
+
+        if results:
+            print(f"⏭️ Up to date: {len(results)} icons")
+
+    if not names_by_size:
+        return results
+
+    icon_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        with TRACER.span("open", path=master_path):
+            img = Image.open(master_path)
+            img.load()
+        with TRACER.span("convert", mode='RGBA'):
+            master = img.convert('RGBA')
+        img.close()
+    except Exception as e:
+        print(f"❌ Master decode failed: {e}")
+        for names in names_by_size.values():
+            for name in names:
+                results[name] = False
+        return results
+
+    pyramid = ResizePyramid(master)
+
+    # 大きいサイズから処理してカスケードを順に伸ばす
+    for size in sorted(names_by_size, key=lambda s: s[0] * s[1], reverse=True):
+        names = names_by_size[size]
+        try:
+            img = pyramid.render(size)
+            with TRACER.span("save", size=size, files=len(names), profile=profile["name"]):
+                start = time.perf_counter()
+                data = encode_png(img, profile)
+                for name in names:
+                    (icon_dir / name).write_bytes(data)
+                encoded = {"bytes": len(data), "seconds": time.perf_counter() - start}
+            ENCODE_STATS.record(profile, encoded, files=len(names))
+            for name in names:
+                if manifest is not None:
+                    manifest.record(icon_dir / name, signatures[size])
+                results[name] = True
+            print(f"✅ Resized: {', '.join(names)} ({size[0]}x{size[1]}, {format_encode(encoded)})")
+        except Exception as e:
+            print(f"❌ Resize failed ({size[0]}x{size[1]}): {e}")
+            for name in names:
+                results[name] = False
+
+    if manifest is not None:
+        manifest.save()
+    return results
+
+
+def render_variant(source_path, target_path, size, profile=None, box=None):
+    """リサイズ・透明度除去・PNG保存を1ファイル分実行し、エンコード結果を返す（box: ソース上の切り出し範囲）"""
+    with Image.open(source_path) as img:
+        with TRACER.span("open", path=source_path):
+            img.load()
+        if img.mode != 'RGBA':
+            with TRACER.span("convert", mode='RGBA'):
+                img = img.convert('RGBA')
+        # 切り出しと拡縮を1回のフィルタで実行
+        with TRACER.span("resize", size=size):
+            img = img.resize(size, Image.Resampling.LANCZOS, box=box)
+
+    if size in OPAQUE_SIZES:
+        with TRACER.span("flatten", size=size):
+            img = flatten_alpha(img)
+
+    with TRACER.span("save", path=target_path, profile=(profile or {}).get("name")):
+        return save_png(img, target_path, profile)
+
+
+def _render_job(job):
+    """プロセスプール用ラッパー（例外は文字列で返し、ワーカーのスパンも親へ返す）"""
+    source_path, target_path, size, profile, box, trace = job
+    if trace:
+        TRACER.enable()
+    # fork したワーカーは親の記録済みイベントを引き継ぐため、このジョブの分だけを返す
+    TRACER.drain()
+    try:
+        return render_variant(source_path, target_path, size, profile, box), None, TRACER.drain()
+    except Exception as e:
+        return None, str(e), TRACER.drain()
+
+
+def _pool_context():
+    """スレッド実行中の親から fork しないよう、forkserver（無ければ spawn）でワーカーを起動"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class VariantRenderer:
+    """独立したリサイズ出力をプロセスプールで並列にレンダリング"""
+
+    def __init__(self, workers=None, profile=None, manifest=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.profile = profile or resolve_profile()
+        self.manifest = manifest
+        # 全出力が最新ならプロセスを起動しないよう、最初の描画が必要になった時点で作成
+        self.executor = None
+        self.pending = {}
+        self.results = {}
+        self.signatures = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def submit(self, source_path, target_path, size, box=None):
+        """レンダリングジョブを登録（プールが無い場合は即時実行）"""
+        box = tuple(box) if box is not None else None
+        job = (str(source_path), str(target_path), tuple(size), self.profile, box, TRACER.enabled)
+
+        # マニフェストと一致する出力はスキップ
+        if self.manifest is not None:
+            signature = self.manifest.signature(source_path, size, encoder_settings(size, self.profile, box=box))
+            if self.manifest.is_fresh(target_path, signature):
+                self.results[str(target_path)] = True
+                print(f"⏭️ Up to date: {Path(target_path).name}")
+                return
+            self.signatures[str(target_path)] = signature
+
+        if self.workers > 1 and self.executor is None:
+            # 生成エンジンのスレッド実行中に最初の submit が来ることがあるため fork は使わない
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+
+        if self.executor is None:
+            # 同一プロセス内ではスパンは直接記録される
+            try:
+                encoded, error = render_variant(*job[:5]), None
+            except Exception as e:
+                encoded, error = None, str(e)
+            self._record(job, encoded, error)
+        else:
+            self.pending[self.executor.submit(_render_job, job)] = job
+
+    def wait(self):
+        """全ジョブの完了を待ち、ファイル毎の成否マップを返す"""
+        for future, job in list(self.pending.items()):
+            try:
+                encoded, error, events = future.result()
+                TRACER.extend(events)
+            except Exception as e:
+                encoded, error = None, str(e)
+            self._record(job, encoded, error)
+        self.pending.clear()
+        return dict(self.results)
+
+    def close(self):
+        """プールを終了してマニフェストを保存"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        if self.manifest is not None:
+            self.manifest.save()
+
+    def _record(self, job, encoded, error):
+        _, target_path, size, profile, _, _ = job
+        ok = encoded is not None
+        self.results[target_path] = ok
+        if ok and self.manifest is not None:
+            self.manifest.record(target_path, self.signatures.pop(target_path))
+        if ok:
+            ENCODE_STATS.record(profile, encoded)
+            print(f"✅ Resized: {Path(target_path).name} ({size[0]}x{size[1]}, {format_encode(encoded)})")
+        else:
+            print(f"❌ Resize failed: {Path(target_path).name}: {error}")
+
+
+def render_variants(jobs, workers=None, profile=None, manifest=None):
+    """(source, target, size[, box]) のリストを並列レンダリングして成否マップを返す"""
+    with VariantRenderer(workers, profile, manifest) as renderer:
+        for job in jobs:
+            renderer.submit(*job)
+        return renderer.wait()
+
+
+def target_aspect(sizes):
+    """複数デバイスのアスペクト比 (幅/高さ) の幾何平均（マスターに要求する比率）"""
+    sizes = list(sizes)
+    return math.exp(sum(math.log(width / height) for width, height in sizes) / len(sizes))
+
+
+def saliency_center(img, sample=64):
+    """縮小画像のエッジ強度と平均色からの差で重み付けした重心 (0〜1の相対座標)"""
+    scale = sample / max(img.size)
+    small_size = (max(3, round(img.width * scale)), max(3, round(img.height * scale)))
+    gray = img.resize(small_size, Image.Resampling.BILINEAR, reducing_gap=2.0).convert('L')
+
+    edges = gray.filter(ImageFilter.FIND_EDGES).getdata()
+    mean = ImageStat.Stat(gray).mean[0]
+    width, height = gray.size
+
+    total = sum_x = sum_y = 0.0
+    for index, (edge, value) in enumerate(zip(edges, gray.getdata())):
+        # 外周はFIND_EDGESの境界処理で強く出るため除外
+        x, y = index % width, index // width
+        if x in (0, width - 1) or y in (0, height - 1):
+            continue
+        # 二乗して背景の僅かな差より目立つ画素を優先
+        weight = (edge + abs(value - mean)) ** 2
+        total += weight
+        sum_x += weight * (x + 0.5)
+        sum_y += weight * (y + 0.5)
+
+    if not total:
+        return 0.5, 0.5
+    return sum_x / total / width, sum_y / total / height
+
+
+def crop_box(source_size, target_size, center=(0.5, 0.5)):
+    """target_size と同じ比率でソースに収まる最大の範囲を center 付近で切り出す"""
+    source_width, source_height = source_size
+    aspect = target_size[0] / target_size[1]
+
+    width = min(source_width, source_height * aspect)
+    height = width / aspect
+
+    left = min(max(center[0] * source_width - width / 2, 0), source_width - width)
+    top = min(max(center[1] * source_height - height / 2, 0), source_height - height)
+    return (left, top, left + width, top + height)
+
+
+def plan_screenshot_crops(master_path, sizes):
+    """マスターを一度だけ解析し、デバイスサイズ毎の切り出し範囲を返す"""
+    with Image.open(master_path) as img:
+        with TRACER.span("saliency", path=master_path):
+            center = saliency_center(img)
+        source_size = img.size
+
+    return {tuple(size): crop_box(source_size, size, center) for size in sizes}
+
+
+# 候補スコアの重み
+CANDIDATE_WEIGHTS = {"palette": 0.6, "sharpness": 0.4}
+
+
+def prompt_palette(prompt):
+    """プロンプト中の #RRGGBB をRGBタプルで返す"""
+    return [
+        tuple(int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
+        for hex_color in re.findall(r'#([0-9A-Fa-f]{6})\b', prompt)
+    ]
+
+
+def score_icon_candidate(path, palette, min_size=(1024, 1024), preview_size=(20, 20)):
+    """App Store要件・パレット距離・最小サイズでのエッジ鮮明度からスコアを算出"""
+    with Image.open(path) as img:
+        rgb = img.convert('RGB')
+
+    # App Store要件（run_quality_checkと同じ：正方形かつ1024以上）
+    meets_constraints = rgb.width == rgb.height and rgb.width >= min_size[0]
+
+    # プロンプト指定色に最も近い代表色までの距離 (0=一致, 1=最遠)
+    palette_score = 0.0
+    if palette:
+        dominant = rgb.resize((64, 64), Image.Resampling.BILINEAR).quantize(colors=8).convert('RGB')
+        colors = [color for _, color in dominant.getcolors()]
+        max_distance = (3 * 255 ** 2) ** 0.5
+        distances = [
+            min(sum((a - b) ** 2 for a, b in zip(target, color)) ** 0.5 for color in colors)
+            for target in palette
+        ]
+        palette_score = 1 - sum(distances) / len(distances) / max_distance
+
+    # 20x20に縮小した時の輪郭の強さ
+    preview = rgb.resize(preview_size, Image.Resampling.LANCZOS).convert('L')
+    sharpness = ImageStat.Stat(preview.filter(ImageFilter.FIND_EDGES)).mean[0] / 255
+
+    score = CANDIDATE_WEIGHTS["palette"] * palette_score + CANDIDATE_WEIGHTS["sharpness"] * sharpness
+    return {
+        "path": str(path),
+        "meets_constraints": meets_constraints,
+        "palette": round(palette_score, 4),
+        "sharpness": round(sharpness, 4),
+        "score": round(score if meets_constraints else 0.0, 4),
+    }
+
+
+def select_best_candidate(paths, prompt):
+    """候補をローカルで採点し、最高スコアのものを返す"""
+    palette = prompt_palette(prompt)
+    scores = []
+    for path in paths:
+        try:
+            scores.append(score_icon_candidate(path, palette))
+        except Exception as e:
+            print(f"⚠️ Candidate unreadable: {Path(path).name}: {e}")
+
+    if not scores:
+        return None, []
+
+    for result in scores:
+        print(f"   🧮 {Path(result['path']).name}: score={result['score']} "
+              f"(palette={result['palette']}, sharpness={result['sharpness']})")
+
+    best = max(scores, key=lambda result: result["score"])
+    return best["path"], scores
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Asset Tracing
+生成パイプラインの各ステージ (generate / download / open / resize / save ...) を計測するスパン
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class _NullSpan:
+    """無効時に返す何もしないスパン"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """スパンを記録し、JSON Lines または Chrome trace 形式で書き出す"""
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.lock = threading.Lock()
+
+    def enable(self):
+        """記録を開始"""
+        self.enabled = True
+
+    def span(self, name, **args):
+        """with TRACER.span("resize", size=...) で区間を記録（無効時はほぼコストなし）"""
+        if not self.enabled:
+            return NULL_SPAN
+        return self._span(name, args)
+
+    @contextmanager
+    def _span(self, name, args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            event = {
+                "name": name,
+                "cat": "asset",
+                "ph": "X",
+                "ts": round(start * 1e6),
+                "dur": round((end - start) * 1e6),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {key: str(value) for key, value in args.items()},
+            }
+            with self.lock:
+                self.events.append(event)
+
+    def drain(self):
+        """記録済みイベントを取り出す（プロセスプールのワーカーから親へ返す用）"""
+        with self.lock:
+            events, self.events = self.events, []
+        return events
+
+    def extend(self, events):
+        """他プロセスで記録したイベントを取り込む"""
+        if self.enabled and events:
+            with self.lock:
+                self.events.extend(events)
+
+    def export(self, path):
+        """.jsonl ならJSON Lines、それ以外は Chrome trace (chrome://tracing, Perfetto) 形式で保存"""
+        path = Path(path)
+        with self.lock:
+            events = sorted(self.events, key=lambda event: event["ts"])
+
+        with open(path, "w", encoding="utf-8") as f:
+            if path.suffix == ".jsonl":
+                for event in events:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            else:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+        print(f"🧭 Trace exported: {path} ({len(events)} spans)")
+
+    def summary(self):
+        """ステージ毎の合計時間 (秒)"""
+        totals = {}
+        with self.lock:
+            for event in self.events:
+                totals[event["name"]] = totals.get(event["name"], 0) + event["dur"] / 1e6
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+TRACER = Tracer()
+
+
+def trace_path_from_args(argv):
+    """--trace <path> または ASSET_TRACE からトレース出力先を決め、有効ならトレーサーを開始"""
+    path = os.getenv("ASSET_TRACE")
+    if "--trace" in argv:
+        index = argv.index("--trace")
+        if index + 1 < len(argv):
+            path = argv[index + 1]
+
+    if path:
+        TRACER.enable()
+    return path
+
+
+def strip_trace_args(argv):
+    """--trace <path> を除いた引数"""
+    if "--trace" not in argv:
+        return list(argv)
+    index = argv.index("--trace")
+    return argv[:index] + argv[index + 2:]
+
+
+def finish_trace(path):
+    """トレースを書き出してステージ毎の合計を表示"""
+    if not path:
+        return
+    print("🧭 Stage totals:")
+    for name, seconds in TRACER.summary().items():
+        print(f"   {name}: {seconds:.3f}s")
+    TRACER.export(path)
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Asset Validator
+アイコン・スクリーンショットを一度だけ配列として読み込み、App Store審査で弾かれやすい項目をNumPyで一括検査
+"""
+
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+try:
+    from PIL import ImageCms
+except ImportError:  # littlecms無しでビルドされたPillow
+    ImageCms = None
+
+
+# 判定閾値
+THRESHOLDS = {
+    "blank_luma_std": 2.0,        # 輝度の標準偏差がこれ未満なら無地
+    "blank_visible_ratio": 0.01,  # 不透明画素がこれ未満なら実質空
+    "banding_step_ratio": 0.6,    # 隣接画素の輝度変化のうち目に見える小段差 (3〜12) の割合
+    "banding_flat_ratio": 0.9,    # 変化の無い隣接画素の割合（ノイズの多い絵は対象外）
+    "banding_min_pixels": 512 * 512,
+    "min_ssim": 0.90,             # 参照画像を縮小したものとの構造類似度
+    "unique_color_samples": 256 * 256,
+    "analysis_pixels": 1024 * 1024,  # 大きな画像はこの画素数以下に縮小して解析
+}
+
+# App Storeが受け付けるカラープロファイル
+ACCEPTED_PROFILES = ("srgb", "display p3")
+
+# SSIMの定数 (8bit, K1=0.01, K2=0.03) と窓サイズ
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+SSIM_WINDOW = 7
+
+# まとめて計算する1バッチの最大画素数（同じ形の画像を積み重ねる際のメモリ上限）
+BATCH_PIXELS = 16 * 1024 * 1024
+
+# ITU-R BT.601 輝度係数 (8bit固定小数点, 合計256)
+LUMA_WEIGHTS = (77, 150, 29)
+
+
+def profile_name(img):
+    """埋め込みICCプロファイルの説明（無ければ None）"""
+    icc = img.info.get("icc_profile")
+    if not icc:
+        return None
+    if ImageCms is None:
+        return "unknown"
+    try:
+        profile = ImageCms.ImageCmsProfile(io.BytesIO(icc))
+        return ImageCms.getProfileDescription(profile).strip()
+    except Exception:
+        return "unreadable"
+
+
+def _reduce_factor(size, max_pixels):
+    """画素数を max_pixels 以下にする整数の縮小率"""
+    width, height = size
+    return max(1, int(np.ceil(np.sqrt(width * height / max_pixels))))
+
+
+def load_asset(path, max_pixels=THRESHOLDS["analysis_pixels"]):
+    """1ファイルをデコードし、RGBA配列とメタデータを返す
+
+    指標は縮小しても変わらない程度の統計量なので、大きな画像（スクリーンショット）は
+    解析用に縮小した配列を返す。JPEG は draft でデコード時に縮小し、それ以外は
+    元のモードのまま reduce（面積平均）してからRGBAへ変換する。size は元の寸法
+    """
+    with Image.open(path) as img:
+        size = img.size
+        mode = img.mode
+        has_alpha = mode in ("RGBA", "LA", "PA") or (mode == "P" and "transparency" in img.info)
+        factor = _reduce_factor(size, max_pixels)
+        if factor > 1:
+            img.draft(mode, (size[0] // factor, size[1] // factor))
+        img.load()
+        icc_profile = profile_name(img)
+
+        analysed = img
+        factor = _reduce_factor(img.size, max_pixels)
+        if factor > 1:
+            if analysed.mode not in ("L", "LA", "RGB", "RGBA"):
+                analysed = analysed.convert("RGBA")
+            analysed = analysed.reduce(factor)
+        return {
+            "path": str(path),
+            "mode": mode,
+            "size": size,
+            "has_alpha": has_alpha,
+            "icc_profile": icc_profile,
+            "pixels": np.asarray(analysed.convert("RGBA")),
+        }
+
+
+def luminance(pixels):
+    """(..., H, W, 4) のRGBA配列を白背景に合成した輝度 (uint8, 整数演算のみ)"""
+    red, green, blue = LUMA_WEIGHTS
+    luma = np.multiply(pixels[..., 0], red, dtype=np.uint16)
+    luma += np.multiply(pixels[..., 1], green, dtype=np.uint16)
+    luma += np.multiply(pixels[..., 2], blue, dtype=np.uint16)
+    luma >>= 8
+
+    # 透明な画素を含む画像だけ合成する（積み重ねた配列でも不透明な画像は素通り）
+    images = luma.reshape(-1, *luma.shape[-2:])
+    alphas = pixels[..., 3].reshape(images.shape)
+    for index in np.flatnonzero(alphas.min(axis=(1, 2)) < 255):
+        alpha = alphas[index].astype(np.uint32)
+        images[index] = (images[index] * alpha + 255 * (255 - alpha)) // 255
+    return luma.astype(np.uint8)
+
+
+def unique_colors(pixels, max_samples=THRESHOLDS["unique_color_samples"]):
+    """(N, H, W, 4) の各画像のRGB色数（大きい画像は等間隔に間引いた近似値）"""
+    count, height, width = pixels.shape[:3]
+    step = max(1, int(np.ceil(np.sqrt(height * width / max_samples))))
+    rgb = pixels[:, ::step, ::step, :3].astype(np.int64)
+    # 画像番号を上位ビットに入れ、全画像まとめて一度だけ unique を取る
+    packed = (np.arange(count, dtype=np.int64)[:, None, None] << 24
+              | rgb[..., 0] << 16 | rgb[..., 1] << 8 | rgb[..., 2])
+    return np.bincount(np.unique(packed) >> 24, minlength=count)
+
+
+def histogram_metrics(hist):
+    """(N, 256) の輝度ヒストグラムから標準偏差・エントロピー・使用範囲内の未使用ビン割合・使用階調数"""
+    totals = np.maximum(hist.sum(axis=1), 1)
+    levels = np.arange(256)
+    mean = hist @ levels / totals
+    std = np.sqrt(np.maximum(hist @ (levels * levels) / totals - mean * mean, 0.0))
+
+    probabilities = hist / totals[:, None]
+    logs = np.log2(probabilities, out=np.zeros_like(probabilities), where=probabilities > 0)
+    entropy = -(probabilities * logs).sum(axis=1)
+
+    used = hist > 0
+    used_levels = used.sum(axis=1)
+    first = used.argmax(axis=1)
+    last = 255 - used[:, ::-1].argmax(axis=1)
+    span = last - first + 1
+    gap_ratio = np.where(span > 2, (span - used_levels) / span, 0.0)
+    return std, entropy, gap_ratio, used_levels
+
+
+def banding_metrics(luma):
+    """(N, H, W) の横方向の隣接輝度差から、小段差の割合と平坦な画素の割合を求める"""
+    steps = np.abs(np.diff(luma.astype(np.int16), axis=2))
+    changed = np.count_nonzero(steps, axis=(1, 2))
+    # 滑らかなグラデーションは1〜2段、輪郭は大きな段差。3〜12段が平坦部の間に並ぶのが縞
+    visible_steps = np.count_nonzero((steps >= 3) & (steps <= 12), axis=(1, 2))
+    step_ratio = np.where(changed > 0, visible_steps / np.maximum(changed, 1), 0.0)
+    flat_ratio = np.where(changed > 0, 1.0 - changed / max(steps[0].size, 1), 1.0)
+    return step_ratio, flat_ratio
+
+
+def batch_metrics(pixels):
+    """同じ形の (N, H, W, 4) 配列から、各画像の指標を一括で計算"""
+    alpha = pixels[..., 3]
+    luma = luminance(pixels)
+    visible = alpha > 0
+    visible_pixels = np.count_nonzero(visible, axis=(1, 2))
+
+    # 透明部分は背景扱いなので、無地・ヒストグラム判定は見えている画素だけで行う
+    # （見えている画素が無い画像は全画素で集計）。bincount は軸を取れないので画像毎に数える
+    hist = np.stack([
+        np.bincount((image if visible_count in (0, image.size) else image[mask]).ravel(), minlength=256)
+        for image, mask, visible_count in zip(luma, visible, visible_pixels)
+    ])
+    luma_std, entropy, gap_ratio, levels = histogram_metrics(hist)
+    luma_std = np.where(visible_pixels > 0, luma_std, 0.0)
+    step_ratio, flat_ratio = banding_metrics(luma)
+
+    return [
+        {
+            "alpha_used": bool(alpha_min < 255),
+            "visible_ratio": float(visible_count / luma[0].size),
+            "unique_colors": int(colors),
+            "luma_mean": float(mean),
+            "luma_std": float(std),
+            "histogram_entropy": float(entropy_value),
+            "histogram_gap_ratio": float(gap),
+            "tonal_levels": int(used),
+            "banding_step_ratio": float(step),
+            "flat_ratio": float(flat),
+        }
+        for alpha_min, visible_count, colors, mean, std, entropy_value, gap, used, step, flat in zip(
+            alpha.min(axis=(1, 2)), visible_pixels, unique_colors(pixels), luma.mean(axis=(1, 2)),
+            luma_std, entropy, gap_ratio, levels, step_ratio, flat_ratio
+        )
+    ]
+
+
+def _box_mean(batch, window):
+    """(N, H, W) の各画像に window×window の平均フィルタ（積分画像、validモード）"""
+    integral = np.pad(batch, ((0, 0), (1, 0), (1, 0))).cumsum(axis=1).cumsum(axis=2)
+    total = (integral[:, window:, window:] - integral[:, :-window, window:]
+             - integral[:, window:, :-window] + integral[:, :-window, :-window])
+    return total / (window * window)
+
+
+def ssim_batch(images, references, window=SSIM_WINDOW):
+    """同じ形の輝度画像 (N, H, W) 同士の平均SSIMを一括計算"""
+    x = images.astype(np.float64)
+    y = references.astype(np.float64)
+    window = min(window, x.shape[1], x.shape[2])
+
+    mu_x = _box_mean(x, window)
+    mu_y = _box_mean(y, window)
+    var_x = _box_mean(x * x, window) - mu_x * mu_x
+    var_y = _box_mean(y * y, window) - mu_y * mu_y
+    cov = _box_mean(x * y, window) - mu_x * mu_y
+
+    ssim_map = ((2 * mu_x * mu_y + SSIM_C1) * (2 * cov + SSIM_C2)) / (
+        (mu_x * mu_x + mu_y * mu_y + SSIM_C1) * (var_x + var_y + SSIM_C2)
+    )
+    return ssim_map.reshape(len(x), -1).mean(axis=1)
+
+
+def _issue(rule, severity, message):
+    return {"rule": rule, "severity": severity, "message": message}
+
+
+def check_asset(asset, spec, measured=None):
+    """1アセット分の指標と問題点（measured は batch_metrics の結果）"""
+    measured = measured or batch_metrics(asset["pixels"][None])[0]
+    width, height = asset["size"]
+
+    metrics = {
+        "path": asset["path"],
+        "kind": spec["kind"],
+        "size": list(asset["size"]),
+        "expected_size": list(spec["size"]) if spec.get("size") else None,
+        "mode": asset["mode"],
+        "icc_profile": asset["icc_profile"],
+        "has_alpha": asset["has_alpha"],
+        "alpha_used": measured["alpha_used"],
+        "visible_ratio": round(measured["visible_ratio"], 4),
+        "unique_colors": measured["unique_colors"],
+        "luma_mean": round(measured["luma_mean"], 2),
+        "luma_std": round(measured["luma_std"], 2),
+        "histogram_entropy": round(measured["histogram_entropy"], 3),
+        "histogram_gap_ratio": round(measured["histogram_gap_ratio"], 3),
+        "tonal_levels": measured["tonal_levels"],
+        "banding_step_ratio": round(measured["banding_step_ratio"], 3),
+        "flat_ratio": round(measured["flat_ratio"], 3),
+        "ssim": None,
+        "issues": [],
+    }
+    issues = metrics["issues"]
+    step_ratio = measured["banding_step_ratio"]
+
+    if spec.get("size") and tuple(asset["size"]) != tuple(spec["size"]):
+        issues.append(_issue("size", "error", f"expected {spec['size'][0]}x{spec['size'][1]}"))
+
+    if spec.get("opaque") and asset["has_alpha"]:
+        issues.append(_issue("alpha", "error", "App Store icon must not have an alpha channel"))
+
+    if asset["mode"] not in ("RGB", "RGBA", "P", "L", "LA", "PA"):
+        issues.append(_issue("color_mode", "error", f"unsupported mode {asset['mode']}"))
+
+    profile = asset["icc_profile"]
+    if profile and not any(name in profile.lower() for name in ACCEPTED_PROFILES):
+        issues.append(_issue("color_profile", "warning", f"profile '{profile}' is not sRGB / Display P3"))
+
+    if (measured["visible_ratio"] < THRESHOLDS["blank_visible_ratio"]
+            or measured["luma_std"] < THRESHOLDS["blank_luma_std"]):
+        issues.append(_issue("blank", "error", "image is blank or nearly uniform"))
+
+    if (height * width >= THRESHOLDS["banding_min_pixels"]
+            and step_ratio > THRESHOLDS["banding_step_ratio"]
+            and measured["flat_ratio"] > THRESHOLDS["banding_flat_ratio"]):
+        issues.append(_issue("banding", "warning", f"{step_ratio:.0%} of tonal steps are visible bands"))
+
+    return metrics
+
+
+def _batches(assets):
+    """解析配列の形が同じアセットの番号を、BATCH_PIXELS 以下のまとまりに分ける"""
+    groups = {}
+    for index, asset in enumerate(assets):
+        if asset is not None:
+            groups.setdefault(asset["pixels"].shape, []).append(index)
+
+    for shape, indexes in groups.items():
+        per_batch = max(1, BATCH_PIXELS // (shape[0] * shape[1]))
+        for start in range(0, len(indexes), per_batch):
+            yield indexes[start:start + per_batch]
+
+
+def _check_batch(assets, specs, indexes):
+    """同じ形のアセットをまとめて検査し、(番号, 指標) の組を返す"""
+    measured = batch_metrics(np.stack([assets[index]["pixels"] for index in indexes]))
+    return [(index, check_asset(assets[index], specs[index], row)) for index, row in zip(indexes, measured)]
+
+
+def _apply_ssim(results, assets, specs):
+    """参照画像を持つアセットを解析サイズ毎にまとめてSSIMを計算"""
+    groups = {}
+    for index, spec in enumerate(specs):
+        if assets[index] is not None and spec.get("reference"):
+            groups.setdefault(assets[index]["pixels"].shape, []).append(index)
+
+    # 参照 (マスター等) を面積平均で同サイズに縮小したものを基準とする（参照・サイズ毎に1回だけ縮小）
+    references = {}
+    expected = {}
+    try:
+        for shape, indexes in groups.items():
+            size = (shape[1], shape[0])
+            for index in indexes:
+                reference = specs[index]["reference"]
+                if (reference, size) in expected:
+                    continue
+                if reference not in references:
+                    with Image.open(reference) as img:
+                        references[reference] = img.convert("RGBA")
+                expected[reference, size] = luminance(
+                    np.asarray(references[reference].resize(size, Image.Resampling.BOX))
+                )
+
+            images = luminance(np.stack([assets[index]["pixels"] for index in indexes]))
+            targets = np.stack([expected[specs[index]["reference"], size] for index in indexes])
+            for index, score in zip(indexes, ssim_batch(images, targets)):
+                metrics = results[index]
+                metrics["ssim"] = round(float(score), 4)
+                if score < THRESHOLDS["min_ssim"]:
+                    metrics["issues"].append(
+                        _issue("downscale_fidelity", "warning", f"SSIM {score:.3f} against reference")
+                    )
+    finally:
+        for reference in references.values():
+            reference.close()
+
+
+def _load(spec):
+    """(配列化したアセット, 読めない場合の結果) を返す"""
+    path = Path(spec["path"])
+    if not path.exists():
+        return None, {"path": str(path), "kind": spec["kind"],
+                      "issues": [_issue("missing", "error", "file not found")]}
+    try:
+        return load_asset(path), None
+    except Exception as e:
+        return None, {"path": str(path), "kind": spec["kind"],
+                      "issues": [_issue("corrupted", "error", str(e))]}
+
+
+def validate_assets(specs, workers=None):
+    """specs = [{"path", "kind", "size"?, "opaque"?, "reference"?}] を検査して機械可読なレポートを返す"""
+    start = time.perf_counter()
+
+    # PNGデコードとNumPy演算はGILを解放するのでスレッドで並列化
+    workers = workers or min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        loaded = list(executor.map(_load, specs))
+        assets = [asset for asset, _ in loaded]
+        results = [failure for _, failure in loaded]
+
+        # 同じ形の配列は積み重ねて、指標をまとめて1回で計算
+        checks = executor.map(lambda indexes: _check_batch(assets, specs, indexes), list(_batches(assets)))
+        for batch in checks:
+            for index, metrics in batch:
+                results[index] = metrics
+
+    _apply_ssim(results, assets, specs)
+
+    severities = [issue["severity"] for result in results for issue in result["issues"]]
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "thresholds": THRESHOLDS,
+        "summary": {
+            "assets": len(results),
+            "errors": severities.count("error"),
+            "warnings": severities.count("warning"),
+            "passed": "error" not in severities,
+            "seconds": round(time.perf_counter() - start, 4),
+        },
+        "assets": results,
+    }
+
+
+def write_report(report, path):
+    """レポートをJSONで保存"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_report(path):
+    """保存済みのレポート（無い・壊れている場合は None）"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def validation_inputs(specs, manifest=None):
+    """検査結果を決める入力のハッシュ（前回のレポートを再利用できるかの判定に使う）
+
+    マニフェストに記録され書き換えられていない出力はその署名、それ以外のファイルは
+    内容のハッシュ（マニフェストが無ければ stat）で表す
+    """
+    files = {}
+    for spec in specs:
+        for path in filter(None, (spec["path"], spec.get("reference"))):
+            path = str(path)
+            if path in files:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                files[path] = None
+                continue
+            record = manifest.records.get(path) if manifest is not None else None
+            if record and (record["bytes"], record["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                files[path] = record["signature"]
+            elif manifest is not None:
+                files[path] = manifest.source_hash(path)
+            else:
+                files[path] = [stat.st_size, stat.st_mtime_ns]
+
+    payload = json.dumps({
+        "specs": [{**spec, "path": str(spec["path"])} for spec in specs],
+        "files": files,
+        "thresholds": THRESHOLDS,
+        # 検査ロジックが変わったら再検査する
+        "validator": hashlib.sha256(Path(__file__).read_bytes()).hexdigest(),
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
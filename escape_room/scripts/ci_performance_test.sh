@@ -30,6 +30,17 @@ flutter analyze
 echo "⚡ パフォーマンステスト実行..."
 dart test test/performance/ --reporter=json > performance_test_results.json 2>&1 || true
 
+# アセット生成パイプライン (Python) のベンチマーク
+# ベースライン (performance_results/asset_benchmark_baseline.json) は計測する環境に依存するため
+# リポジトリには含めない。CIランナー上で --update-baseline を実行して作成・コミットすること。
+# ベースラインが無い場合は回帰を検出できないので、--require-baseline で失敗させる。
+if python3 -c "import PIL, numpy" >/dev/null 2>&1; then
+    echo "⏱️ アセットパイプラインベンチマーク..."
+    python3 "$SCRIPT_DIR/asset_benchmark.py" --require-baseline
+else
+    echo "⚠️ Pillow/NumPy未インストールのためアセットベンチマークをスキップ"
+fi
+
 # Profileビルドテスト
 echo "🏗️ Profileビルドテスト..."
 "$SCRIPT_DIR/performance_measure.sh"
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Generation Cache
+プロンプトとパラメータをキーにした生成画像のコンテンツアドレスキャッシュ
+"""
+
+import hashlib
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+
+
+def normalize_prompt(prompt):
+    """インデント・改行の違いを無視するため空白を正規化"""
+    return " ".join(prompt.split())
+
+
+class GenerationCache:
+    """output_dir配下に生成済みマスターを保存し、サイズ上限付きLRUで管理"""
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, enabled=True):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        # スレッド毎の直近の get_or_generate がヒットだったか
+        self.local = threading.local()
+
+        self.index_path = self.cache_dir / self.INDEX_FILE
+        self.entries = {}
+        if self.enabled:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self.entries = self._load_index()
+
+    @staticmethod
+    def make_key(provider, model, prompt, params):
+        """provider・model・正規化プロンプト・パラメータからキーを生成"""
+        payload = json.dumps({
+            "provider": provider,
+            "model": model,
+            "prompt": normalize_prompt(prompt),
+            "params": params,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def fetch(self, key, target_path):
+        """キャッシュヒット時は target_path にコピーしてパスを返す"""
+        if not self.enabled:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(key)
+            blob = self._blob_path(key)
+            if entry is None or not blob.exists():
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            entry["last_access"] = time.time()
+            self.hits += 1
+            self._save_index()
+
+        shutil.copyfile(blob, target_path)
+        return str(target_path)
+
+    def store(self, key, source_path):
+        """生成結果をキャッシュに登録し、上限を超えたら古いものから削除"""
+        if not self.enabled:
+            return
+
+        blob = self._blob_path(key)
+        shutil.copyfile(source_path, blob)
+
+        with self.lock:
+            self.entries[key] = {"size": blob.stat().st_size, "last_access": time.time()}
+            self._evict()
+            self._save_index()
+
+    def get_or_generate(self, key, target_path, generate):
+        """キャッシュを確認し、ミス時のみ generate() を呼び出す"""
+        cached = self.fetch(key, target_path)
+        self.local.hit = bool(cached)
+        if cached:
+            print(f"♻️ Cache hit: {Path(target_path).name}")
+            return cached
+
+        path = generate()
+        if path:
+            try:
+                self.store(key, path)
+            except Exception as e:
+                print(f"⚠️ Cache store failed: {e}")
+        return path
+
+    def last_was_hit(self):
+        """このスレッドで直前に呼んだ get_or_generate がキャッシュから返したか"""
+        return getattr(self.local, "hit", False)
+
+    def stats(self):
+        """ヒット/ミス統計"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self.entries),
+            "bytes": sum(entry["size"] for entry in self.entries.values()),
+        }
+
+    def print_stats(self):
+        """統計を表示"""
+        if not self.enabled:
+            print("♻️ Cache: disabled (--no-cache)")
+            return
+        stats = self.stats()
+        print(f"♻️ Cache: {stats['hits']} hits / {stats['misses']} misses, "
+              f"{stats['entries']} entries ({stats['bytes'] / 1024 / 1024:.1f} MB)")
+
+    def _blob_path(self, key):
+        return self.cache_dir / f"{key}.png"
+
+    def _evict(self):
+        total = sum(entry["size"] for entry in self.entries.values())
+        for key in sorted(self.entries, key=lambda k: self.entries[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= self.entries.pop(key)["size"]
+            self._blob_path(key).unlink(missing_ok=True)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        tmp_path.replace(self.index_path)
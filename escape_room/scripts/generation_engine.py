@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Async Generation Engine
+プロンプト×プロバイダの画像生成リクエストを並行実行するエンジン
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncGenerationEngine:
+    """プロバイダ毎にN件までのリクエストを同時実行し、完了順に結果を流す"""
+
+    def __init__(self, generators, concurrency=4):
+        # generators: {provider: callable(prompt, filename) -> path or None}
+        # 既存の同期クライアント (openai / requests) をスレッドで実行する
+        self.generators = generators
+        self.concurrency = max(1, concurrency)
+
+    async def stream(self, jobs):
+        """jobs = [(key, provider, prompt, filename)] を実行し (key, path) を完了順に返す"""
+        loop = asyncio.get_running_loop()
+        semaphores = {provider: asyncio.Semaphore(self.concurrency) for provider in self.generators}
+        workers = self.concurrency * max(1, len(semaphores))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            async def run(key, provider, prompt, filename):
+                if provider not in self.generators:
+                    print(f"❌ Unknown service: {provider}")
+                    return key, None
+
+                async with semaphores[provider]:
+                    try:
+                        path = await loop.run_in_executor(
+                            executor, self.generators[provider], prompt, filename
+                        )
+                    except Exception as e:
+                        print(f"❌ {provider} generation failed ({filename}): {e}")
+                        path = None
+                return key, path
+
+            tasks = [asyncio.ensure_future(run(*job)) for job in jobs]
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+
+    def run(self, jobs, on_complete):
+        """同期コードから実行し、マスター完了毎に on_complete(key, path) を呼ぶ"""
+        async def consume():
+            async for key, path in self.stream(jobs):
+                on_complete(key, path)
+
+        asyncio.run(consume())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Local Stand-in Provider
+APIを使わずにシード付きの画像を合成するオフライン用プロバイダ（CIでのパイプライン計測用）
+"""
+
+import hashlib
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from asset_pipeline import prompt_palette
+from provider_registry import ImageProvider, SDXL_SIZES
+
+
+class LocalImageProvider(ImageProvider):
+    """プロンプトとシードから決定的に画像を合成し、遅延・失敗率を擬似的に再現する"""
+
+    native_sizes = SDXL_SIZES
+
+    def __init__(self, output_dir, size=(1024, 1024), latency=0.0, jitter=0.0,
+                 failure_rate=0.0, seed=0):
+        super().__init__("local", cost_per_image=0.0)
+        self.output_dir = Path(output_dir)
+        self.size = tuple(size)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.attempts = {}
+        self.lock = threading.Lock()
+
+    def generate(self, prompt, filename, aspect=None):
+        """画像を合成して保存先パスを返す（擬似失敗時は None）"""
+        # 同じファイルへの再試行は別の乱数列（並行実行の順序には依存しない）
+        # 試行回数はワーカースレッドから更新されるのでロック下で採番し、乱数列は呼び出しごとに持つ
+        with self.lock:
+            attempt = self.attempts.get(filename, 0)
+            self.attempts[filename] = attempt + 1
+        rng = random.Random(self._seed_for(prompt, filename, attempt))
+
+        # 擬似APIレイテンシ
+        delay = self.latency + rng.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if rng.random() < self.failure_rate:
+            print(f"❌ Local provider simulated failure: {filename}")
+            return None
+
+        img_path = self.output_dir / filename
+        size = self.size_for(aspect) if aspect else self.size
+        self.synthesize(prompt, size, rng).save(img_path, 'PNG')
+        print(f"✅ Generated (local): {img_path}")
+        return str(img_path)
+
+    def cache_params(self):
+        return {"seed": self.seed, "size": list(self.size)}
+
+    def synthesize(self, prompt, size, rng):
+        """プロンプト中の色を使ったフラットなイラスト風画像を合成"""
+        width, height = size
+        palette = prompt_palette(prompt) or [
+            tuple(rng.randrange(256) for _ in range(3)) for _ in range(4)
+        ]
+
+        img = Image.new('RGBA', (width, height), palette[0] + (255,))
+        draw = ImageDraw.Draw(img)
+
+        # 図形の数・位置・色はすべてシードから決定
+        for _ in range(12):
+            color = rng.choice(palette) + (rng.randrange(160, 256),)
+            x0 = rng.randrange(width)
+            y0 = rng.randrange(height)
+            radius = rng.randrange(max(2, min(width, height) // 20), max(3, min(width, height) // 4))
+            box = (x0 - radius, y0 - radius, x0 + radius, y0 + radius)
+            if rng.random() < 0.5:
+                draw.ellipse(box, fill=color)
+            else:
+                draw.rounded_rectangle(box, radius=radius // 3, fill=color)
+
+        return img
+
+    def _seed_for(self, prompt, filename, attempt):
+        payload = f"{self.seed}:{' '.join(prompt.split())}:{filename}:{attempt}".encode("utf-8")
+        return int.from_bytes(hashlib.sha256(payload).digest()[:8], "big")
+
+
+def local_provider_from_env(output_dir):
+    """ASSET_LOCAL_PROVIDER=1 のときローカルプロバイダを返す"""
+    if os.getenv("ASSET_LOCAL_PROVIDER") != "1":
+        return None
+
+    return LocalImageProvider(
+        output_dir,
+        latency=float(os.getenv("ASSET_LOCAL_LATENCY", "0")),
+        jitter=float(os.getenv("ASSET_LOCAL_JITTER", "0")),
+        failure_rate=float(os.getenv("ASSET_LOCAL_FAILURE_RATE", "0")),
+        seed=int(os.getenv("ASSET_LOCAL_SEED", "0")),
+    )
@@ -4,17 +4,42 @@ MCP Chrome操作によるAdobe Firefly完全自動化システム
 ログイン済みFireflyでの画像生成・ダウンロード・配置を完全自動化
 """
 
+import os
+import sys
 import time
 import json
 from pathlib import Path
 from PIL import Image
 
+from asset_pipeline import (
+    build_icon_set, BuildManifest, ENCODE_STATS, format_encode, load_app_size_budget,
+    plan_screenshot_crops, render_variants, resolve_profile, save_png
+)
+from generation_engine import AsyncGenerationEngine
+from local_provider import local_provider_from_env
+from asset_tracing import TRACER, finish_trace, trace_path_from_args
+
 class MCPFireflyAutomation:
-    def __init__(self):
-        self.project_root = Path("/Users/sekiguchi/git/proto/casual_game_template")
+    def __init__(self, encoder_profile=None):
+        self.project_root = Path(os.getenv("ASSET_PROJECT_ROOT", "/Users/sekiguchi/git/proto/casual_game_template"))
         self.output_dir = self.project_root / "generated_assets"
         self.output_dir.mkdir(exist_ok=True)
         
+        # 並列レンダリングのワーカー数 (None = CPUコア数)
+        self.render_workers = int(os.getenv("ASSET_RENDER_WORKERS", "0")) or None
+        
+        # 同時生成リクエスト数 (ローカルプロバイダ使用時のみ。Fireflyのブラウザ操作は常に1件ずつ)
+        self.generation_concurrency = int(os.getenv("ASSET_GENERATION_CONCURRENCY", "4"))
+        
+        # PNGエンコーダプロファイル (ASSET_BUILD_TARGET=dev|ci|release, ASSET_ENCODER_PROFILE で上書き)
+        self.encoder_profile = encoder_profile or resolve_profile()
+        
+        # 出力毎のソースハッシュ・サイズ・エンコーダ設定 (差分ビルド用)
+        self.manifest = BuildManifest(self.output_dir / ".build_manifest.json")
+        
+        # オフライン計測用の合成画像プロバイダ (ASSET_LOCAL_PROVIDER=1 / --local)
+        self.local_provider = local_provider_from_env(self.output_dir)
+        
         # Fireflyプロンプト（最適化済み）
         self.prompts = {
             "app_icon": """
@@ -108,6 +133,11 @@ class MCPFireflyAutomation:
             #     print(f"✅ Downloaded: {target_path}")
             #     return str(target_path)
             
+            # ローカルプロバイダ有効時は実ファイルを合成
+            if self.local_provider:
+                with TRACER.span("generate", provider="local", file=filename):
+                    return self.local_provider.generate(prompt, filename)
+            
             # 仮想的な成功レスポンス
             print(f"✅ Generated (simulated): {filename}")
             return str(self.output_dir / filename)
@@ -145,9 +175,7 @@ class MCPFireflyAutomation:
             
             icon_dir = self.project_root / "ios/Runner/Assets.xcassets/AppIcon.appiconset"
             
-            for size_config in icon_sizes:
-                target_path = icon_dir / size_config["name"]
-                self.resize_image(source_path, target_path, size_config["size"])
+            return build_icon_set(source_path, icon_dir, icon_sizes, self.encoder_profile, manifest=self.manifest)
                 
         elif asset_type == "screenshot":
             # スクリーンショット各デバイスサイズ
@@ -160,25 +188,36 @@ class MCPFireflyAutomation:
             screenshot_dir = self.output_dir / "screenshots"
             screenshot_dir.mkdir(exist_ok=True)
             
-            for device, size in device_sizes.items():
-                target_path = screenshot_dir / f"{source_path.stem}_{device}.png"
-                self.resize_image(source_path, target_path, size)
+            # 引き伸ばさずに注目領域を中心に切り出す
+            crops = plan_screenshot_crops(source_path, device_sizes.values())
+            jobs = [
+                (source_path, screenshot_dir / f"{source_path.stem}_{device}.png", size, crops[size])
+                for device, size in device_sizes.items()
+            ]
+            return render_variants(jobs, self.render_workers, self.encoder_profile, manifest=self.manifest)
     
     def resize_image(self, source_path, target_path, size):
         """高品質画像リサイズ"""
         try:
             with Image.open(source_path) as img:
-                img = img.convert('RGBA')
-                img = img.resize(size, Image.Resampling.LANCZOS)
+                with TRACER.span("open", path=source_path):
+                    img.load()
+                with TRACER.span("convert", mode='RGBA'):
+                    img = img.convert('RGBA')
+                with TRACER.span("resize", size=size):
+                    img = img.resize(size, Image.Resampling.LANCZOS)
                 
                 # App Store要件：透明度除去
                 if size == (1024, 1024):
-                    background = Image.new('RGB', size, (255, 255, 255))
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
+                    with TRACER.span("flatten", size=size):
+                        background = Image.new('RGB', size, (255, 255, 255))
+                        background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+                        img = background
                 
-                img.save(target_path, 'PNG', optimize=True, quality=95)
-                print(f"✅ Resized: {target_path.name} ({size[0]}x{size[1]})")
+                with TRACER.span("save", path=target_path, profile=self.encoder_profile["name"]):
+                    encoded = save_png(img, target_path, self.encoder_profile)
+                ENCODE_STATS.record(self.encoder_profile, encoded)
+                print(f"✅ Resized: {target_path.name} ({size[0]}x{size[1]}, {format_encode(encoded)})")
                 return True
                 
         except Exception as e:
@@ -194,27 +233,25 @@ class MCPFireflyAutomation:
         
         generated_assets = {}
         
-        # 1. アプリアイコン生成
+        # 1. アプリアイコン + 2. スクリーンショットを並行生成
         print("\n🔑 Generating App Icon...")
-        icon_path = self.generate_image_firefly(
-            self.prompts["app_icon"], 
-            "app_icon_master.png"
-        )
-        if icon_path:
-            self.resize_for_app_store(Path(icon_path), "icon")
-            generated_assets["icon"] = icon_path
-        
-        # 2. スクリーンショット生成
+        jobs = [("icon", "firefly", self.prompts["app_icon"], "app_icon_master.png")]
         for name, prompt in self.prompts.items():
             if name.startswith("screenshot_"):
                 print(f"\n📸 Generating {name}...")
-                screenshot_path = self.generate_image_firefly(
-                    prompt,
-                    f"{name}.png"
-                )
-                if screenshot_path:
-                    self.resize_for_app_store(Path(screenshot_path), "screenshot")
-                    generated_assets[name] = screenshot_path
+                jobs.append((name, "firefly", prompt, f"{name}.png"))
+        
+        # 完了したものから順にリサイズ
+        def on_generated(name, path):
+            if not path:
+                return
+            self.resize_for_app_store(Path(path), "icon" if name == "icon" else "screenshot")
+            generated_assets[name] = path
+        
+        # ブラウザ操作は1つのChromeセッションを共有するため同時に1件だけ（合成画像なら並行可）
+        concurrency = self.generation_concurrency if self.local_provider else 1
+        engine = AsyncGenerationEngine({"firefly": self.generate_image_firefly}, concurrency)
+        engine.run(jobs, on_generated)
         
         # 結果サマリー
         print(f"\n✅ Generated {len(generated_assets)} assets")
@@ -253,10 +290,24 @@ def main():
     print("🔥 MCP Chrome + Adobe Firefly Automation")
     print("=" * 50)
     
-    automation = MCPFireflyAutomation()
+    # --trace <path>: ステージ毎のスパンを JSON Lines (.jsonl) / Chrome trace (.json) で出力
+    trace_path = trace_path_from_args(sys.argv[1:])
+    
+    # --local: ブラウザ操作の代わりに合成画像で実行
+    if "--local" in sys.argv[1:]:
+        os.environ["ASSET_LOCAL_PROVIDER"] = "1"
+    
+    # エンコーダプロファイル (不正な ASSET_ENCODER_PROFILE / ASSET_BUILD_TARGET はここで報告)
+    try:
+        encoder_profile = resolve_profile()
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+    
+    automation = MCPFireflyAutomation(encoder_profile)
     
-    # 前提条件チェック
-    if not automation.check_prerequisites():
+    # 前提条件チェック (ローカルプロバイダ使用時はブラウザ不要)
+    if not automation.local_provider and not automation.check_prerequisites():
         print("\n❌ Prerequisites not met. Please:")
         print("   1. Login to Adobe Firefly in Chrome")
         print("   2. Ensure you have generation credits")
@@ -275,6 +326,10 @@ def main():
         print("\n⚠️ AUTOMATION FAILED")
         print("Check error messages and retry.")
     
+    ENCODE_STATS.print_report(
+        load_app_size_budget(Path(__file__).resolve().parents[1] / "performance_config.yaml")
+    )
+    finish_trace(trace_path)
     return success
 
 if __name__ == "__main__":
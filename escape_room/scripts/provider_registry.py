@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Provider Registry
+画像生成プロバイダの共通インターフェースと、レイテンシ・エラー率・コストに基づくルーティング
+"""
+
+import base64
+import json
+import math
+import statistics
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+
+import requests
+
+from asset_tracing import TRACER
+from generation_cache import GenerationCache
+
+
+# SDXL系モデルの学習解像度（ローカルSD・ComfyUIはこの中から選ぶと構図が破綻しにくい）
+SDXL_SIZES = [
+    (1024, 1024), (1152, 896), (896, 1152), (1216, 832), (832, 1216),
+    (1344, 768), (768, 1344), (1536, 640), (640, 1536),
+]
+
+
+def closest_native_size(aspect, native_sizes):
+    """アスペクト比 (幅/高さ) が最も近いサイズ（同率なら面積の大きい方）"""
+    return min(
+        native_sizes,
+        key=lambda size: (abs(math.log(size[0] / size[1] / aspect)), -size[0] * size[1])
+    )
+
+
+class ImageProvider:
+    """画像生成プロバイダの共通インターフェース"""
+
+    # 歪まずに生成できる出力サイズ（先頭が既定）
+    native_sizes = [(1024, 1024)]
+
+    def __init__(self, name, cost_per_image=0.0):
+        self.name = name
+        self.cost_per_image = cost_per_image
+
+    def is_available(self):
+        """APIキーやサーバ起動状況から利用可否を判定"""
+        return True
+
+    def size_for(self, aspect=None):
+        """目標アスペクト比に最も近いネイティブサイズ"""
+        if not aspect:
+            return self.native_sizes[0]
+        return closest_native_size(aspect, self.native_sizes)
+
+    def generate(self, prompt, filename, aspect=None):
+        """画像を生成して保存先パスを返す（失敗時は None）"""
+        raise NotImplementedError
+
+    def served_from_cache(self):
+        """このスレッドで直前の generate がキャッシュから返されたか（観測値に含めない）"""
+        return False
+
+    def cache_params(self):
+        """生成結果を左右する設定（GenerationCache のキーに含める）"""
+        return {}
+
+
+class CallableProvider(ImageProvider):
+    """既存の generate_with_xxx(prompt, filename) をプロバイダとして登録"""
+
+    def __init__(self, name, generate, cost_per_image=0.0, available=True, native_sizes=None, cache=None):
+        super().__init__(name, cost_per_image)
+        self._generate = generate
+        self._available = available
+        # generate が GenerationCache.get_or_generate を経由する場合、そのキャッシュ
+        self.cache = cache
+        # native_sizes を指定した場合、generate は size=(幅, 高さ) を受け取る
+        self.sized = native_sizes is not None
+        if self.sized:
+            self.native_sizes = [tuple(size) for size in native_sizes]
+
+    def is_available(self):
+        return self._available() if callable(self._available) else self._available
+
+    def generate(self, prompt, filename, aspect=None):
+        if self.sized and aspect:
+            return self._generate(prompt, filename, size=self.size_for(aspect))
+        return self._generate(prompt, filename)
+
+    def served_from_cache(self):
+        return self.cache is not None and self.cache.last_was_hit()
+
+
+class CachedProvider(ImageProvider):
+    """キャッシュを持たないプロバイダの生成結果を GenerationCache で再利用"""
+
+    def __init__(self, provider, cache, output_dir):
+        super().__init__(provider.name, provider.cost_per_image)
+        self.provider = provider
+        self.cache = cache
+        self.output_dir = Path(output_dir)
+        self.native_sizes = provider.native_sizes
+
+    def is_available(self):
+        return self.provider.is_available()
+
+    def generate(self, prompt, filename, aspect=None):
+        # 出力がファイル名に依存するプロバイダ（ローカル合成）もあるため、キーにはファイル名も含める
+        params = {**self.provider.cache_params(), "size": list(self.size_for(aspect)), "file": filename}
+        key = GenerationCache.make_key(self.name, self.name, prompt, params)
+        return self.cache.get_or_generate(
+            key, self.output_dir / filename,
+            lambda: self.provider.generate(prompt, filename, aspect=aspect)
+        )
+
+    def served_from_cache(self):
+        return self.cache.last_was_hit()
+
+    def cache_params(self):
+        return self.provider.cache_params()
+
+
+class WebUIProvider(ImageProvider):
+    """ローカル Stable Diffusion WebUI (/sdapi/v1/txt2img)"""
+
+    native_sizes = SDXL_SIZES
+
+    def __init__(self, url, output_dir, cost_per_image=0.0, timeout=120):
+        super().__init__("webui", cost_per_image)
+        self.url = url.rstrip("/")
+        self.output_dir = Path(output_dir)
+        self.timeout = timeout
+
+    def is_available(self):
+        try:
+            requests.get(f"{self.url}/sdapi/v1/options", timeout=3).raise_for_status()
+            return True
+        except requests.RequestException:
+            return False
+
+    def generate(self, prompt, filename, aspect=None):
+        width, height = self.size_for(aspect)
+        payload = {
+            "prompt": " ".join(prompt.split()),
+            "negative_prompt": "blurry, low quality, worst quality, low resolution",
+            "steps": 30,
+            "cfg_scale": 8,
+            "width": width,
+            "height": height,
+        }
+        response = requests.post(f"{self.url}/sdapi/v1/txt2img", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+        images = response.json().get("images") or []
+        if not images:
+            return None
+
+        img_path = self.output_dir / filename
+        img_path.write_bytes(base64.b64decode(images[0]))
+        return str(img_path)
+
+
+class ComfyUIProvider(ImageProvider):
+    """ローカル ComfyUI (/prompt -> /history -> /view)"""
+
+    native_sizes = SDXL_SIZES
+
+    def __init__(self, url, output_dir, checkpoint, cost_per_image=0.0,
+                 timeout=300, poll_interval=2.0):
+        super().__init__("comfyui", cost_per_image)
+        self.url = url.rstrip("/")
+        self.output_dir = Path(output_dir)
+        self.checkpoint = checkpoint
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    def cache_params(self):
+        return {"checkpoint": self.checkpoint}
+
+    def is_available(self):
+        try:
+            requests.get(f"{self.url}/system_stats", timeout=3).raise_for_status()
+            return True
+        except requests.RequestException:
+            return False
+
+    def workflow(self, prompt, size=(1024, 1024)):
+        """基本txt2imgワークフロー"""
+        width, height = size
+        return {
+            "1": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": self.checkpoint}},
+            "2": {"class_type": "CLIPTextEncode", "inputs": {"text": " ".join(prompt.split()), "clip": ["1", 1]}},
+            "3": {"class_type": "CLIPTextEncode", "inputs": {"text": "blurry, low quality", "clip": ["1", 1]}},
+            "4": {"class_type": "EmptyLatentImage", "inputs": {"width": width, "height": height, "batch_size": 1}},
+            "5": {"class_type": "KSampler", "inputs": {
+                "seed": 0, "steps": 30, "cfg": 8, "sampler_name": "dpmpp_2m", "scheduler": "karras",
+                "denoise": 1, "model": ["1", 0], "positive": ["2", 0], "negative": ["3", 0],
+                "latent_image": ["4", 0],
+            }},
+            "6": {"class_type": "VAEDecode", "inputs": {"samples": ["5", 0], "vae": ["1", 2]}},
+            "7": {"class_type": "SaveImage", "inputs": {"filename_prefix": "escape_room", "images": ["6", 0]}},
+        }
+
+    def generate(self, prompt, filename, aspect=None):
+        response = requests.post(
+            f"{self.url}/prompt",
+            json={"prompt": self.workflow(prompt, self.size_for(aspect)), "client_id": str(uuid.uuid4())},
+            timeout=30,
+        )
+        response.raise_for_status()
+        prompt_id = response.json()["prompt_id"]
+
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            history = requests.get(f"{self.url}/history/{prompt_id}", timeout=10).json()
+            entry = history.get(prompt_id)
+            if entry:
+                if entry.get("status", {}).get("status_str") == "error":
+                    return None
+                for output in entry.get("outputs", {}).values():
+                    for image in output.get("images", []):
+                        return self._download(image, filename)
+            time.sleep(self.poll_interval)
+
+        return None
+
+    def _download(self, image, filename):
+        params = {"filename": image["filename"], "subfolder": image.get("subfolder", ""),
+                  "type": image.get("type", "output")}
+        response = requests.get(f"{self.url}/view", params=params, timeout=60)
+        response.raise_for_status()
+
+        img_path = self.output_dir / filename
+        img_path.write_bytes(response.content)
+        return str(img_path)
+
+
+class ProviderStats:
+    """直近の呼び出し結果（レイテンシ・成否）"""
+
+    def __init__(self, window=50):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+
+    def record(self, latency, ok):
+        if ok:
+            self.latencies.append(latency)
+        self.outcomes.append(ok)
+
+    def p50(self, default):
+        return statistics.median(self.latencies) if self.latencies else default
+
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+
+class ProviderRegistry:
+    """観測したp50レイテンシ・エラー率・cost_per_imageでプロバイダを選び、失敗時は次へフェイルオーバー"""
+
+    def __init__(self, latency_weight=1.0, cost_weight=100.0, default_latency=20.0,
+                 window=50, concurrency=4):
+        self.latency_weight = latency_weight
+        self.cost_weight = cost_weight
+        self.default_latency = default_latency
+        self.window = window
+        self.concurrency = concurrency
+
+        self.providers = {}
+        self.stats = {}
+        self.slots = {}
+        self.availability = {}
+        self.lock = threading.Lock()
+
+    def register(self, provider):
+        """プロバイダを登録"""
+        self.providers[provider.name] = provider
+        self.stats[provider.name] = ProviderStats(self.window)
+        self.slots[provider.name] = threading.BoundedSemaphore(self.concurrency)
+
+    def available(self):
+        """利用可能なプロバイダ名（初回判定をキャッシュ）"""
+        for name, provider in self.providers.items():
+            if name not in self.availability:
+                try:
+                    self.availability[name] = bool(provider.is_available())
+                except Exception:
+                    self.availability[name] = False
+        return [name for name in self.providers if self.availability[name]]
+
+    def score(self, name):
+        """期待コスト（小さいほど良い）= (p50秒 + 単価換算) / 成功率"""
+        provider = self.providers[name]
+        with self.lock:
+            stats = self.stats[name]
+            latency = stats.p50(self.default_latency)
+            error_rate = stats.error_rate()
+        expected = self.latency_weight * latency + self.cost_weight * provider.cost_per_image
+        return expected / max(0.05, 1.0 - error_rate)
+
+    def ranked(self):
+        """スコア順の利用可能プロバイダ"""
+        return sorted(self.available(), key=self.score)
+
+    def generate(self, prompt, filename, aspect=None):
+        """最良のプロバイダで生成し、失敗したら次のプロバイダで再試行（aspect: 希望する幅/高さ）"""
+        for name in self.ranked():
+            provider = self.providers[name]
+            start = time.monotonic()
+            try:
+                with self.slots[name], TRACER.span("route", provider=name, file=filename):
+                    path = provider.generate(prompt, filename, aspect=aspect)
+            except Exception as e:
+                print(f"❌ {name} failed: {e}")
+                path = None
+
+            # キャッシュヒットは実際の呼び出しではないのでレイテンシ・エラー率に含めない
+            if path and provider.served_from_cache():
+                return path
+
+            with self.lock:
+                self.stats[name].record(time.monotonic() - start, bool(path))
+
+            if path:
+                return path
+            print(f"↪️ Failing over from {name} for {filename}")
+
+        print(f"❌ All providers failed: {filename}")
+        return None
+
+    def summary(self):
+        """プロバイダ毎の観測値"""
+        with self.lock:
+            return {
+                name: {
+                    "available": self.availability.get(name),
+                    "p50_seconds": round(stats.p50(self.default_latency), 3) if stats.latencies else None,
+                    "error_rate": round(stats.error_rate(), 3),
+                    "calls": len(stats.outcomes),
+                }
+                for name, stats in self.stats.items()
+            }
+
+
+def load_local_services(config_path):
+    """ai-services/configs/ai_services_config.json からローカルサービスのURLを読み込み"""
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("services", {})
+    except (OSError, ValueError):
+        return {}
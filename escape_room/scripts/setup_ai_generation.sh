@@ -7,7 +7,7 @@ echo "================================================"
 # Python依存関係インストール
 echo "📦 Installing Python dependencies..."
 pip3 install --upgrade pip
-pip3 install openai requests pillow
+pip3 install openai requests pillow numpy
 
 # Adobe Firefly CLI (もし存在すれば)
 echo "🔍 Checking for Adobe Firefly CLI..."
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Stability Response Stream
+Stability AIのJSONレスポンスを逐次解析し、base64アーティファクトを直接ファイルへデコード
+"""
+
+import base64
+import os
+from pathlib import Path
+
+
+class ArtifactBudgetExceeded(Exception):
+    """デコード済みバイト数が上限を超えた"""
+
+
+class StabilityArtifactStream:
+    """レスポンス本文をチャンク毎に受け取り、"base64" 値だけを逐次デコードして書き出す"""
+
+    KEY = b'"base64"'
+    SEEK_KEY, SEEK_VALUE, IN_VALUE = range(3)
+
+    def __init__(self, path_for, max_bytes=64 * 1024 * 1024):
+        # path_for(index) -> 出力パス
+        self.path_for = path_for
+        self.max_bytes = max_bytes
+        self.decoded_bytes = 0
+        self.paths = []
+
+        self.state = self.SEEK_KEY
+        self.buffer = b''
+        self.pending = b''
+        self.file = None
+        self.part_path = None
+
+    def feed(self, chunk):
+        """レスポンス本文の断片を処理"""
+        self.buffer += chunk
+
+        while self.buffer:
+            if self.state == self.SEEK_KEY:
+                index = self.buffer.find(self.KEY)
+                if index < 0:
+                    # キーがチャンク境界を跨ぐ場合に備えて末尾を残す
+                    self.buffer = self.buffer[-(len(self.KEY) - 1):]
+                    return
+                self.buffer = self.buffer[index + len(self.KEY):]
+                self.state = self.SEEK_VALUE
+
+            elif self.state == self.SEEK_VALUE:
+                index = self.buffer.find(b'"')
+                if index < 0:
+                    self.buffer = b''
+                    return
+                self.buffer = self.buffer[index + 1:]
+                self._open_artifact()
+                self.state = self.IN_VALUE
+
+            else:
+                index = self.buffer.find(b'"')
+                value = self.buffer if index < 0 else self.buffer[:index]
+                self.buffer = b'' if index < 0 else self.buffer[index + 1:]
+
+                # JSONエンコーダによっては "/" が "\/" にエスケープされる
+                self._decode(value.replace(b'\\', b''))
+
+                if index >= 0:
+                    self._close_artifact()
+                    self.state = self.SEEK_KEY
+
+    def close(self):
+        """ストリーム終了。書き出したパスの一覧を返す"""
+        if self.file is not None:
+            # 値の途中で切れたレスポンス
+            self.abort()
+            raise ValueError("truncated Stability response")
+        return list(self.paths)
+
+    def abort(self):
+        """書き込み中のファイルを破棄"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            Path(self.part_path).unlink(missing_ok=True)
+
+    def _open_artifact(self):
+        path = Path(self.path_for(len(self.paths)))
+        self.part_path = path.with_name(path.name + ".part")
+        self.file = open(self.part_path, 'wb')
+        self.pending = b''
+
+    def _decode(self, data):
+        data = self.pending + data
+        usable = len(data) - len(data) % 4
+        self.pending = data[usable:]
+        if usable:
+            self._write(base64.b64decode(data[:usable]))
+
+    def _write(self, decoded):
+        self.decoded_bytes += len(decoded)
+        if self.decoded_bytes > self.max_bytes:
+            self.abort()
+            raise ArtifactBudgetExceeded(
+                f"decoded {self.decoded_bytes} bytes (limit {self.max_bytes})"
+            )
+        self.file.write(decoded)
+
+    def _close_artifact(self):
+        if self.pending:
+            self._write(base64.b64decode(self.pending))
+            self.pending = b''
+        self.file.close()
+        self.file = None
+
+        path = self.part_path.with_name(self.part_path.name[:-len(".part")])
+        os.replace(self.part_path, path)
+        self.paths.append(str(path))
+
+
+def sample_path(output_dir, filename, index):
+    """1枚目は filename、2枚目以降は連番を付けたパス"""
+    path = Path(output_dir) / filename
+    if index == 0:
+        return path
+    return path.with_name(f"{path.stem}_{index}{path.suffix}")
+
+
+def write_artifacts(response, output_dir, filename, max_bytes=64 * 1024 * 1024, chunk_size=64 * 1024):
+    """ストリーミングレスポンスから全サンプルを書き出し、パスの一覧を返す"""
+    stream = StabilityArtifactStream(
+        lambda index: sample_path(output_dir, filename, index), max_bytes
+    )
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if chunk:
+                stream.feed(chunk)
+    except Exception:
+        stream.abort()
+        raise
+    return stream.close()
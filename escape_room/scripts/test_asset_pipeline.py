@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+asset_pipeline のテスト (python3 -m pytest scripts)
+"""
+
+import os
+
+import pytest
+from PIL import Image, ImageDraw
+
+from asset_pipeline import (
+    BuildManifest, crop_box, encoder_settings, prompt_palette, score_icon_candidate,
+    select_best_candidate
+)
+
+PROMPT = "Minimal escape room icon, primary color #1E3A8A, accent #F59E0B"
+
+
+def make_icon(path, size=(1024, 1024), background=(30, 58, 138), accent=(245, 158, 11), shapes=True):
+    img = Image.new("RGB", size, background)
+    if shapes:
+        draw = ImageDraw.Draw(img)
+        draw.rectangle((size[0] // 4, size[1] // 4, size[0] * 3 // 4, size[1] * 3 // 4), fill=accent)
+    img.save(path)
+    return str(path)
+
+
+def test_prompt_palette():
+    assert prompt_palette(PROMPT) == [(30, 58, 138), (245, 158, 11)]
+    assert prompt_palette("no colors, #12345 is too short") == []
+
+
+def test_score_prefers_palette_and_edges(tmp_path):
+    on_palette = score_icon_candidate(make_icon(tmp_path / "a.png"), prompt_palette(PROMPT))
+    off_palette = score_icon_candidate(
+        make_icon(tmp_path / "b.png", background=(200, 0, 200), accent=(0, 200, 0)), prompt_palette(PROMPT)
+    )
+    flat = score_icon_candidate(make_icon(tmp_path / "c.png", shapes=False), prompt_palette(PROMPT))
+
+    assert on_palette["meets_constraints"]
+    assert on_palette["palette"] > off_palette["palette"]
+    assert on_palette["sharpness"] > flat["sharpness"]
+    assert on_palette["score"] > max(off_palette["score"], flat["score"])
+
+
+def test_score_zero_when_app_store_constraints_fail(tmp_path):
+    small = score_icon_candidate(make_icon(tmp_path / "small.png", size=(512, 512)), prompt_palette(PROMPT))
+    wide = score_icon_candidate(make_icon(tmp_path / "wide.png", size=(1280, 1024)), prompt_palette(PROMPT))
+
+    assert not small["meets_constraints"] and small["score"] == 0.0
+    assert not wide["meets_constraints"] and wide["score"] == 0.0
+
+
+def test_select_best_candidate_skips_unreadable(tmp_path):
+    best = make_icon(tmp_path / "best.png")
+    worse = make_icon(tmp_path / "worse.png", background=(200, 0, 200), accent=(0, 200, 0))
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not a png")
+
+    path, scores = select_best_candidate([worse, str(broken), best], PROMPT)
+
+    assert path == best
+    assert [result["path"] for result in scores] == [worse, best]
+
+
+def test_select_best_candidate_without_candidates(tmp_path):
+    assert select_best_candidate([], PROMPT) == (None, [])
+
+
+@pytest.mark.parametrize("source, target", [((2000, 1000), (1290, 2796)), ((1000, 2000), (2048, 1536))])
+def test_crop_box_keeps_target_aspect_inside_source(source, target):
+    for center in ((0.0, 0.0), (0.5, 0.5), (0.9, 0.2), (1.0, 1.0)):
+        left, top, right, bottom = crop_box(source, target, center)
+
+        assert 0 <= left < right <= source[0]
+        assert 0 <= top < bottom <= source[1]
+        assert (right - left) / (bottom - top) == pytest.approx(target[0] / target[1])
+
+
+def test_crop_box_follows_center():
+    left, _, right, _ = crop_box((2000, 1000), (500, 1000), (0.8, 0.5))
+    assert (left + right) / 2 == pytest.approx(1600)
+
+
+def test_manifest_freshness(tmp_path):
+    source = make_icon(tmp_path / "master.png")
+    target = tmp_path / "out.png"
+    target.write_bytes(b"rendered")
+
+    manifest = BuildManifest(tmp_path / "manifest.json")
+    signature = manifest.signature(source, (120, 120), encoder_settings((120, 120), {"name": "fast"}))
+    assert not manifest.is_fresh(target, signature)
+
+    manifest.record(target, signature)
+    manifest.save()
+    reloaded = BuildManifest(tmp_path / "manifest.json")
+    assert reloaded.is_fresh(target, signature)
+
+    # エンコーダ設定・出力の書き換えで古くなる
+    other = reloaded.signature(source, (120, 120), encoder_settings((120, 120), {"name": "store"}))
+    assert not reloaded.is_fresh(target, other)
+    target.write_bytes(b"edited by hand")
+    os.utime(target, ns=(1, 1))
+    assert not reloaded.is_fresh(target, signature)
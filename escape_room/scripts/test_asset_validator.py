@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+asset_validator のテスト (python3 -m pytest scripts)
+"""
+
+import numpy as np
+from PIL import Image
+
+from asset_pipeline import BuildManifest
+from asset_validator import THRESHOLDS, batch_metrics, load_asset, validate_assets, validation_inputs
+
+
+def gradient(size, alpha=255):
+    width, height = size
+    pixels = np.zeros((height, width, 4), np.uint8)
+    pixels[..., 0] = np.linspace(0, 255, width, dtype=np.uint8)[None, :]
+    pixels[..., 1] = np.linspace(0, 255, height, dtype=np.uint8)[:, None]
+    pixels[..., 3] = alpha
+    return pixels
+
+
+def test_batch_matches_single_images():
+    transparent = gradient((64, 48))
+    transparent[:10, :10, 3] = 0
+    flat = np.full((48, 64, 4), 200, np.uint8)
+    flat[..., 3] = 255
+    images = [gradient((64, 48)), transparent, flat]
+
+    batched = batch_metrics(np.stack(images))
+
+    assert batched == [batch_metrics(image[None])[0] for image in images]
+    assert [row["alpha_used"] for row in batched] == [False, True, False]
+    assert batched[2]["luma_std"] == 0.0 and batched[2]["tonal_levels"] == 1
+
+
+def test_large_images_are_analysed_downscaled(tmp_path):
+    path = tmp_path / "shot.png"
+    Image.fromarray(gradient((1290, 2796))).save(path)
+
+    asset = load_asset(path)
+
+    assert asset["size"] == (1290, 2796)
+    height, width = asset["pixels"].shape[:2]
+    assert height * width <= THRESHOLDS["analysis_pixels"]
+
+
+def test_validate_reports_blank_and_ssim(tmp_path):
+    master = tmp_path / "master.png"
+    Image.fromarray(gradient((256, 256))).convert("RGB").save(master)
+    specs = []
+    for name, pixels in (("icon", gradient((64, 64))), ("blank", np.full((64, 64, 4), 255, np.uint8))):
+        path = tmp_path / f"{name}.png"
+        Image.fromarray(pixels).convert("RGB").save(path)
+        specs.append({"path": str(path), "kind": "icon", "size": [64, 64], "reference": str(master)})
+
+    icon, blank = validate_assets(specs)["assets"]
+
+    assert icon["ssim"] > THRESHOLDS["min_ssim"] and not icon["issues"]
+    assert {issue["rule"] for issue in blank["issues"]} == {"blank", "downscale_fidelity"}
+
+
+def test_validation_inputs_follow_manifest_and_content(tmp_path):
+    icon = tmp_path / "icon.png"
+    master = tmp_path / "master.png"
+    Image.fromarray(gradient((64, 64))).save(icon)
+    Image.fromarray(gradient((256, 256))).save(master)
+    specs = [{"path": icon, "kind": "icon", "size": [64, 64], "reference": str(master)}]
+
+    manifest = BuildManifest(tmp_path / "manifest.json")
+    manifest.record(icon, {"source": "abc", "size": [64, 64], "encoder": {}})
+    key = validation_inputs(specs, manifest)
+
+    # 同じ内容で書き直した参照画像は同じキー、記録と違う出力は別のキー
+    master.write_bytes(master.read_bytes())
+    assert validation_inputs(specs, manifest) == key
+    Image.fromarray(gradient((64, 64), alpha=128)).save(icon)
+    assert validation_inputs(specs, manifest) != key
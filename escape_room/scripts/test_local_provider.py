@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+local_provider のテスト (python3 -m pytest scripts)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from generation_cache import GenerationCache
+from local_provider import LocalImageProvider
+from provider_registry import CachedProvider
+
+PROMPT = "Minimal escape room icon, primary color #1E3A8A, accent #F59E0B"
+
+
+def test_same_seed_gives_same_image(tmp_path):
+    first = LocalImageProvider(tmp_path / "a", size=(64, 64), seed=7)
+    second = LocalImageProvider(tmp_path / "b", size=(64, 64), seed=7)
+    first.output_dir.mkdir()
+    second.output_dir.mkdir()
+
+    assert open(first.generate(PROMPT, "icon.png"), "rb").read() == \
+        open(second.generate(PROMPT, "icon.png"), "rb").read()
+
+
+def test_concurrent_retries_get_distinct_attempts(tmp_path):
+    provider = LocalImageProvider(tmp_path, size=(16, 16), failure_rate=1.0)
+    seen = []
+    original = provider._seed_for
+
+    def record(prompt, filename, attempt):
+        seen.append(attempt)
+        return original(prompt, filename, attempt)
+
+    provider._seed_for = record
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: provider.generate(PROMPT, "icon.png"), range(200)))
+
+    # 並行に呼ばれても試行番号は重複も欠番もしない
+    assert results == [None] * 200
+    assert sorted(seen) == list(range(200))
+    assert provider.attempts == {"icon.png": 200}
+
+
+def test_cached_provider_reuses_each_file(tmp_path):
+    cache = GenerationCache(tmp_path / "cache")
+    provider = CachedProvider(LocalImageProvider(tmp_path, size=(16, 16)), cache, tmp_path)
+
+    first = open(provider.generate(PROMPT, "a.png"), "rb").read()
+    other = open(provider.generate(PROMPT, "b.png"), "rb").read()
+    assert not provider.served_from_cache()
+
+    # 同じファイル名・設定ならキャッシュから返し、ファイル名が違えば別の画像
+    assert open(provider.generate(PROMPT, "a.png"), "rb").read() == first
+    assert provider.served_from_cache()
+    assert other != first
+    assert provider.provider.attempts == {"a.png": 1, "b.png": 1}
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+stability_stream のテスト (python3 -m pytest scripts)
+"""
+
+import base64
+import json
+import random
+
+import pytest
+
+from stability_stream import ArtifactBudgetExceeded, StabilityArtifactStream, sample_path, write_artifacts
+
+# 長さが3の倍数でないデータ（base64 のパディング付き）も含める
+ARTIFACTS = [bytes(range(256)) * 3 + b'\xff', random.Random(0).randbytes(1000), b'x']
+
+
+def response_body(artifacts, escape_slashes=False):
+    body = json.dumps({"artifacts": [
+        {"base64": base64.b64encode(data).decode("ascii"), "seed": index, "finishReason": "SUCCESS"}
+        for index, data in enumerate(artifacts)
+    ]}).encode("ascii")
+    # エンコーダによっては "/" を "\/" と出力する
+    return body.replace(b"/", b"\\/") if escape_slashes else body
+
+
+def chunks(data, sizes):
+    position = 0
+    index = 0
+    while position < len(data):
+        size = sizes[index % len(sizes)]
+        yield data[position:position + size]
+        position += size
+        index += 1
+
+
+class FakeResponse:
+    def __init__(self, body, sizes):
+        self.body = body
+        self.sizes = sizes
+
+    def iter_content(self, chunk_size):
+        return chunks(self.body, self.sizes)
+
+
+@pytest.mark.parametrize("sizes", [[1], [3], [5], [7, 2, 11], [4096]])
+def test_chunk_boundaries(tmp_path, sizes):
+    # 4バイト境界に揃わない分割でも、キー・値の途中で切れても同じ結果になる
+    stream = StabilityArtifactStream(lambda index: tmp_path / f"sample_{index}.png")
+    for chunk in chunks(response_body(ARTIFACTS), sizes):
+        stream.feed(chunk)
+    paths = stream.close()
+
+    assert [open(path, "rb").read() for path in paths] == ARTIFACTS
+    assert not list(tmp_path.glob("*.part"))
+
+
+@pytest.mark.parametrize("sizes", [[1], [6], [13]])
+def test_escaped_slashes(tmp_path, sizes):
+    body = response_body(ARTIFACTS, escape_slashes=True)
+    assert b"\\/" in body
+
+    paths = write_artifacts(FakeResponse(body, sizes), tmp_path, "master.png")
+
+    assert [open(path, "rb").read() for path in paths] == ARTIFACTS
+
+
+def test_sample_paths(tmp_path):
+    paths = write_artifacts(FakeResponse(response_body(ARTIFACTS), [64]), tmp_path, "master.png")
+
+    assert paths == [str(sample_path(tmp_path, "master.png", index)) for index in range(len(ARTIFACTS))]
+    assert [path.rsplit("/", 1)[-1] for path in paths] == ["master.png", "master_1.png", "master_2.png"]
+
+
+def test_budget_exceeded_removes_partial_file(tmp_path):
+    stream = StabilityArtifactStream(lambda index: tmp_path / f"sample_{index}.png", max_bytes=500)
+
+    with pytest.raises(ArtifactBudgetExceeded):
+        for chunk in chunks(response_body(ARTIFACTS), [7]):
+            stream.feed(chunk)
+
+    assert not list(tmp_path.iterdir())
+
+
+def test_truncated_response(tmp_path):
+    body = response_body(ARTIFACTS[:1])
+    stream = StabilityArtifactStream(lambda index: tmp_path / f"sample_{index}.png")
+    stream.feed(body[:len(body) // 2])
+
+    with pytest.raises(ValueError):
+        stream.close()
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+ARBファイルの索引
+
+app_en.arb / app_ja.arb を1回だけ読み込み、キー・値・正規化テキスト・プレースホルダ署名の
+ハッシュ表を作ります。string_migration.py の ARB 候補生成で、同じ文言が別キーで
+既に多言語化されていないかを O(1) で調べるために使います。
+"""
+
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+# ARB のプレースホルダ {name}
+_ARB_PLACEHOLDER = re.compile(r'\{[A-Za-z_]\w*\}')
+
+# Dart 文字列リテラル中のエスケープと補間 ($name / ${expression})
+_DART_ESCAPE_OR_INTERPOLATION = re.compile(r'\\(.)|\$\{[^}]*\}|\$[A-Za-z_]\w*', re.DOTALL)
+_DART_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r'}
+
+# 正規化で無視する空白・末尾の句読点
+_WHITESPACE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION = '.!?:;,…。！？：、'
+
+# 正規化後のプレースホルダ表記
+PLACEHOLDER = '{}'
+
+
+def normalize_text(text: str) -> str:
+    """
+    表記揺れ（全角半角・大文字小文字・空白・末尾の句読点）を吸収した比較用テキスト
+    """
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = _WHITESPACE.sub(' ', text).strip()
+    return text.rstrip(_TRAILING_PUNCTUATION).rstrip()
+
+
+def dart_message(content: str) -> Tuple[str, bool]:
+    """
+    Dart リテラルの中身をエスケープ解除し、補間を PLACEHOLDER に置き換える（補間の有無も返す）
+    """
+    has_placeholders = False
+
+    def replace(match: re.Match) -> str:
+        nonlocal has_placeholders
+        escaped = match.group(1)
+        if escaped is not None:
+            return _DART_ESCAPES.get(escaped, escaped)
+        has_placeholders = True
+        return PLACEHOLDER
+
+    return _DART_ESCAPE_OR_INTERPOLATION.sub(replace, content), has_placeholders
+
+
+class ArbIndex:
+    """
+    ロケール毎の ARB データと、値から既存キーを引くための索引
+    """
+
+    def __init__(self):
+        self.data: Dict[str, Dict] = {}
+        # キー -> {ロケール: 値}
+        self.keys: Dict[str, Dict[str, str]] = {}
+        # 値（そのまま） -> キー
+        self.values: Dict[str, str] = {}
+        # 正規化テキスト -> キー一覧（プレースホルダ無しの値）
+        self.normalized: Dict[str, List[str]] = {}
+        # プレースホルダを PLACEHOLDER にした正規化テキスト -> キー一覧
+        self.signatures: Dict[str, List[str]] = {}
+
+    def add_locale(self, locale: str, arb_data: Dict):
+        """
+        1ロケール分の ARB データを索引に追加
+        """
+        self.data[locale] = arb_data
+        for key, value in arb_data.items():
+            if key.startswith('@') or not isinstance(value, str):
+                continue
+            self.keys.setdefault(key, {})[locale] = value
+            self.values.setdefault(value, key)
+
+            signature, count = _ARB_PLACEHOLDER.subn(PLACEHOLDER, value)
+            bucket = self.signatures if count else self.normalized
+            keys = bucket.setdefault(normalize_text(signature), [])
+            if key not in keys:
+                keys.append(key)
+
+    def find(self, content: str) -> Optional[Tuple[str, str]]:
+        """
+        Dart リテラルの中身と同じ文言の既存キーを (キー, 一致の種類) で返す
+        """
+        text, has_placeholders = dart_message(content)
+
+        if not has_placeholders:
+            key = self.values.get(text)
+            if key is not None:
+                return key, 'exact'
+
+        bucket = self.signatures if has_placeholders else self.normalized
+        keys = bucket.get(normalize_text(text))
+        if keys:
+            return keys[0], 'placeholders' if has_placeholders else 'normalized'
+        return None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.keys
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Dart字句解析器（文字列リテラル・コメント専用）
+
+string_migration.py から使用する軽量なストリーミングレキサーです。
+Dartソースを先頭から1回だけ走査し、文字列リテラルとコメントを出現順にトークンとして返します。
+
+対応する構文:
+    'single' "double"            通常の文字列（\\ エスケープ、行を跨がない）
+    '''triple''' \"\"\"triple\"\"\"  複数行文字列
+    r'raw' r'''raw'''            raw文字列（エスケープ・補間なし）
+    $name ${expression}          補間（式中の入れ子の文字列もトークンとして返す）
+    // line   /* block /* nested */ */   コメント
+"""
+
+import re
+from typing import Iterator, List, NamedTuple, Tuple, Union
+
+
+class StringToken(NamedTuple):
+    """文字列リテラル1個分の位置情報（オフセットはすべてソース全体に対する文字位置）"""
+    start: int             # r プレフィックスを含む先頭
+    end: int               # 閉じクォートの直後
+    quote_start: int       # 開きクォートの位置
+    text_start: int        # 中身の先頭
+    text_end: int          # 中身の末尾（閉じクォートの位置）
+    raw: bool
+    triple: bool
+    interpolations: Tuple[Tuple[int, int], ...]  # $name / ${...} の範囲
+    depth: int             # 補間式の中にある文字列なら 1 以上
+    terminated: bool       # 閉じクォートが見つかったか
+
+
+class CommentToken(NamedTuple):
+    """コメント1個分の範囲"""
+    start: int
+    end: int
+
+
+Token = Union[StringToken, CommentToken]
+
+# コード部分で意味のある文字（補間式の中では波括弧の対応も追う）
+_CODE = re.compile(r"""['"]|/[/*]""")
+_CODE_IN_INTERPOLATION = re.compile(r"""['"{}]|/[/*]""")
+_BLOCK_COMMENT = re.compile(r"/\*|\*/")
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# 文字列の中で意味のある文字 (quote, triple, raw) -> パターン
+_STRING_STOPS = {}
+for _quote in ("'", '"'):
+    _STRING_STOPS[(_quote, False, False)] = re.compile(r"[\\$\n" + _quote + "]")
+    _STRING_STOPS[(_quote, True, False)] = re.compile(r"[\\$" + _quote + "]")
+    _STRING_STOPS[(_quote, False, True)] = re.compile("[\n" + _quote + "]")
+    _STRING_STOPS[(_quote, True, True)] = re.compile(_quote * 3)
+
+
+def _is_identifier_char(char: str) -> bool:
+    return char.isalnum() or char == '_' or char == '$'
+
+
+class DartLexer:
+    """
+    ソース文字列を走査して StringToken / CommentToken を出現順に返す
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.length = len(source)
+
+    def tokens(self) -> Iterator[Token]:
+        """
+        先頭からトークンを順に返す
+        """
+        yield from self._code(0, 0, in_interpolation=False)
+
+    def _code(self, pos: int, depth: int, in_interpolation: bool) -> Iterator[Token]:
+        """
+        コード部分を走査する。補間式の中なら対応する } の直後で止まり、self.pos に位置を残す
+        """
+        source = self.source
+        pattern = _CODE_IN_INTERPOLATION if in_interpolation else _CODE
+        braces = 0
+
+        while True:
+            match = pattern.search(source, pos)
+            if match is None:
+                self.pos = self.length
+                return
+            char = match.group()
+            start = match.start()
+
+            if char == '//':
+                end = source.find('\n', start)
+                end = self.length if end < 0 else end
+                yield CommentToken(start, end)
+                pos = end
+            elif char == '/*':
+                end = self._block_comment_end(start)
+                yield CommentToken(start, end)
+                pos = end
+            elif char == '{':
+                braces += 1
+                pos = start + 1
+            elif char == '}':
+                if braces == 0:
+                    self.pos = start + 1
+                    return
+                braces -= 1
+                pos = start + 1
+            else:
+                yield from self._string(start, depth)
+                pos = self.pos
+
+    def _block_comment_end(self, start: int) -> int:
+        """
+        入れ子に対応したブロックコメントの終端
+        """
+        nesting = 0
+        pos = start
+        while True:
+            match = _BLOCK_COMMENT.search(self.source, pos)
+            if match is None:
+                return self.length
+            nesting += 1 if match.group() == '/*' else -1
+            pos = match.end()
+            if nesting == 0:
+                return pos
+
+    def _string(self, quote_start: int, depth: int) -> Iterator[Token]:
+        """
+        quote_start から始まる文字列を読み、トークン（と補間式中の入れ子の文字列）を返す
+        """
+        source = self.source
+        quote = source[quote_start]
+        raw = (quote_start > 0 and source[quote_start - 1] in 'rR'
+               and (quote_start < 2 or not _is_identifier_char(source[quote_start - 2])))
+        triple = source.startswith(quote * 3, quote_start)
+        text_start = quote_start + (3 if triple else 1)
+        stops = _STRING_STOPS[(quote, triple, raw)]
+
+        interpolations: List[Tuple[int, int]] = []
+        nested: List[Token] = []
+        pos = text_start
+
+        while True:
+            match = stops.search(source, pos)
+            if match is None or match.group() == '\n':
+                # 閉じられていない文字列は行末（またはファイル末尾）まで
+                text_end = self.length if match is None else match.start()
+                self.pos = text_end
+                end, terminated = text_end, False
+                break
+
+            char = match.group()
+            stop = match.start()
+
+            if char == '\\':
+                pos = stop + 2
+            elif char == '$':
+                if source.startswith('{', stop + 1):
+                    nested.extend(self._code(stop + 2, depth + 1, in_interpolation=True))
+                    interpolations.append((stop, self.pos))
+                    pos = self.pos
+                else:
+                    identifier = _IDENTIFIER.match(source, stop + 1)
+                    if identifier:
+                        interpolations.append((stop, identifier.end()))
+                        pos = identifier.end()
+                    else:
+                        pos = stop + 1
+            elif triple and not raw and not source.startswith(quote * 3, stop):
+                # 三重クォート内の単独クォート
+                pos = stop + 1
+            else:
+                text_end = stop
+                end = stop + (3 if triple else 1)
+                self.pos = end
+                terminated = True
+                break
+
+        yield StringToken(
+            start=quote_start - 1 if raw else quote_start,
+            end=end,
+            quote_start=quote_start,
+            text_start=text_start,
+            text_end=text_end,
+            raw=raw,
+            triple=triple,
+            interpolations=tuple(interpolations),
+            depth=depth,
+            terminated=terminated,
+        )
+        yield from nested
+
+
+def tokenize(source: str) -> Iterator[Token]:
+    """
+    Dartソースの文字列リテラル・コメントを出現順に返す
+    """
+    return DartLexer(source).tokens()
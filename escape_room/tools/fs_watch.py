@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+ファイル変更の監視
+
+string_migration.py の --watch 用。Linux では inotify (ctypes 経由、追加パッケージ不要) で
+変更されたファイルを受け取り、使えない環境（macOS など）では一定間隔のポーリングに切り替えます。
+
+wait() は変更されたファイルのパス集合を返します。None はどのファイルが変わったか分からない
+（ポーリングの周期・イベントの取りこぼし・ディレクトリの追加削除）ことを表し、
+呼び出し側で全ファイルの stat を比較し直します。
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+# inotify のイベントマスク (<sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+# 保存中の連続したイベントをまとめる待ち時間（秒）
+DEBOUNCE_SECONDS = 0.02
+
+
+class InotifyWatcher:
+    """
+    root 以下の全ディレクトリを inotify で監視する
+    """
+
+    def __init__(self, root: Path, suffixes: Tuple[str, ...]):
+        self.root = Path(root)
+        self.suffixes = suffixes
+        self.directories: Dict[int, Path] = {}
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        try:
+            self._watch_tree(self.root)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def _watch_tree(self, directory: Path):
+        for current, _, _ in os.walk(directory):
+            wd = self._add_watch(self.fd, os.fsencode(current), WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {current}")
+            self.directories[wd] = Path(current)
+
+    def wait(self) -> Optional[Set[Path]]:
+        """
+        変更があるまで待ち、続けて届いたイベントもまとめて返す
+        """
+        select.select([self.fd], [], [])
+        changed: Set[Path] = set()
+        rescan = False
+
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                data = b''
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    rescan = True
+                elif mask & IN_IGNORED:
+                    self.directories.pop(wd, None)
+                elif mask & IN_ISDIR:
+                    # 追加されたディレクトリは監視対象に加え、中身は全体の比較で拾う
+                    if mask & (IN_CREATE | IN_MOVED_TO) and wd in self.directories:
+                        try:
+                            self._watch_tree(self.directories[wd] / os.fsdecode(name))
+                        except OSError as e:
+                            print(f"⚠️ Could not watch new directory: {e}")
+                    rescan = True
+                elif wd in self.directories and name:
+                    path = self.directories[wd] / os.fsdecode(name)
+                    if path.suffix in self.suffixes:
+                        changed.add(path)
+
+            if not select.select([self.fd], [], [], DEBOUNCE_SECONDS)[0]:
+                break
+
+        if rescan:
+            return None
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    一定間隔で全体の比較を促すだけの監視（inotify が使えない環境向け）
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+
+    def wait(self) -> Optional[Set[Path]]:
+        time.sleep(self.interval)
+        return None
+
+    def close(self):
+        pass
+
+
+def create_watcher(root: Path, suffixes: Tuple[str, ...], interval: float, polling: bool = False):
+    """
+    使える監視方法を選ぶ（polling=True ならポーリングに固定）
+    """
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root, suffixes)
+        except (OSError, AttributeError) as e:
+            print(f"⚠️ inotify unavailable ({e}), polling every {interval}s")
+    return PollingWatcher(interval)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+git の差分から変更されたファイルと行範囲を取得する
+
+string_migration.py の --since / --staged 用。`git diff --unified=0` の hunk ヘッダだけを読み、
+変更後のファイルで追加・変更された行範囲をファイル毎に返します。
+パスはプロジェクトルート（git リポジトリのサブディレクトリでもよい）からの相対パスです。
+"""
+
+import codecs
+import re
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# @@ -12,3 +14,5 @@ の変更後側（行数省略時は1行）
+_HUNK_HEADER = re.compile(rb'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+
+class GitDiffError(Exception):
+    """git コマンドが実行できない・失敗した"""
+
+
+def _run_git(project_root: Path, args: List[str]) -> bytes:
+    try:
+        completed = subprocess.run(['git', *args], cwd=str(project_root),
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise GitDiffError(f"git is not available: {e}")
+    if completed.returncode != 0:
+        message = completed.stderr.decode('utf-8', 'replace').strip()
+        raise GitDiffError(message or f"git {args[0]} failed")
+    return completed.stdout
+
+
+def changed_lines(project_root: Path, pathspec: str, since: Optional[str] = None,
+                  staged: bool = False) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    変更されたファイル -> 追加・変更された行範囲 [(開始行, 終了行)]（1始まり・両端含む）。
+    staged ならインデックスと HEAD の差分、そうでなければ since と作業ツリーの差分に
+    未追跡のファイル（全行が追加扱い）を加える。削除されたファイルは除く
+    """
+    args = ['-c', 'core.quotePath=false', 'diff', '--unified=0', '--no-color', '--no-ext-diff',
+            '--diff-filter=d', '--relative']
+    if staged:
+        args.append('--cached')
+    if since:
+        args.append(since)
+    args += ['--', pathspec]
+
+    ranges: Dict[str, List[Tuple[int, int]]] = {}
+    current = None
+    for line in _run_git(project_root, args).splitlines():
+        if line.startswith(b'+++ '):
+            target = _diff_path(line[4:])
+            current = ranges.setdefault(target[2:], []) if target.startswith('b/') else None
+            continue
+        match = _HUNK_HEADER.match(line)
+        if match and current is not None:
+            start = int(match.group(1))
+            count = int(match.group(2)) if match.group(2) is not None else 1
+            # 行数0は削除だけの hunk
+            if count:
+                current.append((start, start + count - 1))
+
+    if not staged:
+        # git diff は未追跡のファイルを含まないので、新規ファイルは別に列挙する
+        listed = _run_git(project_root, ['ls-files', '-z', '--others', '--exclude-standard', '--', pathspec])
+        for path in listed.decode('utf-8', 'surrogateescape').split('\0'):
+            if not path:
+                continue
+            try:
+                line_count = _count_lines(project_root / path)
+            except OSError:
+                continue
+            if line_count:
+                ranges[path] = [(1, line_count)]
+
+    # 追加行の無いファイル（削除のみ・モード変更のみ）は対象外
+    return {path: lines for path, lines in ranges.items() if lines}
+
+
+def _diff_path(raw: bytes) -> str:
+    """
+    +++ 行のパス。空白を含むパスの末尾のタブと、特殊文字を含むパスの C 形式のクォートを外す
+    """
+    raw = raw.rstrip(b'\t')
+    if raw.startswith(b'"') and raw.endswith(b'"'):
+        raw = codecs.escape_decode(raw[1:-1])[0]
+    return raw.decode('utf-8', 'surrogateescape')
+
+
+def _count_lines(path: Path) -> int:
+    data = path.read_bytes()
+    if not data:
+        return 0
+    return data.count(b'\n') + (not data.endswith(b'\n'))
+
+
+def read_staged(project_root: Path, relative_path: str) -> bytes:
+    """
+    インデックス（ステージ済み）の内容を読む
+    """
+    return _run_git(project_root, ['cat-file', 'blob', f':./{relative_path}'])
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+スキャン・検証結果のストリーミング出力
+
+string_migration.py の --output 用。結果全体をメモリに組み立ててから json.dump するのではなく、
+ファイル毎・セクション毎に書き出すため、出力サイズに依らずメモリ使用量が一定に収まります。
+
+    .jsonl / .ndjson  1行1レコードの NDJSON {"section": ..., "key": ..., "value": ...}
+    それ以外           JSON（compact でなければ json.dump(indent=2) と同じ内容・書式）
+
+compact モードでは空白を省き、各出現箇所の context（行の文字列）を contexts 表の番号に置き換えます。
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+NDJSON_SUFFIXES = ('.jsonl', '.ndjson')
+
+
+class ResultExporter:
+    """
+    with ResultExporter(path) as exporter: で開き、write / begin / end で要素を順に書き出す
+    """
+
+    def __init__(self, path: Path, compact: bool = False):
+        self.path = Path(path)
+        self.compact = compact
+        self.ndjson = self.path.suffix in NDJSON_SUFFIXES
+        self.contexts: Dict[str, int] = {}
+        self.sections: List[Optional[str]] = [None]
+        self.counts: List[int] = [0]
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, 'w', encoding='utf-8')
+        if not self.ndjson:
+            self.file.write('{')
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                if self.compact and not self.ndjson and self.contexts:
+                    self.write('contexts', list(self.contexts))
+                if not self.ndjson:
+                    self._close_object()
+        finally:
+            self.file.close()
+        return False
+
+    def write(self, key: str, value):
+        """
+        現在のオブジェクト（セクション）に1要素を書き出す
+        """
+        if self.ndjson:
+            self._write_record(key, value)
+            return
+
+        if self.compact:
+            self.file.write(f'{"," if self.counts[-1] else ""}\n{self._dumps(key)}:{self._dumps(value)}')
+        else:
+            indent = '\n' + '  ' * len(self.sections)
+            self.file.write(f'{"," if self.counts[-1] else ""}{indent}{self._dumps(key)}: ')
+            self.file.write(self._dumps(value).replace('\n', indent))
+        self.counts[-1] += 1
+
+    def begin(self, key: str):
+        """
+        要素を逐次書き出す入れ子のオブジェクトを開始
+        """
+        if not self.ndjson:
+            if self.compact:
+                self.file.write(f'{"," if self.counts[-1] else ""}\n{self._dumps(key)}:{{')
+            else:
+                indent = '\n' + '  ' * len(self.sections)
+                self.file.write(f'{"," if self.counts[-1] else ""}{indent}{self._dumps(key)}: {{')
+            self.counts[-1] += 1
+        self.sections.append(key)
+        self.counts.append(0)
+
+    def end(self):
+        """
+        begin で開始したオブジェクトを閉じる
+        """
+        if not self.ndjson:
+            self._close_object()
+        self.sections.pop()
+        self.counts.pop()
+
+    def occurrences(self, strings: List[Dict]) -> List[Dict]:
+        """
+        compact モードなら context を contexts 表の番号に置き換えた出現箇所リスト
+        """
+        if not self.compact:
+            return strings
+        return [{**info, 'context': self._intern(info['context'])} for info in strings]
+
+    def _intern(self, context: str) -> int:
+        index = self.contexts.get(context)
+        if index is None:
+            index = self.contexts[context] = len(self.contexts)
+            if self.ndjson:
+                # 参照より先に表の要素を出力しておく
+                self.file.write(self._dumps({"section": "contexts", "key": index, "value": context}) + '\n')
+        return index
+
+    def _write_record(self, key: str, value):
+        record = {"section": self.sections[-1], "key": key, "value": value}
+        self.file.write(self._dumps(record) + '\n')
+
+    def _close_object(self):
+        if self.counts[-1]:
+            self.file.write('\n' + '  ' * (len(self.sections) - 1) if not self.compact else '\n')
+        self.file.write('}')
+
+    def _dumps(self, value) -> str:
+        if self.compact or self.ndjson:
+            return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=_as_dict)
+        return json.dumps(value, ensure_ascii=False, indent=2, default=_as_dict)
+
+
+def _as_dict(value) -> Dict:
+    # keys() と [] を持つ出現箇所レコード (StringOccurrence) などは dict として出力
+    if hasattr(value, 'keys'):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
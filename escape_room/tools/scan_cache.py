@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+文字列スキャンの永続キャッシュ
+
+string_migration.py のファイル毎の解析結果（抽出文字列・AppLocalizations 使用回数）を
+SQLite に保存し、パス・mtime・サイズ・内容ハッシュが一致するファイルは再解析せずに再利用します。
+ツール自体（抽出ロジック・除外設定）が変わった場合はキャッシュ全体を破棄します。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+# キャッシュの既定ファイル名（プロジェクトルート直下、migration_status.json などの出力と同じ場所）
+DEFAULT_CACHE_NAME = ".string_migration_cache.sqlite"
+
+# 保存形式を変えたら上げる
+CACHE_VERSION = 2
+
+
+def content_hash(data: bytes) -> str:
+    """
+    ファイル内容のSHA-256
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class ScanCache:
+    """
+    相対パス毎に (mtime_ns, size, hash) と解析結果を保持する
+    """
+
+    def __init__(self, path: Path, fingerprint: str):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        self.rows: Dict[str, tuple] = {}
+        self.updated: Dict[str, tuple] = {}
+        self.touched: Dict[str, tuple] = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(str(self.path))
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, hash TEXT, analysis TEXT)"
+        )
+        return connection
+
+    def _load(self):
+        """
+        全行をメモリに読み込む（解析結果のJSONはヒットした分だけ後でデコード）
+        """
+        if not self.path.exists():
+            return
+        try:
+            connection = sqlite3.connect(str(self.path))
+            try:
+                meta = dict(connection.execute("SELECT key, value FROM meta"))
+                if meta.get('fingerprint') != self.fingerprint:
+                    return
+                for path, mtime_ns, size, digest, analysis in connection.execute(
+                        "SELECT path, mtime_ns, size, hash, analysis FROM files"):
+                    self.rows[path] = (mtime_ns, size, digest, analysis)
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            # 壊れたキャッシュは無視して作り直す
+            self.rows = {}
+
+    def is_fresh(self, key: str, stat: os.stat_result) -> bool:
+        """
+        mtime とサイズが記録と一致するか（解析結果はデコードしない）
+        """
+        row = self.rows.get(key)
+        return row is not None and row[0] == stat.st_mtime_ns and row[1] == stat.st_size
+
+    def lookup(self, key: str, stat: os.stat_result) -> Optional[Dict]:
+        """
+        mtime とサイズが記録と一致すれば解析結果を返す
+        """
+        if not self.is_fresh(key, stat):
+            return None
+        self.hits += 1
+        return json.loads(self.rows[key][3])
+
+    def lookup_content(self, key: str, stat: os.stat_result, digest: str) -> Optional[Dict]:
+        """
+        mtime だけ変わったファイル（touch・チェックアウト等）は内容ハッシュで照合する
+        """
+        row = self.rows.get(key)
+        if row is None or row[1] != stat.st_size or row[2] != digest:
+            return None
+        self.hits += 1
+        self.touched[key] = (stat.st_mtime_ns, stat.st_size, digest, row[3])
+        return json.loads(row[3])
+
+    def store(self, key: str, stat: os.stat_result, digest: str, analysis: Dict):
+        """
+        新しく解析した結果を記録
+        """
+        self.misses += 1
+        self.updated[key] = (stat.st_mtime_ns, stat.st_size, digest,
+                             json.dumps(analysis, ensure_ascii=False, separators=(',', ':')))
+
+    def save(self, live_keys: Iterable[str]):
+        """
+        変更分を書き込み、存在しなくなったファイルの行を削除する
+        """
+        live_keys = set(live_keys)
+        stale = [key for key in self.rows if key not in live_keys]
+        changes = {**self.touched, **self.updated}
+        if not changes and not stale and self.rows:
+            return
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = self._connect()
+            with connection:
+                stored = dict(connection.execute("SELECT key, value FROM meta"))
+                if stored.get('fingerprint') != self.fingerprint:
+                    connection.execute("DELETE FROM files")
+                    connection.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)",
+                                       (self.fingerprint,))
+                connection.executemany("DELETE FROM files WHERE path = ?", [(key,) for key in stale])
+                connection.executemany(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                    [(key, *row) for key, row in changes.items()]
+                )
+            connection.close()
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not update scan cache {self.path}: {e}")
+            return
+
+        for key in stale:
+            del self.rows[key]
+        self.rows.update(changes)
+        self.touched = {}
+        self.updated = {}
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+ソースファイルの索引と内容の読み出し
+
+string_migration.py の各解析（文字列抽出・AppLocalizations 使用回数・ファイル数）が
+同じファイルを何度も走査・読み込みしないよう、ディレクトリ走査は1回、読み込みはファイル毎に1回に限定します。
+大きなファイルは mmap で開き、ハッシュ計算・デコードをコピー無しで行います。
+"""
+
+import mmap
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Union
+
+# これ以上のサイズのファイルは mmap で読む（生成コード・巨大な定数テーブル等）
+MMAP_MIN_BYTES = 256 * 1024
+
+
+class SourceFile(NamedTuple):
+    """走査時に得たファイル情報（stat は走査時点のもの）"""
+    path: Path
+    relative_path: str
+    stat: os.stat_result
+
+
+class SourceIndex:
+    """
+    base_dir 以下の対象ファイルを1回の走査で列挙し、結果を保持する
+    """
+
+    def __init__(self, project_root: Path, base_dir: Path, suffix: str = '.dart'):
+        self.project_root = Path(project_root)
+        self.base_dir = Path(base_dir)
+        self.suffix = suffix
+        self._files: Optional[List[SourceFile]] = None
+
+    def files(self) -> List[SourceFile]:
+        """
+        対象ファイルの一覧（パスの構成要素順。初回のみ走査する）
+        """
+        if self._files is None:
+            self.refresh()
+        return self._files
+
+    def refresh(self):
+        """
+        ディレクトリを再走査する
+        """
+        files = []
+        if self.base_dir.is_dir():
+            self._walk(str(self.base_dir), files)
+        files.sort(key=lambda source: source.path.parts)
+        self._files = files
+
+    def _walk(self, directory: str, files: List[SourceFile]):
+        # scandir はエントリ種別を一緒に返すため、ディレクトリ判定に stat が要らない
+        try:
+            entries = list(os.scandir(directory))
+        except OSError as e:
+            print(f"❌ Error reading {directory}: {e}")
+            return
+
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                self._walk(entry.path, files)
+            elif entry.name.endswith(self.suffix):
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError as e:
+                    print(f"❌ Error reading {entry.path}: {e}")
+                    continue
+                path = Path(entry.path)
+                files.append(SourceFile(path, str(path.relative_to(self.project_root)), stat))
+
+    @contextmanager
+    def open(self, source: SourceFile) -> Iterator[Union[bytes, mmap.mmap]]:
+        """
+        ファイル内容をバッファとして開く（大きなファイルは mmap、それ以外は1回の read）
+        """
+        with open(source.path, 'rb') as f:
+            if source.stat.st_size < MMAP_MIN_BYTES:
+                yield f.read()
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
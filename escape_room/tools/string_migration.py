@@ -9,18 +9,174 @@ ARBファイルベースの多言語化システムに移行するためのツ
     python3 tools/string_migration.py --scan           # 文字列をスキャン
     python3 tools/string_migration.py --extract        # ARB候補を生成
     python3 tools/string_migration.py --validate       # 移行状況チェック
+    python3 tools/string_migration.py --scan --jobs 8  # 8プロセスで並列スキャン
+    python3 tools/string_migration.py --scan --no-cache  # キャッシュを使わず全ファイルを再解析
+    python3 tools/string_migration.py --validate --output status.jsonl --compact  # NDJSON で逐次出力
+    python3 tools/string_migration.py --scan --staged  # ステージ済みの変更で増えた文字列だけをスキャン（見つかれば終了コード1）
+    python3 tools/string_migration.py --scan --since origin/main  # origin/main 以降の変更だけをスキャン
+    python3 tools/string_migration.py --watch          # 変更を監視して移行状況を表示し続ける
 """
 
 import re
 import os
+import hashlib
 import json
 import argparse
-from typing import List, Dict, Set, Tuple
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Dict, Optional, Set, Tuple
 from pathlib import Path
 
+from arb_index import ArbIndex
+from dart_lexer import StringToken, tokenize
+from fs_watch import create_watcher
+from git_diff import GitDiffError, changed_lines, read_staged
+from scan_cache import CACHE_VERSION, DEFAULT_CACHE_NAME, ScanCache, content_hash
+from result_export import ResultExporter
+from source_index import SourceFile, SourceIndex
+
+# これ未満のファイル数ではプロセス起動コストの方が大きいため直列でスキャン
+PARALLEL_MIN_FILES = 64
+
+# AppLocalizations の使用箇所
+LOCALIZATION_CALL = 'AppLocalizations.of(context)'
+
+# UTF-8 としてデコードできなかったファイルの解析結果（キャッシュに残し、内容が変わるまで再読み込みしない）
+UNDECODABLE = {'undecodable': True}
+
+
+OCCURRENCE_FIELDS = ('content', 'line', 'column', 'context', 'has_japanese', 'is_ui_text', 'suggested_key')
+
+
+class SourceText:
+    """
+    1ファイル分のソースと、出現箇所の遅延評価に使うツール（同じファイルの出現箇所で共有する）
+    """
+    __slots__ = ('text', 'tool')
+    
+    def __init__(self, text: Optional[str], tool: 'StringMigrationTool'):
+        self.text = text
+        self.tool = tool
+
+
+class StringOccurrence:
+    """
+    ハードコード文字列1個分の出現箇所
+    
+    内容と行は共有バッファ (SourceText) 上の位置で持ち、context・has_japanese・is_ui_text・
+    suggested_key は参照時に求める。occurrence['content'] のように dict と同じ形で参照でき、
+    dict(occurrence) で出力用の dict になる
+    """
+    __slots__ = ('source', 'start', 'end', 'line', 'column', 'line_start',
+                 '_content', '_context', '_is_ui_text', '_suggested_key')
+    
+    def __init__(self, source: SourceText, start: int, end: int, line: int, column: int, line_start: int):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.line = line
+        self.column = column
+        self.line_start = line_start
+        self._content = None
+        self._context = None
+        self._is_ui_text = None
+        self._suggested_key = None
+    
+    @classmethod
+    def from_row(cls, source: SourceText, row: List) -> 'StringOccurrence':
+        """
+        キャッシュ・ワーカーから受け取った [content, line, column, context] から復元する
+        """
+        content, line, column, context = row
+        occurrence = cls(source, 0, 0, line, column, 0)
+        occurrence._content = content
+        occurrence._context = context
+        return occurrence
+    
+    def row(self) -> List:
+        """
+        キャッシュ・プロセス間受け渡し用の最小限の表現
+        """
+        return [self.content, self.line, self.column, self.context]
+    
+    @property
+    def content(self) -> str:
+        if self._content is not None:
+            return self._content
+        return self.source.text[self.start:self.end]
+    
+    @property
+    def context(self) -> str:
+        if self._context is not None:
+            return self._context
+        text = self.source.text
+        line_end = text.find('\n', self.start)
+        return text[self.line_start:line_end if line_end >= 0 else len(text)].strip()
+    
+    @property
+    def has_japanese(self) -> bool:
+        return bool(self.source.tool.japanese_pattern.search(self.content))
+    
+    @property
+    def is_ui_text(self) -> bool:
+        if self._is_ui_text is None:
+            self._is_ui_text = self.source.tool._is_likely_ui_text(self.content, self.context)
+        return self._is_ui_text
+    
+    @property
+    def suggested_key(self) -> str:
+        if self._suggested_key is None:
+            self._suggested_key = self.source.tool._suggest_key_name(self.content)
+        return self._suggested_key
+    
+    def keys(self) -> Tuple[str, ...]:
+        return OCCURRENCE_FIELDS
+    
+    def __getitem__(self, key: str):
+        if key not in OCCURRENCE_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+
+class ScanTotals:
+    """
+    スキャン結果を保持せずにファイル単位で集計する（ストリーミング出力・サマリー用）
+    """
+    
+    def __init__(self):
+        self.files = 0
+        self.strings = 0
+        self.ui_strings = 0
+        self.japanese_strings = 0
+    
+    def add(self, strings: List[Dict]):
+        self.files += 1
+        self.strings += len(strings)
+        self.ui_strings += sum(1 for s in strings if s['is_ui_text'])
+        self.japanese_strings += sum(1 for s in strings if s['has_japanese'])
+    
+    def merge(self, other: 'ScanTotals'):
+        self.files += other.files
+        self.strings += other.strings
+        self.ui_strings += other.ui_strings
+        self.japanese_strings += other.japanese_strings
+    
+    @classmethod
+    def of(cls, results: Iterable[List[Dict]]) -> 'ScanTotals':
+        totals = cls()
+        for strings in results:
+            totals.add(strings)
+        return totals
+
+
 class StringMigrationTool:
-    def __init__(self, project_root: str):
+    def __init__(self, project_root: str, jobs: Optional[int] = None,
+                 cache_file: Optional[str] = DEFAULT_CACHE_NAME):
         self.project_root = Path(project_root)
+        # スキャンの並列度 (None/0 = CPUコア数, 1 = 直列)
+        self.jobs = jobs or os.cpu_count() or 1
         self.lib_dir = self.project_root / "lib"
         self.l10n_dir = self.project_root / "lib" / "l10n"
         self.arb_en = self.l10n_dir / "app_en.arb"
@@ -29,18 +185,10 @@ class StringMigrationTool:
         # 日本語文字の正規表現
         self.japanese_pattern = re.compile(r'[\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FAF\u3000-\u303F]')
         
-        # 文字列リテラルの正規表現
-        self.string_patterns = [
-            re.compile(r"'([^'\\\\]*(\\\\.[^'\\\\]*)*)'"),  # シングルクォート
-            re.compile(r'"([^"\\\\]*(\\\\.[^"\\\\]*)*)"'),  # ダブルクォート
-        ]
-        
         # 除外するパターン
         self.exclude_patterns = [
             r'import\s+',
             r'part\s+',
-            r'//.*',
-            r'/\*.*\*/',
             r'print\s*\(',
             r'debugPrint\s*\(',
             r'assert\s*\(',
@@ -54,94 +202,361 @@ class StringMigrationTool:
             'http', 'https', 'www', '.com', '.jp',
             'TODO', 'FIXME', 'DEBUG', 'ERROR',
         }
+        
+        # 技術的な文字列の目印
+        self.technical_indicators = [
+            '/', '\\\\', ':', '.', '_test', '_debug',
+            'localhost', '127.0.0.1', 'firebase',
+            'ca-app-pub-', 'google.com', 'android',
+        ]
+        
+        # UI テキストが置かれる行の目印
+        self.ui_indicators = [
+            'Text(', 'title:', 'subtitle:', 'label:', 'hint:',
+            'AppBar', 'AlertDialog', 'SnackBar', 'tooltip:',
+            'ElevatedButton', 'TextButton', 'IconButton',
+        ]
+        
+        self._compile_patterns()
+        
+        # 各ファイルを1回読み込んだ内容に適用する解析 {結果名: 内容 -> 結果}
+        self.visitors = {
+            'strings': self._extract_strings,
+            'usage_count': self._count_localization_usage,
+        }
+        
+        # lib 以下の走査結果（全ての解析で共有）
+        self.source_index = SourceIndex(self.project_root, self.lib_dir)
+        
+        # ファイル毎の解析結果の永続キャッシュ (None = 無効)
+        self.cache = ScanCache(self.project_root / cache_file, self._cache_fingerprint()) if cache_file else None
+        
+        # 直近の解析パスでの AppLocalizations 使用回数 {相対パス: 回数}（解析結果そのものは保持しない）
+        self.usage_counts: Optional[Dict[str, int]] = None
+        
+        # 既存 ARB の索引（初回の参照時に読み込む）
+        self.arb_index: Optional[ArbIndex] = None
+        
+        # --watch 中のファイル毎の (mtime_ns, サイズ)・集計と ARB ファイルの (mtime_ns, サイズ)
+        self.watch_stats: Dict[str, Tuple[int, int]] = {}
+        self.file_totals: Dict[str, ScanTotals] = {}
+        self.watched_arb_stats: Dict[str, Tuple[int, int]] = {}
+    
+    def __getstate__(self):
+        # ワーカープロセスにはキャッシュ・走査結果・解析結果・ARB 索引・監視状態を渡さない
+        state = self.__dict__.copy()
+        state['cache'] = None
+        state['usage_counts'] = None
+        state['source_index'] = None
+        state['arb_index'] = None
+        state['watch_stats'] = {}
+        state['file_totals'] = {}
+        return state
+    
+    def _compile_patterns(self):
+        """
+        除外キーワード・技術文字列・UI行の判定パターンをまとめてコンパイルする
+        """
+        # 識別子の途中 (counterpart など) にはマッチさせない
+        self.exclude_pattern = re.compile(r'\b(?:' + "|".join(self.exclude_patterns) + ')')
+        self.technical_pattern = re.compile("|".join(re.escape(i) for i in self.technical_indicators))
+        self.ui_pattern = re.compile("|".join(re.escape(i) for i in self.ui_indicators))
+    
+    def _cache_fingerprint(self) -> str:
+        """
+        抽出結果を左右するもの（ツール・レキサーのソースと除外設定）のハッシュ
+        """
+        digest = hashlib.sha256(str(CACHE_VERSION).encode())
+        tools_dir = Path(__file__).resolve().parent
+        for source in ('string_migration.py', 'dart_lexer.py', 'source_index.py'):
+            digest.update((tools_dir / source).read_bytes())
+        settings = [sorted(self.visitors), self.exclude_patterns, sorted(self.exclude_strings),
+                    self.technical_indicators, self.ui_indicators]
+        digest.update(json.dumps(settings, ensure_ascii=False).encode())
+        return digest.hexdigest()
     
     def scan_hardcoded_strings(self) -> Dict[str, List[Dict]]:
         """
         ハードコードされた文字列をスキャンする
         """
+        return dict(self.iter_hardcoded_strings())
+    
+    def iter_hardcoded_strings(self) -> Iterator[Tuple[str, List[Dict]]]:
+        """
+        ハードコードされた文字列を、ファイル毎に解析が終わった順（パス順）で返す
+        """
         print("🔍 Scanning hardcoded strings...")
-        results = {}
         
-        for dart_file in self.lib_dir.rglob("*.dart"):
-            strings = self._extract_strings_from_file(dart_file)
+        for relative_path, analysis in self._iter_analyses():
+            if analysis and analysis['strings']:
+                yield relative_path, analysis['strings']
+    
+    def scan_changed_strings(self, since: Optional[str] = None, staged: bool = False,
+                             whole_files: bool = False) -> Dict[str, List[Dict]]:
+        """
+        git の差分に含まれる Dart ファイルだけをスキャンし、追加・変更された行の文字列を返す
+        （whole_files なら変更されたファイルの全ての文字列）。staged ならインデックスの内容を読む
+        """
+        target = "staged changes" if staged else f"changes since {since or 'HEAD'}"
+        print(f"🔍 Scanning hardcoded strings in {target}...")
+        
+        try:
+            ranges = changed_lines(self.project_root, f"{self.lib_dir.relative_to(self.project_root)}/*.dart",
+                                   since, staged)
+        except GitDiffError as e:
+            print(f"❌ Error reading git diff: {e}")
+            return {}
+        
+        results = {}
+        for relative_path in sorted(ranges, key=lambda path: Path(path).parts):
+            file_path = self.project_root / relative_path
+            try:
+                data = read_staged(self.project_root, relative_path) if staged else file_path.read_bytes()
+            except (OSError, GitDiffError) as e:
+                print(f"❌ Error reading {file_path}: {e}")
+                continue
+            
+            analysis = self._analyze_source(file_path, data)
+            if not analysis:
+                continue
+            strings = analysis['strings']
+            if not whole_files:
+                strings = [s for s in strings if _in_line_ranges(s['line'], ranges[relative_path])]
             if strings:
-                results[str(dart_file.relative_to(self.project_root))] = strings
+                results[relative_path] = strings
         
+        print(f"  📄 {len(ranges)} changed files")
         return results
     
-    def _extract_strings_from_file(self, file_path: Path) -> List[Dict]:
+    def _iter_analyses(self) -> Iterator[Tuple[str, Optional[Dict]]]:
         """
-        ファイルから文字列を抽出する
+        lib 以下の全Dartファイルを1回の走査・1回の読み込みで解析し、パス順に返す
+        （キャッシュと mtime・サイズ・内容が一致するファイルは再解析しない）
         """
+        # 解析パス毎に1回だけ走査し、以降の集計はこの一覧を使う
+        self.source_index.refresh()
+        sources = self.source_index.files()
+        self.usage_counts = {}
+        
+        fresh = [bool(self.cache) and self.cache.is_fresh(source.relative_path, source.stat) for source in sources]
+        parallel = self.jobs > 1 and fresh.count(False) >= PARALLEL_MIN_FILES
+        parsed = 0
+        executor = None
+        
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except Exception as e:
+            if parallel:
+                # 変更されたファイルを先に読んでプールへ渡し、結果は入力順に1件ずつ受け取る
+                content_hits, pending = self._read_changed_sources(
+                    [source for source, is_fresh in zip(sources, fresh) if not is_fresh]
+                )
+                parsed = len(pending)
+                chunksize = max(1, len(pending) // (self.jobs * 4))
+                executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_scan_worker,
+                                               initargs=(self,))
+                results = executor.map(_analyze_source_worker, [item[0].path for item in pending],
+                                       [item[2] for item in pending], chunksize=chunksize)
+                pending_digests = {item[0].relative_path: item[1] for item in pending}
+            
+            for source, is_fresh in zip(sources, fresh):
+                relative_path = source.relative_path
+                # キャッシュ・ワーカーからの結果は出現箇所を行リストで持つため、ここで復元する
+                if is_fresh:
+                    analysis = self._unpack_analysis(self.cache.lookup(relative_path, source.stat))
+                elif not parallel:
+                    content_hits, pending = self._read_changed_sources([source], keep_data=False)
+                    analysis = self._unpack_analysis(content_hits.get(relative_path))
+                    parsed += len(pending)
+                    for _, digest, result in pending:
+                        analysis = result
+                        if self.cache:
+                            self._record_analysis(source, digest, self._pack_analysis(result))
+                elif relative_path in content_hits:
+                    analysis = self._unpack_analysis(content_hits.pop(relative_path))
+                elif relative_path in pending_digests:
+                    packed = next(results)
+                    self._record_analysis(source, pending_digests.pop(relative_path), packed)
+                    analysis = self._unpack_analysis(packed)
+                else:
+                    analysis = None
+                
+                if analysis and analysis['usage_count']:
+                    self.usage_counts[relative_path] = analysis['usage_count']
+                yield relative_path, analysis
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        if self.cache:
+            self.cache.save(source.relative_path for source in sources)
+            print(f"  ♻️ Reused {len(sources) - parsed} cached files, parsed {parsed}")
+    
+    def _read_changed_sources(self, sources: List[SourceFile], keep_data: bool = True
+                              ) -> Tuple[Dict[str, Dict], List[Tuple]]:
+        """
+        mtime・サイズが変わったファイルを読み、内容ハッシュがキャッシュと一致する分はその結果を返す。
+        残りは keep_data なら (ファイル, ハッシュ, 内容) として、そうでなければその場で解析して
+        (ファイル, ハッシュ, 解析結果) として返す
+        """
+        content_hits = {}
+        pending = []
+        
+        for source in sources:
+            try:
+                with self.source_index.open(source) as buffer:
+                    digest = None
+                    if self.cache:
+                        digest = content_hash(buffer)
+                        cached = self.cache.lookup_content(source.relative_path, source.stat, digest)
+                        if cached is not None:
+                            content_hits[source.relative_path] = cached
+                            continue
+                    
+                    # 並列化する場合はワーカーへ渡すため bytes として保持し、直列ならその場で解析する
+                    if keep_data:
+                        pending.append((source, digest, bytes(buffer)))
+                    else:
+                        pending.append((source, digest, self._analyze_source(source.path, buffer)))
+            except OSError as e:
+                print(f"❌ Error reading {source.path}: {e}")
+        
+        return content_hits, pending
+    
+    def _record_analysis(self, source: SourceFile, digest: Optional[str], packed: Optional[Dict]):
+        if self.cache and packed is not None:
+            self.cache.store(source.relative_path, source.stat, digest, packed)
+    
+    def _pack_analysis(self, analysis: Optional[Dict]) -> Dict:
+        """
+        解析結果を JSON・pickle にできる形へ（出現箇所は [content, line, column, context] の行、
+        デコードできなかったファイルは UNDECODABLE）
+        """
+        if analysis is None:
+            return UNDECODABLE
+        return {**analysis, 'strings': [occurrence.row() for occurrence in analysis['strings']]}
+    
+    def _unpack_analysis(self, packed: Optional[Dict]) -> Optional[Dict]:
+        """
+        _pack_analysis の逆（同じファイルの出現箇所で SourceText を共有する）
+        """
+        if packed is None or packed.get('undecodable'):
+            return None
+        source = SourceText(None, self)
+        return {**packed, 'strings': [StringOccurrence.from_row(source, row) for row in packed['strings']]}
+    
+    def _analyze_source(self, file_path: Path, data) -> Optional[Dict]:
+        """
+        1ファイル分の内容に全ビジターを適用する（data は bytes または mmap）
+        """
+        try:
+            content = str(data, 'utf-8')
+        except UnicodeDecodeError as e:
             print(f"❌ Error reading {file_path}: {e}")
+            return None
+        
+        return {name: visit(content) for name, visit in self.visitors.items()}
+    
+    def _count_localization_usage(self, content: str) -> int:
+        """
+        AppLocalizations の使用回数
+        """
+        return content.count(LOCALIZATION_CALL)
+    
+    def _extract_strings(self, content: str) -> List['StringOccurrence']:
+        """
+        Dartソースを字句解析して文字列リテラルを抽出する
+        """
+        literals = []
+        masked_starts = []
+        masked_ends = []
+        
+        # コメントと文字列（補間式の中身を含む）はキーワード判定の対象から外す
+        for token in tokenize(content):
+            if isinstance(token, StringToken) and token.terminated:
+                literals.append(token)
+            if not masked_ends or token.start >= masked_ends[-1]:
+                masked_starts.append(token.start)
+                masked_ends.append(token.end)
+        
+        if not literals:
             return []
         
+        # コード中に現れた除外キーワードの位置
+        keyword_positions = []
+        for match in self.exclude_pattern.finditer(content):
+            position = match.start()
+            index = bisect_right(masked_starts, position) - 1
+            if index < 0 or position >= masked_ends[index]:
+                keyword_positions.append(position)
+        
         strings = []
-        lines = content.split('\n')
+        line_num = 1
+        line_start = 0
+        line_end = -1
+        line_excluded = False
+        source = SourceText(content, self)
         
-        for line_num, line in enumerate(lines, 1):
-            # 除外パターンをチェック
-            if any(re.search(pattern, line) for pattern in self.exclude_patterns):
+        # トークンは開始位置順に並ぶので、行番号は直前のトークンからの改行数で進める
+        for token in literals:
+            quote_start = token.quote_start
+            if quote_start > line_end:
+                line_num += content.count('\n', line_start, quote_start)
+                line_start = content.rfind('\n', 0, quote_start) + 1
+                line_end = content.find('\n', quote_start)
+                if line_end < 0:
+                    line_end = len(content)
+                # 除外キーワードを含む行のリテラルはスキップ
+                index = bisect_left(keyword_positions, line_start)
+                line_excluded = index < len(keyword_positions) and keyword_positions[index] < line_end
+            
+            if line_excluded:
                 continue
             
-            # 文字列リテラルを抽出
-            for pattern in self.string_patterns:
-                for match in pattern.finditer(line):
-                    string_content = match.group(1)
-                    
-                    # 除外文字列をスキップ
-                    if string_content in self.exclude_strings:
-                        continue
-                    
-                    # 空白のみをスキップ
-                    if not string_content.strip():
-                        continue
-                    
-                    # 技術的な文字列をスキップ
-                    if self._is_technical_string(string_content):
-                        continue
-                    
-                    string_info = {
-                        'content': string_content,
-                        'line': line_num,
-                        'column': match.start() + 1,
-                        'context': line.strip(),
-                        'has_japanese': bool(self.japanese_pattern.search(string_content)),
-                        'is_ui_text': self._is_likely_ui_text(string_content, line),
-                        'suggested_key': self._suggest_key_name(string_content),
-                    }
-                    strings.append(string_info)
+            string_content = content[token.text_start:token.text_end]
+            
+            # 除外文字列をスキップ
+            if string_content in self.exclude_strings:
+                continue
+            
+            # 空白のみ・補間のみ ('$score' など) をスキップ
+            if not self._literal_text(content, token).strip():
+                continue
+            
+            # 技術的な文字列をスキップ
+            if self._is_technical_string(string_content):
+                continue
+            
+            # 内容・行は共有バッファ上の位置だけを持ち、他の項目は参照時に求める
+            strings.append(StringOccurrence(source, token.text_start, token.text_end, line_num,
+                                            quote_start - line_start + 1, line_start))
         
         return strings
     
+    def _literal_text(self, content: str, token: StringToken) -> str:
+        """
+        補間部分を除いたリテラル本文
+        """
+        if not token.interpolations:
+            return content[token.text_start:token.text_end]
+        
+        parts = []
+        position = token.text_start
+        for start, end in token.interpolations:
+            parts.append(content[position:start])
+            position = end
+        parts.append(content[position:token.text_end])
+        return ''.join(parts)
+    
     def _is_technical_string(self, string_content: str) -> bool:
         """
         技術的な文字列かどうかを判定
         """
-        technical_indicators = [
-            '/', '\\\\', ':', '.', '_test', '_debug',
-            'localhost', '127.0.0.1', 'firebase',
-            'ca-app-pub-', 'google.com', 'android',
-        ]
-        
-        lower_content = string_content.lower()
-        return any(indicator in lower_content for indicator in technical_indicators)
+        return self.technical_pattern.search(string_content.lower()) is not None
     
     def _is_likely_ui_text(self, string_content: str, line_context: str) -> bool:
         """
         UI テキストである可能性が高いかを判定
         """
-        ui_indicators = [
-            'Text(', 'title:', 'subtitle:', 'label:', 'hint:',
-            'AppBar', 'AlertDialog', 'SnackBar', 'tooltip:',
-            'ElevatedButton', 'TextButton', 'IconButton',
-        ]
-        
-        return any(indicator in line_context for indicator in ui_indicators)
+        return self.ui_pattern.search(line_context) is not None
     
     def _suggest_key_name(self, string_content: str) -> str:
         """
@@ -189,58 +604,80 @@ class StringMigrationTool:
         """
         print("📝 Generating ARB candidates...")
         
-        en_candidates = {}
-        ja_candidates = {}
+        # 既存のARBファイルを1回だけ読み込んで索引化
+        arb_index = self._load_arb_index()
         
-        # 既存のARBファイルを読み込み
-        existing_en = self._load_arb_file(self.arb_en) if self.arb_en.exists() else {}
-        existing_ja = self._load_arb_file(self.arb_ja) if self.arb_ja.exists() else {}
-        
-        # 優先度付きで処理
-        all_strings = []
+        # 1パスで文言毎に代表の出現箇所を決める（UI テキストの出現を優先、同順位なら先に見つかったもの）
+        occurrences: Dict[str, Tuple[str, Dict]] = {}
         for file_path, strings in scan_results.items():
             for string_info in strings:
-                all_strings.append((file_path, string_info))
+                current = occurrences.get(string_info['content'])
+                if current is None or (string_info['is_ui_text'] and not current[1]['is_ui_text']):
+                    occurrences[string_info['content']] = (file_path, string_info)
         
-        # UI テキストを優先してソート
-        all_strings.sort(key=lambda x: (
-            not x[1]['is_ui_text'],  # UI テキストを先に
-            not x[1]['has_japanese'],  # 日本語文字列を先に
-            x[1]['content']
+        # UI テキスト・日本語文字列を先に出力（重複除去後の文言だけを並べる）
+        ordered = sorted(occurrences.items(), key=lambda item: (
+            not item[1][1]['is_ui_text'],
+            not item[1][1]['has_japanese'],
+            item[0]
         ))
         
-        processed_contents = set()
-        for file_path, string_info in all_strings:
-            content = string_info['content']
-            
-            # 重複除去
-            if content in processed_contents:
+        en_candidates = {}
+        ja_candidates = {}
+        already_localized = 0
+        
+        for content, (file_path, string_info) in ordered:
+            # 同じ文言が（別のキーでも）既に ARB ファイルにあれば候補にしない
+            if arb_index.find(content) is not None:
+                already_localized += 1
                 continue
-            processed_contents.add(content)
             
-            # 既に ARB ファイルに存在するかチェック
-            suggested_key = string_info['suggested_key']
-            if suggested_key in existing_en:
-                continue
+            key = self._unique_key(string_info['suggested_key'], arb_index, en_candidates)
             
             # メタデータ付きで ARB エントリを生成
             description = self._generate_description(content, string_info)
             
-            en_candidates[suggested_key] = content if not string_info['has_japanese'] else "[TRANSLATION_NEEDED]"
-            en_candidates[f"@{suggested_key}"] = {
+            en_candidates[key] = content if not string_info['has_japanese'] else "[TRANSLATION_NEEDED]"
+            en_candidates[f"@{key}"] = {
                 "description": description,
                 "source_file": file_path,
                 "source_line": string_info['line']
             }
             
             if string_info['has_japanese']:
-                ja_candidates[suggested_key] = content
+                ja_candidates[key] = content
+        
+        if already_localized:
+            print(f"  ♻️ Skipped {already_localized} strings already in ARB files")
         
         return {
             'en': en_candidates,
             'ja': ja_candidates
         }
     
+    def _unique_key(self, key: str, arb_index: ArbIndex, candidates: Dict) -> str:
+        """
+        既存の ARB キー・他の候補と衝突しないキー（衝突すれば連番を付ける）
+        """
+        unique_key = key
+        number = 2
+        while unique_key in arb_index or unique_key in candidates:
+            unique_key = f"{key}{number}"
+            number += 1
+        return unique_key
+    
+    def _load_arb_index(self) -> ArbIndex:
+        """
+        既存の ARB ファイルを読み込んで索引化する（1回の実行で1回だけ）
+        """
+        if self.arb_index is None:
+            arb_index = ArbIndex()
+            for lang, file_path in [('en', self.arb_en), ('ja', self.arb_ja)]:
+                if file_path.exists():
+                    arb_index.add_locale(lang, self._load_arb_file(file_path))
+            self.arb_index = arb_index
+        return self.arb_index
+    
     def _load_arb_file(self, file_path: Path) -> Dict:
         """
         ARBファイルを読み込み
@@ -277,12 +714,12 @@ class StringMigrationTool:
         # ARB ファイルの状況
         arb_status = self._validate_arb_files()
         
+        # 残存するハードコード文字列（ここで全ファイルを解析し、以降の集計はその結果を使う）
+        remaining_strings = self.scan_hardcoded_strings()
+        
         # AppLocalizations の使用状況
         usage_status = self._validate_localization_usage()
         
-        # 残存するハードコード文字列
-        remaining_strings = self.scan_hardcoded_strings()
-        
         return {
             'arb_files': arb_status,
             'localization_usage': usage_status,
@@ -290,6 +727,41 @@ class StringMigrationTool:
             'migration_progress': self._calculate_migration_progress(remaining_strings)
         }
     
+    def export_validation(self, output_file: str, compact: bool = False) -> Optional[Dict]:
+        """
+        移行状況を検証しながら結果を逐次出力する（残存文字列はファイル毎に書き出し、保持しない）
+        
+        出力では remaining_hardcoded が localization_usage より先に来る。
+        戻り値はサマリー表示用で remaining_hardcoded を含まない
+        """
+        print("✅ Validating migration status...")
+        output_path = self.project_root / output_file
+        
+        try:
+            with ResultExporter(output_path, compact) as exporter:
+                arb_status = self._validate_arb_files()
+                exporter.write('arb_files', arb_status)
+                
+                totals = ScanTotals()
+                exporter.begin('remaining_hardcoded')
+                for relative_path, strings in self.iter_hardcoded_strings():
+                    exporter.write(relative_path, exporter.occurrences(strings))
+                    totals.add(strings)
+                exporter.end()
+                
+                status = {
+                    'arb_files': arb_status,
+                    'localization_usage': self._validate_localization_usage(),
+                    'migration_progress': self._migration_progress(totals, len(self.source_index.files())),
+                }
+                exporter.write('localization_usage', status['localization_usage'])
+                exporter.write('migration_progress', status['migration_progress'])
+            print(f"✅ Results exported to: {output_path}")
+            return status
+        except Exception as e:
+            print(f"❌ Error exporting results: {e}")
+            return None
+    
     def _validate_arb_files(self) -> Dict:
         """
         ARB ファイルの妥当性を検証
@@ -302,7 +774,7 @@ class StringMigrationTool:
                 continue
             
             status[lang]['exists'] = True
-            arb_data = self._load_arb_file(file_path)
+            arb_data = self._load_arb_index().data.get(lang, {})
             
             # 文字列エントリの数（メタデータ除外）
             string_keys = [k for k in arb_data.keys() if not k.startswith('@') and not k.startswith('@@')]
@@ -322,59 +794,202 @@ class StringMigrationTool:
         """
         AppLocalizations の使用状況を検証
         """
-        usage_count = 0
-        files_with_usage = []
-        
-        for dart_file in self.lib_dir.rglob("*.dart"):
-            try:
-                with open(dart_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    
-                if 'AppLocalizations.of(context)' in content:
-                    usage_count += len(re.findall(r'AppLocalizations\.of\(context\)', content))
-                    files_with_usage.append(str(dart_file.relative_to(self.project_root)))
-            except Exception:
-                continue
+        if self.usage_counts is None:
+            # まだ解析パスを実行していなければ1回流して使用回数だけ集める
+            for _ in self._iter_analyses():
+                pass
         
         return {
-            'total_usage_count': usage_count,
-            'files_count': len(files_with_usage),
-            'files_with_usage': files_with_usage
+            'total_usage_count': sum(self.usage_counts.values()),
+            'files_count': len(self.usage_counts),
+            'files_with_usage': list(self.usage_counts)
         }
     
     def _calculate_migration_progress(self, remaining_strings: Dict) -> Dict:
         """
         移行進捗を計算
         """
-        total_files = len(list(self.lib_dir.rglob("*.dart")))
-        files_with_hardcoded = len(remaining_strings)
-        
-        total_hardcoded = sum(len(strings) for strings in remaining_strings.values())
-        ui_text_count = sum(
-            sum(1 for s in strings if s['is_ui_text']) 
-            for strings in remaining_strings.values()
-        )
-        
+        return self._migration_progress(ScanTotals.of(remaining_strings.values()), len(self.source_index.files()))
+    
+    def _migration_progress(self, totals: ScanTotals, total_files: int) -> Dict:
         return {
             'total_dart_files': total_files,
-            'files_with_hardcoded': files_with_hardcoded,
-            'total_hardcoded_strings': total_hardcoded,
-            'ui_text_remaining': ui_text_count,
-            'migration_percentage': max(0, 100 - (files_with_hardcoded / total_files * 100)),
+            'files_with_hardcoded': totals.files,
+            'total_hardcoded_strings': totals.strings,
+            'ui_text_remaining': totals.ui_strings,
+            'migration_percentage': max(0, 100 - (totals.files / total_files * 100)) if total_files else 100.0,
         }
     
-    def export_results(self, data: Dict, output_file: str):
+    def export_results(self, data: Dict, output_file: str, compact: bool = False):
         """
         結果をファイルに出力
         """
         output_path = self.project_root / output_file
         
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with ResultExporter(output_path, compact) as exporter:
+                for key, value in data.items():
+                    exporter.write(key, value)
+            print(f"✅ Results exported to: {output_path}")
+        except Exception as e:
+            print(f"❌ Error exporting results: {e}")
+    
+    def export_scan(self, output_file: str, compact: bool = False) -> ScanTotals:
+        """
+        スキャンしながらファイル毎に結果を出力する（結果全体をメモリに持たない）
+        """
+        output_path = self.project_root / output_file
+        totals = ScanTotals()
+        
+        try:
+            with ResultExporter(output_path, compact) as exporter:
+                # compact では contexts 表と並べるため files の下に置く
+                if compact:
+                    exporter.begin('files')
+                for relative_path, strings in self.iter_hardcoded_strings():
+                    exporter.write(relative_path, exporter.occurrences(strings))
+                    totals.add(strings)
+                if compact:
+                    exporter.end()
             print(f"✅ Results exported to: {output_path}")
         except Exception as e:
             print(f"❌ Error exporting results: {e}")
+        
+        return totals
+    
+    def watch(self, poll_interval: float = 0.5, polling: bool = False):
+        """
+        lib/（ARB ファイルを含む）を監視し、変更されたファイルだけ再解析して移行状況を表示し続ける
+        """
+        print("👀 Watching for changes (Ctrl+C to stop)...")
+        
+        # 初回は通常の解析パス（キャッシュが効く）でファイル毎の集計を作る
+        self.watch_stats.clear()
+        self.file_totals.clear()
+        for relative_path, analysis in self._iter_analyses():
+            self._update_file_totals(relative_path, analysis)
+        for source in self.source_index.files():
+            self.watch_stats[source.relative_path] = (source.stat.st_mtime_ns, source.stat.st_size)
+        self.watched_arb_stats = self._arb_stats()
+        arb_status = self._validate_arb_files()
+        self._print_watch_status(arb_status, [], 0.0)
+        
+        watcher = create_watcher(self.lib_dir, ('.dart', '.arb'), poll_interval, polling)
+        try:
+            while True:
+                paths = watcher.wait()
+                started = time.perf_counter()
+                changed, arb_changed = self._sync_watched_files(paths)
+                if not changed and not arb_changed:
+                    continue
+                if arb_changed:
+                    self.arb_index = None
+                    arb_status = self._validate_arb_files()
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self._print_watch_status(arb_status, changed + (['ARB'] if arb_changed else []), elapsed_ms)
+        except KeyboardInterrupt:
+            print("\n👋 Stopped watching")
+        finally:
+            watcher.close()
+            # 監視中に解析した結果は終了時にまとめてキャッシュへ書き込む
+            if self.cache:
+                self.cache.save(self.watch_stats)
+    
+    def _sync_watched_files(self, paths: Optional[Set[Path]]) -> Tuple[List[str], bool]:
+        """
+        変更されたファイル（None なら lib/ 全体の stat 比較で見つけたもの）を再解析する。
+        再解析した Dart ファイルの相対パスと、ARB ファイルが変わったかを返す
+        """
+        if self.usage_counts is None:
+            self.usage_counts = {}
+        if paths is None:
+            self.source_index.refresh()
+            current = {source.relative_path: source for source in self.source_index.files()}
+            candidates = set(current) | set(self.watch_stats)
+            arb_changed = self._arb_stats() != self.watched_arb_stats
+        else:
+            current = {}
+            candidates = set()
+            arb_changed = False
+            for path in paths:
+                if path.suffix == '.arb':
+                    arb_changed = True
+                    continue
+                relative_path = str(path.relative_to(self.project_root))
+                candidates.add(relative_path)
+                try:
+                    current[relative_path] = SourceFile(path, relative_path, path.stat())
+                except OSError:
+                    pass
+        
+        self.watched_arb_stats = self._arb_stats()
+        changed = []
+        for relative_path in sorted(candidates):
+            source = current.get(relative_path)
+            if source is None:
+                # 削除されたファイル
+                if self.watch_stats.pop(relative_path, None) is not None:
+                    self.file_totals.pop(relative_path, None)
+                    self.usage_counts.pop(relative_path, None)
+                    changed.append(relative_path)
+                continue
+            
+            stat_key = (source.stat.st_mtime_ns, source.stat.st_size)
+            if self.watch_stats.get(relative_path) == stat_key:
+                continue
+            self.watch_stats[relative_path] = stat_key
+            
+            content_hits, pending = self._read_changed_sources([source], keep_data=False)
+            analysis = self._unpack_analysis(content_hits.get(relative_path))
+            for _, digest, result in pending:
+                analysis = result
+                if self.cache:
+                    self._record_analysis(source, digest, self._pack_analysis(result))
+            self._update_file_totals(relative_path, analysis)
+            changed.append(relative_path)
+        
+        return changed, arb_changed
+    
+    def _arb_stats(self) -> Dict[str, Tuple[int, int]]:
+        stats = {}
+        for file_path in (self.arb_en, self.arb_ja):
+            try:
+                stat = file_path.stat()
+                stats[str(file_path)] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                pass
+        return stats
+    
+    def _update_file_totals(self, relative_path: str, analysis: Optional[Dict]):
+        totals = ScanTotals()
+        if analysis and analysis['strings']:
+            totals.add(analysis['strings'])
+        self.file_totals[relative_path] = totals
+        
+        if analysis and analysis['usage_count']:
+            self.usage_counts[relative_path] = analysis['usage_count']
+        else:
+            self.usage_counts.pop(relative_path, None)
+    
+    def _print_watch_status(self, arb_status: Dict, changed: List[str], elapsed_ms: float):
+        """
+        監視中の移行状況を1行で表示
+        """
+        totals = ScanTotals()
+        for file_totals in self.file_totals.values():
+            totals.merge(file_totals)
+        progress = self._migration_progress(totals, len(self.file_totals))
+        
+        if changed:
+            shown = ', '.join(changed[:3]) + (f" (+{len(changed) - 3})" if len(changed) > 3 else "")
+            header = f"🔄 {time.strftime('%H:%M:%S')} {shown} [{elapsed_ms:.0f}ms]"
+        else:
+            header = f"📊 {time.strftime('%H:%M:%S')}"
+        print(f"{header}: {progress['migration_percentage']:.1f}% migrated, "
+              f"{progress['total_hardcoded_strings']} strings in {progress['files_with_hardcoded']} files "
+              f"({progress['ui_text_remaining']} UI), "
+              f"{sum((self.usage_counts or {}).values())} AppLocalizations uses, "
+              f"ARB en/ja {arb_status['en'].get('string_count', 0)}/{arb_status['ja'].get('string_count', 0)}")
     
     def print_summary(self, data: Dict):
         """
@@ -404,21 +1019,36 @@ class StringMigrationTool:
         
         else:
             # スキャン結果のサマリー
-            total_strings = sum(len(strings) for strings in data.values())
-            ui_strings = sum(
-                sum(1 for s in strings if s['is_ui_text']) 
-                for strings in data.values()
-            )
-            japanese_strings = sum(
-                sum(1 for s in strings if s['has_japanese']) 
-                for strings in data.values()
-            )
-            
-            print(f"\n🔍 Scan Results Summary:")
-            print(f"  Files with hardcoded strings: {len(data)}")
-            print(f"  Total hardcoded strings: {total_strings}")
-            print(f"  UI text strings: {ui_strings}")
-            print(f"  Japanese strings: {japanese_strings}")
+            self.print_scan_totals(ScanTotals.of(data.values()))
+    
+    def print_scan_totals(self, totals: ScanTotals):
+        """
+        スキャン結果のサマリーを表示
+        """
+        print(f"\n🔍 Scan Results Summary:")
+        print(f"  Files with hardcoded strings: {totals.files}")
+        print(f"  Total hardcoded strings: {totals.strings}")
+        print(f"  UI text strings: {totals.ui_strings}")
+        print(f"  Japanese strings: {totals.japanese_strings}")
+
+
+def _in_line_ranges(line: int, ranges: List[Tuple[int, int]]) -> bool:
+    # 範囲は開始行順に並んでいるので、line 以下で最後に始まる範囲だけを見ればよい
+    index = bisect_right(ranges, (line, float('inf'))) - 1
+    return index >= 0 and line <= ranges[index][1]
+
+
+# ワーカープロセス毎に1つだけ保持するツール（初期化時に親から受け取る）
+_worker_tool: Optional[StringMigrationTool] = None
+
+
+def _init_scan_worker(tool: StringMigrationTool):
+    global _worker_tool
+    _worker_tool = tool
+
+
+def _analyze_source_worker(file_path: Path, data: bytes) -> Optional[Dict]:
+    return _worker_tool._pack_analysis(_worker_tool._analyze_source(file_path, data))
 
 
 def main():
@@ -427,7 +1057,27 @@ def main():
     parser.add_argument('--extract', action='store_true', help='Extract ARB candidates')
     parser.add_argument('--validate', action='store_true', help='Validate migration status')
     parser.add_argument('--project-root', default='.', help='Project root directory')
-    parser.add_argument('--output', help='Output file for results')
+    parser.add_argument('--output', help='Output file for results (.jsonl/.ndjson = NDJSON, otherwise JSON)')
+    parser.add_argument('--compact', action='store_true',
+                        help='Write --output without whitespace, with context lines interned in a table')
+    parser.add_argument('--jobs', '-j', type=int, default=0,
+                        help='Parallel scan processes (0 = CPU count, 1 = serial)')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_NAME,
+                        help='Scan cache file, relative to the project root')
+    parser.add_argument('--no-cache', action='store_true', help='Re-parse every file without the scan cache')
+    parser.add_argument('--since', metavar='REV',
+                        help='With --scan, only scan Dart files changed since REV and report new strings')
+    parser.add_argument('--staged', action='store_true',
+                        help='With --scan, only scan staged Dart files and report new strings')
+    parser.add_argument('--allow-new', action='store_true',
+                        help='With --since/--staged, exit 0 even when new hardcoded strings are found')
+    parser.add_argument('--whole-files', action='store_true',
+                        help='With --since/--staged, report every string in the changed files, not only changed lines')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and re-analyse files under lib/ as they change')
+    parser.add_argument('--poll', action='store_true', help='Use polling instead of inotify for --watch')
+    parser.add_argument('--poll-interval', type=float, default=0.5,
+                        help='Seconds between checks when polling (default: 0.5)')
     
     args = parser.parse_args()
     
@@ -441,13 +1091,26 @@ def main():
     else:
         project_root = args.project_root
     
-    tool = StringMigrationTool(project_root)
+    # 差分だけのスキャンではキャッシュを読み込まない
+    use_cache = not (args.no_cache or args.since or args.staged)
+    tool = StringMigrationTool(project_root, jobs=args.jobs, cache_file=args.cache if use_cache else None)
     
     if args.scan:
-        results = tool.scan_hardcoded_strings()
-        tool.print_summary(results)
-        if args.output:
-            tool.export_results(results, args.output)
+        if args.since or args.staged:
+            # 差分のファイルだけ解析するため、結果はメモリに組み立てて出力する
+            scan_results = tool.scan_changed_strings(args.since, args.staged, args.whole_files)
+            tool.print_summary(scan_results)
+            if args.output:
+                tool.export_results(scan_results, args.output, args.compact)
+            # pre-commit フックが新しいハードコード文字列を含むコミットを止められるよう失敗扱いにする
+            if scan_results and not args.allow_new:
+                print("❌ New hardcoded strings found (use --allow-new to ignore)")
+                return False
+        elif args.output:
+            # 出力しながらスキャンし、結果全体はメモリに持たない
+            tool.print_scan_totals(tool.export_scan(args.output, args.compact))
+        else:
+            tool.print_summary(tool.scan_hardcoded_strings())
     
     elif args.extract:
         # まずスキャンしてから ARB 候補を生成
@@ -455,17 +1118,24 @@ def main():
         arb_candidates = tool.generate_arb_candidates(scan_results)
         tool.print_summary(arb_candidates)
         if args.output:
-            tool.export_results(arb_candidates, args.output)
+            tool.export_results(arb_candidates, args.output, args.compact)
     
     elif args.validate:
-        status = tool.validate_migration_status()
-        tool.print_summary(status)
         if args.output:
-            tool.export_results(status, args.output)
+            status = tool.export_validation(args.output, args.compact)
+        else:
+            status = tool.validate_migration_status()
+        if status:
+            tool.print_summary(status)
+    
+    elif args.watch:
+        tool.watch(args.poll_interval, args.poll)
     
     else:
         parser.print_help()
+    
+    return True
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(0 if main() else 1)
\ No newline at end of file
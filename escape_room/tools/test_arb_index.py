@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+arb_index のテスト (python3 -m pytest tools)
+"""
+
+from arb_index import ArbIndex, dart_message, normalize_text
+
+
+def make_index():
+    index = ArbIndex()
+    index.add_locale('en', {
+        '@@locale': 'en',
+        'startGame': 'Start Game',
+        '@startGame': {'description': 'Start button'},
+        'welcome': 'Welcome, {name}!',
+        'retry': 'Retry',
+    })
+    index.add_locale('ja', {'startGame': 'ゲーム開始', 'retry': 'リトライ'})
+    return index
+
+
+def test_normalize_text():
+    assert normalize_text('  Start\n  Game! ') == 'start game'
+    assert normalize_text('ＳＴＡＲＴ　ＧＡＭＥ。') == 'start game'
+
+
+def test_dart_message():
+    assert dart_message(r"It\'s $count items") == ("It's {} items", True)
+    assert dart_message(r'Line\nbreak') == ('Line\nbreak', False)
+    assert dart_message('${user.name} joined') == ('{} joined', True)
+
+
+def test_find_exact_normalized_and_placeholders():
+    index = make_index()
+
+    assert index.find('Start Game') == ('startGame', 'exact')
+    assert index.find('ゲーム開始') == ('startGame', 'exact')
+    assert index.find('start game!') == ('startGame', 'normalized')
+    assert index.find('Welcome, $userName!') == ('welcome', 'placeholders')
+    assert index.find('Welcome, friend!') is None
+
+
+def test_keys_and_metadata():
+    index = make_index()
+
+    assert 'startGame' in index and 'retry' in index
+    assert '@startGame' not in index and '@@locale' not in index
+    assert index.keys['retry'] == {'en': 'Retry', 'ja': 'リトライ'}
+    assert index.data['en']['@startGame'] == {'description': 'Start button'}
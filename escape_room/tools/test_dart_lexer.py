@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+dart_lexer のテスト (python3 -m pytest tools)
+"""
+
+from dart_lexer import CommentToken, StringToken, tokenize
+
+
+def strings(source):
+    return [token for token in tokenize(source) if isinstance(token, StringToken)]
+
+
+def text(source, token):
+    return source[token.text_start:token.text_end]
+
+
+def test_interpolation_ranges_and_nested_strings():
+    source = "var a = 'Hello $name and ${user.first('x')}!';"
+    outer, nested = strings(source)
+
+    assert text(source, outer) == "Hello $name and ${user.first('x')}!"
+    assert [source[start:end] for start, end in outer.interpolations] == ['$name', "${user.first('x')}"]
+    assert outer.depth == 0
+
+    # 補間式の中の文字列は外側の後に depth 1 で返る
+    assert text(source, nested) == 'x'
+    assert nested.depth == 1
+
+
+def test_braces_inside_interpolation():
+    source = "var a = '${{'k': 1}['k']} left';"
+    outer = strings(source)[0]
+
+    assert outer.terminated
+    assert text(source, outer) == "${{'k': 1}['k']} left"
+    assert [source[start:end] for start, end in outer.interpolations] == ["${{'k': 1}['k']}"]
+
+
+def test_escaped_quote_and_dollar():
+    source = r"var a = 'it\'s \$5';"
+    token = strings(source)[0]
+
+    assert text(source, token) == r"it\'s \$5"
+    assert token.interpolations == ()
+
+
+def test_raw_string_has_no_escapes_or_interpolation():
+    source = r"var b = r'C:\path $notInterp';"
+    token = strings(source)[0]
+
+    assert token.raw
+    assert token.start == source.index("r'")
+    assert token.quote_start == token.start + 1
+    assert text(source, token) == r'C:\path $notInterp'
+    assert token.interpolations == ()
+
+
+def test_raw_triple_string():
+    source = "var b = r'''a\n$b\\'''';"
+    token = strings(source)[0]
+
+    assert token.raw and token.triple
+    assert text(source, token) == 'a\n$b\\'
+
+
+def test_multi_line_strings():
+    source = 'var c = """line1\nline2 ${n}""";\nvar d = \'\'\'x \'quoted\' y\'\'\';'
+    first, second = strings(source)
+
+    assert first.triple
+    assert text(source, first) == 'line1\nline2 ${n}'
+    assert [source[start:end] for start, end in first.interpolations] == ['${n}']
+
+    # 三重クォートの中の単独クォートで終わらない
+    assert second.triple
+    assert text(source, second) == "x 'quoted' y"
+
+
+def test_single_line_string_stops_at_newline():
+    source = "var e = 'open\nvar f = 'next';"
+    unterminated, following = strings(source)
+
+    assert not unterminated.terminated
+    assert text(source, unterminated) == 'open'
+    assert following.terminated
+    assert text(source, following) == 'next'
+
+
+def test_strings_in_comments_are_not_tokens():
+    source = "// 'commented'\n/* outer /* 'nested' */ still */ var d = 'code';"
+    tokens = list(tokenize(source))
+
+    assert [type(token) for token in tokens] == [CommentToken, CommentToken, StringToken]
+    assert source[tokens[0].start:tokens[0].end] == "// 'commented'"
+    assert source[tokens[1].start:tokens[1].end] == "/* outer /* 'nested' */ still */"
+    assert text(source, tokens[2]) == 'code'
+
+
+def test_comment_markers_inside_strings():
+    source = "var u = 'http://example.com'; var v = '/* not a comment */';"
+    tokens = list(tokenize(source))
+
+    assert all(isinstance(token, StringToken) for token in tokens)
+    assert [text(source, token) for token in tokens] == ['http://example.com', '/* not a comment */']
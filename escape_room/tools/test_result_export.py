@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+result_export のテスト (python3 -m pytest tools)
+"""
+
+import json
+
+from result_export import ResultExporter
+
+SCAN = {
+    'lib/a.dart': [
+        {'content': 'Start', 'line': 3, 'column': 10, 'context': "Text('Start')", 'is_ui_text': True},
+        {'content': 'スタート', 'line': 4, 'column': 10, 'context': "Text('スタート')", 'is_ui_text': True},
+    ],
+    'lib/b.dart': [
+        # 同じ行の文字列は contexts 表の同じ番号を共有する
+        {'content': 'Start', 'line': 1, 'column': 5, 'context': "Text('Start')", 'is_ui_text': True},
+    ],
+}
+SUMMARY = {'files': 2, 'strings': 3}
+
+
+def export(path, compact):
+    with ResultExporter(path, compact) as exporter:
+        exporter.write('summary', SUMMARY)
+        exporter.begin('scan')
+        for file_path, strings in SCAN.items():
+            exporter.write(file_path, exporter.occurrences(strings))
+        exporter.end()
+
+
+def expand(scan, contexts):
+    return {
+        file_path: [{**info, 'context': contexts[info['context']]} for info in strings]
+        for file_path, strings in scan.items()
+    }
+
+
+def test_full_json_matches_json_dump(tmp_path):
+    path = tmp_path / 'result.json'
+    export(path, compact=False)
+
+    expected = json.dumps({'summary': SUMMARY, 'scan': SCAN}, ensure_ascii=False, indent=2)
+    assert path.read_text(encoding='utf-8') == expected
+
+
+def test_compact_json_is_equivalent_to_full(tmp_path):
+    full_path = tmp_path / 'full.json'
+    compact_path = tmp_path / 'compact.json'
+    export(full_path, compact=False)
+    export(compact_path, compact=True)
+
+    full = json.loads(full_path.read_text(encoding='utf-8'))
+    compact = json.loads(compact_path.read_text(encoding='utf-8'))
+
+    assert compact['contexts'] == ["Text('Start')", "Text('スタート')"]
+    assert compact['scan']['lib/b.dart'][0]['context'] == 0
+    assert compact['summary'] == full['summary']
+    assert expand(compact['scan'], compact['contexts']) == full['scan']
+    assert len(compact_path.read_bytes()) < len(full_path.read_bytes())
+
+
+def test_compact_ndjson_is_equivalent_to_full(tmp_path):
+    full_path = tmp_path / 'full.json'
+    ndjson_path = tmp_path / 'compact.jsonl'
+    export(full_path, compact=False)
+    export(ndjson_path, compact=True)
+
+    contexts = {}
+    scan = {}
+    summary = None
+    for line in ndjson_path.read_text(encoding='utf-8').splitlines():
+        record = json.loads(line)
+        if record['section'] == 'contexts':
+            contexts[record['key']] = record['value']
+        elif record['section'] == 'scan':
+            # 参照する contexts のレコードはそれより前に出力されている
+            assert all(info['context'] in contexts for info in record['value'])
+            scan[record['key']] = record['value']
+        else:
+            assert record['key'] == 'summary'
+            summary = record['value']
+
+    full = json.loads(full_path.read_text(encoding='utf-8'))
+    assert summary == full['summary']
+    assert expand(scan, contexts) == full['scan']
+
+
+def test_empty_sections(tmp_path):
+    for compact in (False, True):
+        path = tmp_path / f'empty_{compact}.json'
+        with ResultExporter(path, compact) as exporter:
+            exporter.begin('scan')
+            exporter.end()
+        assert json.loads(path.read_text(encoding='utf-8')) == {'scan': {}}
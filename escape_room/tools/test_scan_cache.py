@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+scan_cache のテスト (python3 -m pytest tools)
+"""
+
+import os
+
+from scan_cache import ScanCache, content_hash
+
+ANALYSIS = {'strings': [['Start', 3, 10, "Text('Start')"]], 'usage_count': 1}
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return os.stat(path)
+
+
+def test_round_trip_by_stat(tmp_path):
+    source = tmp_path / 'a.dart'
+    stat = write(source, b"Text('Start')")
+
+    cache = ScanCache(tmp_path / 'cache.sqlite', 'v1')
+    assert cache.lookup('lib/a.dart', stat) is None
+    cache.store('lib/a.dart', stat, content_hash(b"Text('Start')"), ANALYSIS)
+    cache.save(['lib/a.dart'])
+
+    reloaded = ScanCache(tmp_path / 'cache.sqlite', 'v1')
+    assert reloaded.is_fresh('lib/a.dart', stat)
+    assert reloaded.lookup('lib/a.dart', stat) == ANALYSIS
+
+
+def test_touched_file_matches_by_content(tmp_path):
+    source = tmp_path / 'a.dart'
+    data = b"Text('Start')"
+    stat = write(source, data)
+    cache = ScanCache(tmp_path / 'cache.sqlite', 'v1')
+    cache.store('lib/a.dart', stat, content_hash(data), ANALYSIS)
+    cache.save(['lib/a.dart'])
+
+    os.utime(source, ns=(stat.st_mtime_ns + 10**9, stat.st_mtime_ns + 10**9))
+    touched = os.stat(source)
+    reloaded = ScanCache(tmp_path / 'cache.sqlite', 'v1')
+    assert not reloaded.is_fresh('lib/a.dart', touched)
+    assert reloaded.lookup_content('lib/a.dart', touched, content_hash(data)) == ANALYSIS
+    assert reloaded.lookup_content('lib/a.dart', touched, content_hash(b'changed')) is None
+
+    # 内容一致で再利用した行は新しい mtime で保存され、次回は stat だけでヒットする
+    reloaded.save(['lib/a.dart'])
+    assert ScanCache(tmp_path / 'cache.sqlite', 'v1').is_fresh('lib/a.dart', touched)
+
+
+def test_fingerprint_change_and_pruning(tmp_path):
+    stat = write(tmp_path / 'a.dart', b'a')
+    cache = ScanCache(tmp_path / 'cache.sqlite', 'v1')
+    cache.store('lib/a.dart', stat, content_hash(b'a'), ANALYSIS)
+    cache.store('lib/b.dart', stat, content_hash(b'a'), ANALYSIS)
+    cache.save(['lib/a.dart', 'lib/b.dart'])
+
+    # 削除されたファイルの行は消える
+    cache.save(['lib/a.dart'])
+    assert set(ScanCache(tmp_path / 'cache.sqlite', 'v1').rows) == {'lib/a.dart'}
+
+    # ツールが変わったらキャッシュ全体を使わない
+    assert ScanCache(tmp_path / 'cache.sqlite', 'v2').lookup('lib/a.dart', stat) is None